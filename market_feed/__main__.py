@@ -0,0 +1,107 @@
+"""
+Command-line entry point, run as ``market-feed`` or ``python -m market_feed``.
+
+Only argparse is imported up front. Each command imports the modules it runs,
+so light commands such as ``--help`` or ``bench --list`` start without loading
+web3, NLTK, serpapi, feedparser or BeautifulSoup.
+"""
+
+import argparse
+import sys
+from typing import List, Optional
+
+CONFIG_FILE = "config.yaml"
+
+
+def serve(args: argparse.Namespace) -> int:
+    from market_feed.service import serve
+
+    serve(args.config)
+    return 0
+
+
+def fetch_once(args: argparse.Namespace) -> int:
+    from market_feed.service import fetch_once
+
+    return 1 if fetch_once(args.config, args.tokens) else 0
+
+
+def refresh_tokens(args: argparse.Namespace) -> int:
+    from market_feed import curve_tokens
+
+    if args.watch:
+        curve_tokens.watch(args.config)
+        return 0
+    return 0 if curve_tokens.update_config(args.config) else 1
+
+
+def rescore(args: argparse.Namespace) -> int:
+    from market_feed.service import rescore
+
+    return rescore(args.config, args.tokens)
+
+
+def bench(args: argparse.Namespace) -> int:
+    from market_feed.benchmarks.__main__ import main
+
+    return main(args.bench_args, prog="market-feed bench")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="market-feed", description="Fetch, score and serve token news."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_command(name, handler, help, config=True):
+        command = commands.add_parser(name, help=help, description=help)
+        command.set_defaults(handler=handler)
+        if config:
+            command.add_argument(
+                "--config", default=CONFIG_FILE, help="Configuration file"
+            )
+        return command
+
+    add_command("serve", serve, "Run the fetching service until interrupted")
+    command = add_command("fetch-once", fetch_once, "Fetch the tokens once and exit")
+    command.add_argument(
+        "tokens", nargs="*", metavar="SYMBOL", help="Tokens to fetch (default: all)"
+    )
+    command = add_command(
+        "refresh-tokens",
+        refresh_tokens,
+        "Update the configuration with the tokens listed by the Curve API",
+    )
+    command.add_argument(
+        "--watch", action="store_true", help="Keep refreshing every hour"
+    )
+    command = add_command(
+        "rescore",
+        rescore,
+        "Score stored articles again and drop the ones no longer relevant",
+    )
+    command.add_argument(
+        "tokens", nargs="*", metavar="SYMBOL", help="Tokens to rescore (default: all)"
+    )
+    add_command(
+        "bench",
+        bench,
+        "Run the offline benchmarks; options are those of market_feed.benchmarks",
+        config=False,
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.command == "bench":
+        # Passed on to the benchmark runner, which parses its own options
+        args.bench_args = extra
+    elif extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
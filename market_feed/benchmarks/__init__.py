@@ -0,0 +1,161 @@
+"""
+Offline benchmarks for the fetch, parse, clean and scoring pipeline.
+
+Network access is replaced by recorded fixtures, so results only depend on the
+code under test and the machine it runs on. Each case reports throughput and
+peak traced memory, and can be compared against ``baseline.json``.
+"""
+
+import gc
+import json
+import os
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_MIN_TIME = 0.5
+DEFAULT_TOLERANCE = 0.2
+
+# A case takes a corpus size (None for fixture-based cases) and returns the
+# workload to time plus the number of items one run of it processes.
+Case = Callable[[Optional[int]], Tuple[Callable[[], object], int]]
+
+
+class Benchmark(NamedTuple):
+    name: str
+    case: Case
+    sized: bool
+
+
+class BenchmarkResult(NamedTuple):
+    key: str
+    items: int
+    runs: int
+    seconds: float
+    throughput: float
+    peak_kb: Optional[float]
+
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, sized: bool = False) -> Callable[[Case], Case]:
+    """Register a benchmark case; sized cases run once per corpus size."""
+
+    def decorator(case: Case) -> Case:
+        BENCHMARKS[name] = Benchmark(name, case, sized)
+        return case
+
+    return decorator
+
+
+def measure(
+    key: str,
+    workload: Callable[[], object],
+    items: int,
+    min_time: float = DEFAULT_MIN_TIME,
+    trace_memory: bool = True,
+) -> BenchmarkResult:
+    """
+    Time ``workload`` until at least ``min_time`` seconds have elapsed, then run
+    it once more under tracemalloc to record peak memory.
+    """
+    gc.collect()
+    runs = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while runs == 0 or elapsed < min_time:
+        workload()
+        runs += 1
+        elapsed = time.perf_counter() - start
+
+    peak_kb = None
+    if trace_memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            workload()
+            peak_kb = tracemalloc.get_traced_memory()[1] / 1024
+        finally:
+            tracemalloc.stop()
+
+    return BenchmarkResult(
+        key, items, runs, elapsed / runs, items * runs / elapsed, peak_kb
+    )
+
+
+def run_benchmarks(
+    names: Optional[Iterable[str]] = None,
+    sizes: Iterable[int] = DEFAULT_SIZES,
+    min_time: float = DEFAULT_MIN_TIME,
+    trace_memory: bool = True,
+    baseline: Optional[Dict[str, Dict[str, float]]] = None,
+) -> List[BenchmarkResult]:
+    """Run the selected cases, printing each result as it completes."""
+    # Cases import the pipeline lazily, so registering them is cheap
+    from market_feed.benchmarks import cases  # noqa: F401
+
+    selected = list(names) if names else list(BENCHMARKS)
+    results = []
+    for name in selected:
+        bench = BENCHMARKS[name]
+        for size in sizes if bench.sized else [None]:
+            key = f"{name}[{size}]" if size is not None else name
+            try:
+                workload, items = bench.case(size)
+                result = measure(key, workload, items, min_time, trace_memory)
+            except Exception as e:
+                print(f"{key}: failed: {type(e).__name__}: {e}")
+                continue
+            print(format_result(result, (baseline or {}).get(key)))
+            results.append(result)
+    return results
+
+
+def format_result(
+    result: BenchmarkResult, baseline: Optional[Dict[str, float]] = None
+) -> str:
+    peak = f"{result.peak_kb:>10.0f} KiB" if result.peak_kb is not None else ""
+    line = (
+        f"{result.key:<42} {result.throughput:>14,.0f} items/s "
+        f"{result.seconds * 1000:>10.2f} ms/run {peak}"
+    )
+    if baseline:
+        line += f"  x{result.throughput / baseline['throughput']:.2f} vs baseline"
+    return line
+
+
+def load_baseline(path: str = BASELINE_FILE) -> Dict[str, Dict[str, float]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_baseline(results: List[BenchmarkResult], path: str = BASELINE_FILE):
+    """Merge results into the baseline file, keeping entries for cases not run."""
+    baseline = load_baseline(path)
+    for result in results:
+        baseline[result.key] = {
+            "throughput": round(result.throughput, 2),
+            "peak_kb": round(result.peak_kb, 1) if result.peak_kb is not None else None,
+        }
+    with open(path, "w") as f:
+        json.dump(dict(sorted(baseline.items())), f, indent=2)
+        f.write("\n")
+
+
+def find_regressions(
+    results: List[BenchmarkResult],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> List[str]:
+    """Return keys whose throughput fell more than ``tolerance`` below baseline."""
+    return [
+        result.key
+        for result in results
+        if result.key in baseline
+        and result.throughput < baseline[result.key]["throughput"] * (1 - tolerance)
+    ]
@@ -0,0 +1,83 @@
+import argparse
+import logging
+import sys
+
+from market_feed.benchmarks import (
+    BASELINE_FILE,
+    BENCHMARKS,
+    DEFAULT_MIN_TIME,
+    DEFAULT_SIZES,
+    DEFAULT_TOLERANCE,
+    find_regressions,
+    load_baseline,
+    run_benchmarks,
+    save_baseline,
+)
+
+
+def main(argv=None, prog="python -m market_feed.benchmarks"):
+    parser = argparse.ArgumentParser(
+        prog=prog, description="Run the offline market-feed benchmarks."
+    )
+    parser.add_argument("names", nargs="*", help="Cases to run (default: all)")
+    parser.add_argument("--list", action="store_true", help="List cases and exit")
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="Comma-separated corpus sizes for sized cases, e.g. 1000,1000000",
+    )
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME)
+    parser.add_argument(
+        "--no-memory", action="store_true", help="Skip the tracemalloc pass"
+    )
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Record these results as the new baseline",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Exit with status 1 if any case regressed beyond the tolerance",
+    )
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    from market_feed.benchmarks import cases  # noqa: F401
+
+    # Per-feed and per-article log lines would dominate the timings
+    logging.getLogger("market_feed").setLevel(logging.WARNING)
+
+    if args.list:
+        for name, bench in BENCHMARKS.items():
+            print(f"{name}{' (sized)' if bench.sized else ''}")
+        return 0
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+
+    baseline = load_baseline(args.baseline)
+    results = run_benchmarks(
+        args.names,
+        sizes=[int(size) for size in args.sizes.split(",") if size],
+        min_time=args.min_time,
+        trace_memory=not args.no_memory,
+        baseline=baseline,
+    )
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"Baseline written to {args.baseline}")
+
+    regressions = find_regressions(results, baseline, args.tolerance)
+    if regressions:
+        print(f"Regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        if args.check:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,448 @@
+"""
+Benchmark cases.
+
+Pipeline modules are imported inside each case so that listing or selecting
+cases does not pull in NLTK, feedparser or serpapi.
+"""
+
+import atexit
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from market_feed.benchmarks import benchmark
+from market_feed.benchmarks.corpora import (
+    load_fixture_json,
+    read_fixture,
+    synthetic_articles,
+)
+
+RSS_FIXTURES = {
+    "ghost": "ghost_blog.rss",
+    "discourse": "discourse_latest.rss",
+    "medium": "medium_feed.rss",
+    "atom": "atom_feed.xml",
+}
+HTML_FIXTURES = {"meta": "news_article.html", "text": "news_article_text_date.html"}
+DATE_STRINGS = [
+    "3 hours ago",
+    "1 day ago",
+    "2 weeks ago",
+    "5 months ago",
+    "Oct 12, 2024",
+    "12/10/2024",
+    "4 December 2024",
+    "قبل ٣ ساعات",
+    "٤ ديسمبر ٢٠٢٤",
+]
+KEYWORDS = ["Liquid staked Ether 2.0", "stETH", "lido", "staked eth"]
+ADDITIONAL_PHRASES = ["defi", "p2p.org", "lido.fi"]
+INDEXED_TOKENS = 1000
+# Commands that must start without the pipeline's heavy dependencies
+CLI_COMMANDS = {"help": ["--help"], "bench-list": ["bench", "--list"]}
+
+
+@benchmark("fetch_news_page")
+def bench_fetch_news_page(size):
+    from market_feed.feeds import news
+
+    page = load_fixture_json("serpapi_news_page.json")
+    end_date = datetime(2024, 10, 15, tzinfo=timezone.utc)
+    start_date = end_date - timedelta(days=730)
+
+    def workload():
+        with mock.patch.object(news, "GoogleSearch") as search:
+            search.return_value.get_dict.return_value = page
+            news.fetch_news_page("stETH", start_date, end_date, 1)
+
+    return workload, len(page["news_results"])
+
+
+def rss_case(fixture):
+    def case(size):
+        import feedparser
+
+        from market_feed.feeds import rss
+
+        data = read_fixture(fixture)
+        entries = len(feedparser.parse(data).entries)
+        response = mock.Mock(status_code=200, content=data, headers={})
+
+        def workload():
+            with mock.patch.object(rss.http_utils, "get", return_value=response):
+                rss.fetch_rss_feed(fixture, tag="asset-issuer", is_default=False)
+
+        return workload, entries
+
+    return case
+
+
+def streaming_rss_case(fixture):
+    def case(size):
+        from market_feed.feeds import feed_parser, rss
+
+        data = read_fixture(fixture)
+        parser = feed_parser.FeedParser()
+
+        def response(*args, **kwargs):
+            body = mock.MagicMock()
+            body.__enter__.return_value = body
+            body.iter_content.side_effect = lambda chunk_size: (
+                data[start : start + chunk_size]
+                for start in range(0, len(data), chunk_size)
+            )
+            return body
+
+        def workload():
+            with mock.patch.object(
+                feed_parser.http_utils.requests, "request", response
+            ), mock.patch.object(rss, "feed_parser", parser):
+                return rss.fetch_rss_feed(fixture, tag="asset-issuer", is_default=False)
+
+        return workload, len(workload())
+
+    return case
+
+
+for feed_name, feed_fixture in RSS_FIXTURES.items():
+    benchmark(f"fetch_rss_feed[{feed_name}]")(rss_case(feed_fixture))
+    benchmark(f"fetch_rss_feed_streaming[{feed_name}]")(
+        streaming_rss_case(feed_fixture)
+    )
+
+
+@benchmark("parse_feed_entry")
+def bench_parse_feed_entry(size):
+    import feedparser
+
+    from market_feed.feeds.rss import parse_feed_entry
+
+    entries = [
+        entry
+        for fixture in RSS_FIXTURES.values()
+        for entry in feedparser.parse(read_fixture(fixture)).entries
+    ]
+
+    def workload():
+        for entry in entries:
+            parse_feed_entry(entry, "Fixture", "asset-issuer", False)
+
+    return workload, len(entries)
+
+
+@benchmark("clean_article", sized=True)
+def bench_clean_article(size):
+    from market_feed.utils.content_utils import clean_article
+
+    articles = synthetic_articles(size)
+
+    def workload():
+        for article in articles:
+            clean_article(article)
+
+    return workload, size
+
+
+def truncate_snippet_case(fixture):
+    def case(size):
+        import feedparser
+
+        from market_feed.utils.content_utils import truncate_snippets
+
+        # Full feed summaries, which for some feeds are whole HTML posts
+        summaries = [
+            entry.get("summary", "")
+            for entry in feedparser.parse(read_fixture(fixture)).entries
+        ]
+        return lambda: truncate_snippets(summaries), len(summaries)
+
+    return case
+
+
+for feed_name, feed_fixture in RSS_FIXTURES.items():
+    benchmark(f"truncate_snippet[{feed_name}]")(truncate_snippet_case(feed_fixture))
+
+
+@benchmark("analyze_articles", sized=True)
+def bench_analyze_articles(size):
+    from market_feed.utils.relevance_analyzer import analyze_articles
+
+    articles = synthetic_articles(size)
+
+    def workload():
+        # Mirrors get_content, which scores unscored articles one at a time
+        for article in articles:
+            analyze_articles([article], KEYWORDS, ADDITIONAL_PHRASES)
+
+    return workload, size
+
+
+@benchmark("score_articles[pool]", sized=True)
+def bench_score_articles_pool(size):
+    from market_feed.utils import relevance_analyzer
+
+    articles = synthetic_articles(size)
+    pool = relevance_analyzer.ScoringPool(os.cpu_count())
+    atexit.register(pool.close)
+    # Spawn and warm every worker outside the timed runs
+    relevance_analyzer.score_articles(
+        articles[: pool.chunk_size], KEYWORDS, ADDITIONAL_PHRASES
+    )
+
+    def workload():
+        relevance_analyzer.set_scoring_pool(pool)
+        try:
+            relevance_analyzer.score_articles(articles, KEYWORDS, ADDITIONAL_PHRASES)
+        finally:
+            relevance_analyzer.set_scoring_pool(None)
+
+    return workload, size
+
+
+@benchmark("keyword_index", sized=True)
+def bench_keyword_index(size):
+    import random
+
+    from market_feed.benchmarks.corpora import VOCABULARY
+    from market_feed.utils.keyword_index import KeywordIndex
+
+    rng = random.Random(0)
+    tokens = [
+        {
+            "name": f"Token {index}",
+            "symbol": f"TK{index}",
+            "mandatory_phrases": [" ".join(rng.sample(VOCABULARY, 2))],
+            "additional_phrases": rng.sample(VOCABULARY, 3),
+        }
+        for index in range(INDEXED_TOKENS)
+    ]
+    articles = synthetic_articles(size)
+
+    def workload():
+        # Every article against every token, without the shared-article cache
+        index = KeywordIndex(tokens, cache_size=0)
+        for article in articles:
+            index.content_relevance(article)
+
+    return workload, size
+
+
+@benchmark("parse_relative_date")
+def bench_parse_relative_date(size):
+    from market_feed.utils.date_utils import parse_relative_date
+
+    def workload():
+        for date_string in DATE_STRINGS:
+            parse_relative_date(date_string)
+
+    return workload, len(DATE_STRINGS)
+
+
+def publication_date_case(fixture):
+    def case(size):
+        from market_feed.utils import date_utils
+
+        response = mock.Mock(status_code=200, text=read_fixture(fixture).decode())
+
+        def workload():
+            with mock.patch.object(
+                date_utils, "can_fetch", return_value=True
+            ), mock.patch.object(date_utils.http_utils, "get", return_value=response):
+                date_utils.fetch_publication_date(
+                    "https://www.dlnews.com/articles/defi/example/", delay=0
+                )
+
+        return workload, 1
+
+    return case
+
+
+for page_name, page_fixture in HTML_FIXTURES.items():
+    benchmark(f"fetch_publication_date[{page_name}]")(
+        publication_date_case(page_fixture)
+    )
+
+
+@benchmark("canonicalize_url", sized=True)
+def bench_canonicalize_url(size):
+    from market_feed.utils.url_utils import canonicalize_url
+
+    links = [
+        f"{article['link']}/?utm_source=rss&utm_medium=feed&id={index % 7}"
+        for index, article in enumerate(synthetic_articles(size))
+    ]
+
+    def workload():
+        # Time the normalizer itself rather than its memo
+        canonicalize_url.cache_clear()
+        for link in links:
+            canonicalize_url(link)
+
+    return workload, size
+
+
+@benchmark("remove_duplicates", sized=True)
+def bench_remove_duplicates(size):
+    from market_feed.feeds import remove_duplicates
+
+    articles = synthetic_articles(size)
+    return lambda: remove_duplicates(articles), size
+
+
+@benchmark("collapse_near_duplicates", sized=True)
+def bench_collapse_near_duplicates(size):
+    from market_feed.utils.near_duplicates import (
+        SignatureStore,
+        collapse_near_duplicates,
+    )
+
+    articles = synthetic_articles(size)
+    directory = tempfile.mkdtemp(prefix="market-feed-bench-")
+    store = SignatureStore(os.path.join(directory, "bench_signatures.json"))
+    # Sign once up front, as stored articles are on every fetch but the first
+    collapse_near_duplicates([dict(article) for article in articles], store)
+
+    return (
+        lambda: collapse_near_duplicates(
+            [dict(article) for article in articles], store
+        ),
+        size,
+    )
+
+
+@benchmark("filter_and_sort_articles", sized=True)
+def bench_filter_and_sort_articles(size):
+    from market_feed.feeds import filter_and_sort_articles
+    from market_feed.utils.article import to_articles
+
+    articles = to_articles(synthetic_articles(size))
+
+    def workload():
+        # Scores are dropped in place, so each run re-applies them as scoring does
+        for index, article in enumerate(articles):
+            article["relevance"] = index % 10
+        filter_and_sort_articles(articles, 5.0)
+
+    return workload, size
+
+
+@benchmark("json_round_trip", sized=True)
+def bench_json_round_trip(size):
+    from market_feed.utils.json_utils import load_from_json, save_to_json
+
+    articles = synthetic_articles(size)
+    directory = tempfile.mkdtemp(prefix="market-feed-bench-")
+    path = os.path.join(directory, "bench_news.json")
+
+    def workload():
+        save_to_json(articles, path)
+        load_from_json(path)
+
+    return workload, size
+
+
+@benchmark("article_store_round_trip", sized=True)
+def bench_article_store_round_trip(size):
+    from market_feed.utils.article_store import load_articles, save_articles
+
+    articles = synthetic_articles(size)
+    directory = tempfile.mkdtemp(prefix="market-feed-bench-")
+    path = os.path.join(directory, "bench_news.mfa")
+
+    def workload():
+        save_articles(articles, path)
+        load_articles(path)
+
+    return workload, size
+
+
+@benchmark("load_articles", sized=True)
+def bench_load_articles(size):
+    from market_feed.utils.article_store import load_articles, save_articles
+
+    directory = tempfile.mkdtemp(prefix="market-feed-bench-")
+    path = os.path.join(directory, "bench_news.mfa")
+    save_articles(synthetic_articles(size), path)
+    return lambda: load_articles(path), size
+
+
+@benchmark("load_columns", sized=True)
+def bench_load_columns(size):
+    from market_feed.utils.article_store import load_columns, save_articles
+
+    directory = tempfile.mkdtemp(prefix="market-feed-bench-")
+    path = os.path.join(directory, "bench_news.mfa")
+    save_articles(synthetic_articles(size), path)
+    return lambda: load_columns(path, ["timestamp", "link", "source", "title"]), size
+
+
+@benchmark("load_from_json", sized=True)
+def bench_load_from_json(size):
+    from market_feed.utils.json_utils import load_from_json, save_to_json
+
+    directory = tempfile.mkdtemp(prefix="market-feed-bench-")
+    path = os.path.join(directory, "bench_news.json")
+    save_to_json(synthetic_articles(size), path)
+    return lambda: load_from_json(path), size
+
+
+@benchmark("article_index_query", sized=True)
+def bench_article_index_query(size):
+    from market_feed.utils.article_index import ArticleIndex, ArticleQuery
+
+    directory = tempfile.mkdtemp(prefix="market-feed-bench-")
+    index = ArticleIndex(os.path.join(directory, "articles.db"))
+    index.replace_token("bench", synthetic_articles(size))
+    queries = [
+        ArticleQuery(tokens=("bench",), limit=20),
+        ArticleQuery(tags=("dao-governance",), limit=20),
+        ArticleQuery(since=1_700_000_000, until=1_710_000_000, limit=20),
+    ]
+
+    def workload():
+        for query in queries:
+            index.query(query)
+
+    # Items are pages served
+    return workload, len(queries)
+
+
+@benchmark("article_index_search", sized=True)
+def bench_article_index_search(size):
+    from market_feed.utils.article_index import ArticleIndex, SearchQuery
+
+    directory = tempfile.mkdtemp(prefix="market-feed-bench-")
+    index = ArticleIndex(os.path.join(directory, "articles.db"))
+    index.replace_token("bench", synthetic_articles(size))
+    queries = [
+        SearchQuery('"staking rewards"', limit=20),
+        SearchQuery("lido", tokens=("bench",), since=1_700_000_000, limit=20),
+        SearchQuery("governance NOT vote", tags=("dao-governance",), limit=20),
+    ]
+
+    def workload():
+        for query in queries:
+            index.search(query)
+
+    # Items are pages served
+    return workload, len(queries)
+
+
+def cli_case(args):
+    def case(size):
+        command = [sys.executable, "-m", "market_feed", *args]
+
+        def workload():
+            # A fresh interpreter each run, so this tracks what the command imports
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+
+        return workload, 1
+
+    return case
+
+
+for command_name, command_args in CLI_COMMANDS.items():
+    benchmark(f"cli_cold_start[{command_name}]")(cli_case(command_args))
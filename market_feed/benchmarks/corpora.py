@@ -0,0 +1,89 @@
+import json
+import os
+import random
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+SOURCES = [
+    "CoinDesk",
+    "Cointelegraph",
+    "Decrypt",
+    "DL News",
+    "Blockworks",
+    "The Block",
+    "Lido Finance",
+    "Lido Governance - Latest topics",
+    "Stories by Lido Finance on Medium",
+    "BeInCrypto",
+]
+POOL_SIZE = 4096
+TAGS = ["independent-news", "asset-issuer", "dao-governance"]
+VOCABULARY = (
+    "lido staked eth steth wsteth ethereum staking rewards validator withdrawal "
+    "defi liquidity protocol dao governance proposal vote treasury token holders "
+    "restaking layer bridge mainnet optimism arbitrum curve pool yield apr market "
+    "price depeg oracle node operator community module upgrade audit security the "
+    "a of to and in for on with is as by from this that will are be at"
+).split()
+
+
+def fixture_path(name: str) -> str:
+    return os.path.join(FIXTURES_DIR, name)
+
+
+def read_fixture(name: str) -> bytes:
+    with open(fixture_path(name), "rb") as f:
+        return f.read()
+
+
+def load_fixture_json(name: str) -> Dict:
+    with open(fixture_path(name), "r") as f:
+        return json.load(f)
+
+
+def synthetic_articles(count: int, seed: int = 0) -> List[Dict]:
+    """
+    Build a deterministic corpus of stored-format articles.
+
+    Titles and snippets are drawn from fixed pools so that million-article
+    corpora build in seconds. Roughly 5% of the articles repeat an earlier
+    (source, link, title) so deduplication has work to do.
+    """
+    rng = random.Random(seed)
+    titles = [
+        " ".join(rng.choices(VOCABULARY, k=rng.randint(6, 14))).capitalize()
+        for _ in range(POOL_SIZE)
+    ]
+    snippets = [
+        " ".join(rng.choices(VOCABULARY, k=rng.randint(20, 60)))
+        for _ in range(POOL_SIZE)
+    ]
+    start = int(datetime(2022, 1, 1, tzinfo=timezone.utc).timestamp())
+    end = int(datetime(2024, 10, 15, tzinfo=timezone.utc).timestamp())
+
+    articles = []
+    for index in range(count):
+        if articles and rng.random() < 0.05:
+            duplicate = dict(articles[int(rng.random() * len(articles))])
+            duplicate["timestamp"] += 60
+            articles.append(duplicate)
+            continue
+        timestamp = start + int(rng.random() * (end - start))
+        articles.append(
+            {
+                "title": titles[index % POOL_SIZE],
+                "link": f"https://example.com/news/{index}",
+                "canonical_link": f"https://example.com/news/{index}",
+                "snippet": snippets[int(rng.random() * POOL_SIZE)],
+                "source": SOURCES[index % len(SOURCES)],
+                "timestamp": timestamp,
+                "utc_time": time.strftime(
+                    "%Y-%m-%d %H:%M:%S UTC", time.gmtime(timestamp)
+                ),
+                "tag": TAGS[index % len(TAGS)],
+            }
+        )
+    return articles
@@ -0,0 +1,382 @@
+"""
+Adds the tokens listed by the Curve API to the configuration and marks the
+delisted ones inactive. Run it with ``market-feed refresh-tokens``.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import yaml
+
+from market_feed.utils.coin_utils import fetch_token_info
+from market_feed.utils.http_utils import conditional_get_json
+from market_feed.utils.logger import get_logger
+from market_feed.utils.scheduler import Scheduler
+from market_feed.utils.token_registry import TokenRegistry
+
+CURVE_TOKEN_API = "https://api.curve.fi/api/getTokens/all/"
+CURVE_PLATFORM_API = "https://api.curve.fi/api/getPlatforms/"
+CONFIG_FILE = "config.yaml"
+STATE_FILE = "curve_tokens_state.json"
+DEFAULT_FETCH_INTERVAL = 3600  # 1 hour in seconds
+LOOKBACK_YEARS = 2
+NATIVE_TOKEN_ADDRESS = "0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE"
+
+logger = get_logger()
+
+
+def load_refresh_state() -> Dict[str, Any]:
+    """Load the ETags and token hashes recorded by the previous refresh."""
+    default_state = {"platforms": {}, "networks": {}}
+    if not os.path.exists(STATE_FILE):
+        return default_state
+    try:
+        with open(STATE_FILE, "r") as f:
+            state = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Could not read refresh state: {str(e)}. Starting fresh.")
+        return default_state
+    if not isinstance(state, dict):
+        return default_state
+    state.setdefault("platforms", {})
+    state.setdefault("networks", {})
+    return state
+
+
+def save_refresh_state(state: Dict[str, Any]):
+    with open(STATE_FILE, "w") as f:
+        json.dump(state, f)
+
+
+def hash_addresses(addresses: List[str]) -> str:
+    return hashlib.sha256("\n".join(addresses).encode()).hexdigest()
+
+
+def get_networks(state: Dict[str, Any]) -> Dict[str, int]:
+    logger.info("Fetching network information from Curve API")
+    platforms = state["platforms"]
+    payload, etag = conditional_get_json(CURVE_PLATFORM_API, platforms.get("etag"))
+    if payload is None and "networks" in platforms:
+        logger.info("Network list unchanged since last refresh")
+        return platforms["networks"]
+    if payload is None:
+        # Cached networks were lost; fetch unconditionally
+        payload, etag = conditional_get_json(CURVE_PLATFORM_API)
+    networks = payload["data"]["platformToChainIdMap"]
+    state["platforms"] = {"etag": etag, "networks": networks}
+    logger.info(f"Successfully fetched information for {len(networks)} networks")
+    return networks
+
+
+def load_existing_config(config_file: str = CONFIG_FILE) -> Dict[str, Any]:
+    default_config = {
+        "tokens": [],
+        "output_directory": "token_news",
+        "default_fetch_interval": DEFAULT_FETCH_INTERVAL,
+        "default_relevance_threshold": 0.5,  # Add default relevance threshold
+    }
+
+    if os.path.exists(config_file):
+        try:
+            with open(config_file, "r") as f:
+                config = yaml.safe_load(f)
+
+            if not isinstance(config, dict):
+                logger.warning(
+                    "Existing config file is not properly formatted. Using default configuration."
+                )
+                return default_config
+
+            # Ensure all required keys are present
+            for key in default_config.keys():
+                if key not in config:
+                    logger.warning(
+                        f"Missing '{key}' in config file. Adding default value."
+                    )
+                    config[key] = default_config[key]
+
+            # Ensure 'tokens' is a list
+            if not isinstance(config["tokens"], list):
+                logger.warning(
+                    "'tokens' in config file is not a list. Resetting to empty list."
+                )
+                config["tokens"] = []
+
+            return config
+        except yaml.YAMLError as e:
+            logger.error(
+                f"Error parsing existing config file: {str(e)}. Using default configuration."
+            )
+            return default_config
+    else:
+        logger.info("Config file not found. Creating new configuration.")
+        return default_config
+
+
+def save_config(config: Dict[str, Any], config_file: str = CONFIG_FILE):
+    # Write atomically so the fetch service never reloads a half-written file
+    temp_file = f"{config_file}.tmp"
+    with open(temp_file, "w") as f:
+        yaml.dump(config, f, default_flow_style=False)
+    os.replace(temp_file, config_file)
+    logger.info("Config file updated successfully")
+
+
+def create_token_config(coin_info: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "name": coin_info["name"],
+        "symbol": coin_info["symbol"],
+        "address": {coin_info["network"]: coin_info["address"]},
+        "mandatory_phrases": [],
+        "additional_phrases": ["defi"],
+        "lookback_years": LOOKBACK_YEARS,
+        "relevance_threshold": None,  # Add relevance_threshold field, set to None by default
+    }
+
+
+def build_token_index(
+    tokens: List[Dict[str, Any]]
+) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """Index configured tokens by (network, lowercased address)."""
+    index = {}
+    for token in tokens:
+        for network, address in (token.get("address") or {}).items():
+            index[(network, address.lower())] = token
+    return index
+
+
+class ConfigTokenStore:
+    """Token store backed by the ``tokens`` list of the configuration file."""
+
+    def __init__(self, config: Dict[str, Any], config_file: str = CONFIG_FILE):
+        self.config = config
+        self.config_file = config_file
+        self.index = build_token_index(config["tokens"])
+
+    def find(self, network: str, address: str) -> Optional[Dict[str, Any]]:
+        return self.index.get((network, address.lower()))
+
+    def add(self, token: Dict[str, Any]):
+        self.config["tokens"].append(token)
+        for network, address in token["address"].items():
+            self.index[(network, address.lower())] = token
+
+    def update(self, token: Dict[str, Any]):
+        # Tokens returned by find() are the config entries themselves
+        pass
+
+    def flush(self):
+        save_config(self.config, self.config_file)
+
+    def count(self) -> int:
+        return len(self.config["tokens"])
+
+
+class RegistryTokenStore:
+    """Token store backed by a :class:`TokenRegistry`; writes land immediately."""
+
+    def __init__(self, registry: TokenRegistry):
+        self.registry = registry
+
+    def find(self, network: str, address: str) -> Optional[Dict[str, Any]]:
+        return self.registry.find(network, address)
+
+    def add(self, token: Dict[str, Any]):
+        self.registry.upsert(token)
+
+    def update(self, token: Dict[str, Any]):
+        self.registry.upsert(token)
+
+    def flush(self):
+        pass
+
+    def count(self) -> int:
+        return self.registry.count(active_only=False)
+
+
+def open_token_store(config: Dict[str, Any], config_file: str = CONFIG_FILE):
+    registry_path = config.get("token_registry")
+    if registry_path:
+        return RegistryTokenStore(TokenRegistry(registry_path))
+    return ConfigTokenStore(config, config_file)
+
+
+def fetch_network_diff(
+    network: str, network_state: Dict[str, Any]
+) -> Tuple[Dict[str, Dict[str, Any]], Set[str], Set[str], Optional[str]]:
+    """
+    Fetch a network's Curve token list and diff it against the last refresh.
+
+    The ETag is returned rather than recorded, so the caller only records it
+    once every added token has been resolved.
+
+    :param network: Curve network name
+    :param network_state: State recorded for the network by the previous refresh
+    :return: Tuple of (current tokens by address, added addresses, removed
+        addresses, ETag of the list)
+    """
+    payload, etag = conditional_get_json(
+        CURVE_TOKEN_API + network, network_state.get("etag")
+    )
+    if payload is None:
+        return {}, set(), set(), etag
+
+    current = {
+        token["address"].lower(): token
+        for token in payload["data"]["tokens"]
+        if token["address"].lower() != NATIVE_TOKEN_ADDRESS.lower()
+    }
+    addresses = sorted(current)
+    digest = hash_addresses(addresses)
+    if digest == network_state.get("hash"):
+        return current, set(), set(), etag
+
+    previous = set(network_state.get("addresses", []))
+    return current, set(addresses) - previous, previous - set(addresses), etag
+
+
+def fetch_and_update_coins(
+    networks: Dict[str, int], store, state: Dict[str, Any]
+) -> Tuple[int, int]:
+    added_count = 0
+    removed_count = 0
+    total_networks = len(networks)
+    for index, (network, chain_id) in enumerate(networks.items(), 1):
+        logger.info(
+            f"Fetching tokens for network: {network} (Chain ID: {chain_id}) - {index}/{total_networks}"
+        )
+        network_state = state["networks"].setdefault(network, {})
+        current, added, removed, etag = fetch_network_diff(network, network_state)
+        if not added and not removed:
+            network_state["etag"] = etag
+            logger.info(f"Token list for {network} unchanged since last refresh")
+            continue
+        logger.info(
+            f"Found {len(current)} tokens on {network}: {len(added)} added, {len(removed)} removed"
+        )
+
+        unresolved = set()
+        for address in sorted(added):
+            existing_token = store.find(network, address)
+            if existing_token:
+                if not existing_token.get("active", True):
+                    existing_token.pop("active", None)
+                    existing_token.pop("removed_at", None)
+                    store.update(existing_token)
+                    added_count += 1
+                    logger.info(
+                        f"Token {existing_token['symbol']} reappeared on {network}"
+                    )
+                continue
+
+            token = current[address]
+            token["network"] = network
+            token["chain_id"] = chain_id
+            logger.debug(
+                f"Fetching additional info for new token: {token['address']} on {network}"
+            )
+            token_info = fetch_token_info(token["address"], chain_id)
+            if token_info:
+                token["name"], token["symbol"] = token_info
+                new_token_config = create_token_config(token)
+                store.add(new_token_config)
+                added_count += 1
+                logger.info(
+                    f"Added new token: {token['name']} ({token['symbol']}) on {network}"
+                )
+            else:
+                unresolved.add(address)
+                logger.warning(
+                    f"Failed to fetch info for token {token['address']} on chain {chain_id}"
+                )
+
+        for address in sorted(removed):
+            existing_token = store.find(network, address)
+            if existing_token and existing_token.get("active", True):
+                existing_token["active"] = False
+                existing_token["removed_at"] = int(time.time())
+                store.update(existing_token)
+                removed_count += 1
+                logger.info(
+                    f"Token {existing_token['symbol']} no longer listed on {network}"
+                )
+
+        store.flush()
+
+        # Unresolved tokens stay out of the recorded list so they are retried;
+        # without an ETag the next refresh gets the full list rather than a 304
+        addresses = sorted(set(current) - unresolved)
+        network_state["addresses"] = addresses
+        network_state["hash"] = (
+            hash_addresses(sorted(current)) if not unresolved else None
+        )
+        if unresolved:
+            network_state.pop("etag", None)
+        else:
+            network_state["etag"] = etag
+        save_refresh_state(state)
+
+    return added_count, removed_count
+
+
+def update_config(config_file: str = CONFIG_FILE) -> bool:
+    """Run one refresh of the given configuration; return whether it completed."""
+    start_time = time.time()
+    logger.info("Starting config update process")
+    try:
+        config = load_existing_config(config_file)
+        state = load_refresh_state()
+        networks = get_networks(state)
+        store = open_token_store(config, config_file)
+        added_count, removed_count = fetch_and_update_coins(networks, store, state)
+        save_refresh_state(state)
+
+        end_time = time.time()
+        duration = end_time - start_time
+        logger.info(f"Config update process completed in {duration:.2f} seconds")
+        logger.info(
+            f"Added {added_count} and removed {removed_count} tokens. Total tokens: {store.count()}"
+        )
+        return True
+    except Exception as e:
+        logger.error(f"Error updating config: {str(e)}", exc_info=True)
+        return False
+
+
+def run_update_config(config_file: str = CONFIG_FILE):
+    logger.info("Running config update")
+    update_config(config_file)
+    logger.info("Config update completed")
+
+
+def watch(config_file: str = CONFIG_FILE):
+    """Refresh the tokens now and then every DEFAULT_FETCH_INTERVAL seconds."""
+    # Run the job immediately
+    logger.info("Running initial config update")
+    run_update_config(config_file)
+
+    # Schedule the job to run at regular intervals
+    scheduler = Scheduler()
+    scheduler.add(
+        "config-update",
+        lambda: run_update_config(config_file),
+        DEFAULT_FETCH_INTERVAL,
+        delay=DEFAULT_FETCH_INTERVAL,
+    )
+
+    logger.info(
+        f"Scheduled config update to run every {DEFAULT_FETCH_INTERVAL} seconds"
+    )
+
+    # Start the scheduler
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        logger.info("Keyboard interrupt received. Exiting.")
+
+
+if __name__ == "__main__":
+    watch()
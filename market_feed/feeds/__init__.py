@@ -1,23 +1,101 @@
+import os
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
+from market_feed.feeds.checkpoint import Checkpoint, get_checkpoint_file
 from market_feed.feeds.news import fetch_token_news
-from market_feed.feeds.rss import fetch_token_rss
+from market_feed.feeds.rss import fetch_token_rss, get_high_water_marks
+from market_feed.utils import article_index, changelog, keyword_index, metrics, sharding
+from market_feed.utils.article import Article, to_articles, to_dicts
+from market_feed.utils.article_store import (
+    COMPACT_EXTENSION,
+    DEFAULT_COMPRESSION,
+    check_compression,
+    load_articles,
+    save_articles,
+)
 from market_feed.utils.json_utils import load_from_json, save_to_json
-from market_feed.utils.logger import get_logger
-from market_feed.utils.relevance_analyzer import analyze_articles
+from market_feed.utils.keyword_index import token_phrases
+from market_feed.utils.logger import SAMPLED, get_logger
+from market_feed.utils.near_duplicates import (
+    DEFAULT_MAX_DISTANCE,
+    SignatureStore,
+    collapse_near_duplicates,
+)
+from market_feed.utils.relevance_analyzer import score_articles
+from market_feed.utils.url_utils import article_url_key
 
 logger = get_logger()
 
 
-def get_output_file(token: Dict, output_dir: str) -> str:
-    return f"{output_dir}/{token['symbol'].lower()}_news.json"
+def get_output_file(token: Dict, output_dir: str, storage_format: str = "json") -> str:
+    extension = COMPACT_EXTENSION if storage_format == "compact" else ".json"
+    return f"{output_dir}/{token['symbol'].lower()}_news{extension}"
+
+
+def load_token_news(token: Dict, config: Dict) -> List[Article]:
+    """Load a token's stored articles in the configured storage format."""
+    output_dir = config.get("output_dir", "token_news")
+    storage_format = (config.get("storage") or {}).get("format", "json")
+    output_file = get_output_file(token, output_dir, storage_format)
+    if storage_format != "compact":
+        return to_articles(load_from_json(output_file) or [])
+    if not os.path.exists(output_file):
+        # Not converted yet: read the JSON file, the next save writes the compact one
+        output_file = get_output_file(token, output_dir)
+    return to_articles(load_articles(output_file))
+
+
+def save_token_news(token: Dict, config: Dict, articles: List[Dict]):
+    """Save a token's articles in the configured storage format."""
+    output_dir = config.get("output_dir", "token_news")
+    storage = config.get("storage") or {}
+    storage_format = storage.get("format", "json")
+    output_file = get_output_file(token, output_dir, storage_format)
+    records = to_dicts(articles)
+    if storage_format == "compact":
+        save_articles(
+            records, output_file, storage.get("compression", DEFAULT_COMPRESSION)
+        )
+    else:
+        save_to_json(records, output_file)
+
+
+def check_storage(config: Dict):
+    """
+    Check the ``storage`` config section up front, rather than at the first save.
+
+    :raises ValueError: If the compact format's compression cannot be used
+    """
+    storage = config.get("storage") or {}
+    if storage.get("format", "json") == "compact":
+        check_compression(storage.get("compression", DEFAULT_COMPRESSION))
+
+
+def get_signature_file(token: Dict, output_dir: str) -> str:
+    return f"{output_dir}/{token['symbol'].lower()}_signatures.json"
+
+
+def duplicate_key(article: Dict) -> Tuple[str, str, str]:
+    return article["source"], article_url_key(article), article["title"]
+
+
+def get_start_date(token: Dict, existing_news: List[Dict]) -> datetime:
+    """Fetch from the newest stored article, or over the lookback period for new tokens."""
+    if existing_news:
+        return datetime.fromtimestamp(
+            max(int(article.get("timestamp") or 0) for article in existing_news),
+            tz=timezone.utc,
+        )
+    return datetime.now(timezone.utc) - timedelta(
+        days=365 * token.get("lookback_years", 2)
+    )
 
 
 def remove_duplicates(articles: List[Dict]) -> List[Dict]:
     unique_articles = {}
     for article in articles:
-        key = (article["source"], article["link"], article["title"])
+        key = duplicate_key(article)
         if (
             key not in unique_articles
             or article["timestamp"] > unique_articles[key]["timestamp"]
@@ -29,58 +107,173 @@ def remove_duplicates(articles: List[Dict]) -> List[Dict]:
 def filter_and_sort_articles(
     articles: List[Dict], relevance_threshold: float
 ) -> List[Dict]:
+    """
+    Keep the relevant articles, newest first.
+
+    The kept articles are not copied: their ``relevance`` is removed in place,
+    so the caller's articles lose it too. Articles below the threshold keep
+    their score.
+
+    :param articles: Scored articles, which the caller no longer needs scored
+    :param relevance_threshold: Minimum relevance of a kept article
+    :return: The kept articles, without their relevance
+    """
     filtered_articles = [
-        {k: v for k, v in article.items() if k != "relevance"}
+        article
         for article in articles
         if article.get("relevance", 0) >= relevance_threshold
     ]
+    for article in filtered_articles:
+        article.pop("relevance", None)
     return sorted(filtered_articles, key=lambda x: x["timestamp"], reverse=True)
 
 
-def get_content(token: Dict, config: Dict):
-    logger.info(f"Fetching and updating news for {token['name']} ({token['symbol']})")
-    output_file = get_output_file(token, config.get("output_dir", "token_news"))
-    existing_news = load_from_json(output_file) or []
+def get_content(token: Dict, config: Dict) -> Optional[int]:
+    """
+    Fetch, score and store new articles for a token.
 
-    relevance_threshold = token.get(
-        "relevance_threshold", config.get("default_relevance_threshold", 0.5)
-    )
+    :return: The number of new articles, or None if another worker owns the token
+    """
+    if not sharding.owns(token):
+        logger.debug("Skipping %s, which another worker owns", token["symbol"])
+        return None
 
-    if existing_news:
-        start_date = datetime.fromtimestamp(
-            max(int(article.get("timestamp") or 0) for article in existing_news),
-            tz=timezone.utc,
+    if (config.get("pipeline") or {}).get("streaming"):
+        # Imported here because the pipeline builds on this module's helpers
+        from market_feed.feeds.pipeline import stream_content
+
+        return stream_content(token, config)
+
+    with metrics.token_context(token["symbol"]):
+        logger.info(
+            "Fetching and updating news for %s (%s)", token["name"], token["symbol"]
         )
-    else:
-        start_date = datetime.now(timezone.utc) - timedelta(
-            days=365 * token.get("lookback_years", 2)
+        output_dir = config.get("output_dir", "token_news")
+        existing_news = load_token_news(token, config)
+
+        relevance_threshold = token.get(
+            "relevance_threshold", config.get("default_relevance_threshold", 0.5)
         )
 
-    end_date = datetime.now(timezone.utc)
+        # Paid-for SerpAPI pages survive a crash until the cycle has saved
+        checkpoint = Checkpoint(get_checkpoint_file(token, output_dir))
+        if not checkpoint.resume():
+            checkpoint.begin(
+                get_start_date(token, existing_news), datetime.now(timezone.utc)
+            )
 
-    new_articles = fetch_token_news(token, start_date, end_date)
-    rss_articles = fetch_token_rss(token, config.get("default_rss_feeds", []))
+        new_articles = fetch_token_news(
+            token, checkpoint.start_date, checkpoint.end_date, checkpoint
+        )
+        high_water = get_high_water_marks(token, output_dir)
+        rss_articles = fetch_token_rss(
+            token, config.get("default_rss_feeds", []), high_water
+        )
 
-    all_articles = remove_duplicates(existing_news + new_articles + rss_articles)
+        all_articles = remove_duplicates(existing_news + new_articles + rss_articles)
 
-    keywords = [token["name"], token["symbol"]] + token.get("mandatory_phrases", [])
-    additional_phrases = token.get("additional_phrases", [])
+        keywords, additional_phrases = token_phrases(token)
 
-    analyzed_articles = [
-        article
-        if "relevance" in article
-        else analyze_articles([article], keywords, additional_phrases)[0]
-        for article in all_articles
-    ]
+        if metrics.is_enabled():
+            metrics.inc(
+                "cache_hits",
+                sum("relevance" in article for article in all_articles),
+                cache="relevance",
+            )
+        unscored_articles = [
+            article for article in all_articles if "relevance" not in article
+        ]
+        index = keyword_index.shared_index
+        if index is not None and index.covers(token):
+            for article in unscored_articles:
+                article["relevance"] = index.score(article, token)
+        else:
+            score_articles(unscored_articles, keywords, additional_phrases)
 
-    filtered_articles = filter_and_sort_articles(analyzed_articles, relevance_threshold)
+        filtered_articles = filter_and_sort_articles(all_articles, relevance_threshold)
 
-    save_to_json(filtered_articles, output_file)
+        # Clustered after filtering, so the canonical copy is the earliest relevant one
+        near_duplicates = config.get("near_duplicates") or {}
+        signature_store = None
+        if near_duplicates.get("enabled"):
+            signature_store = SignatureStore(get_signature_file(token, output_dir))
+            filtered_articles = sorted(
+                collapse_near_duplicates(
+                    filtered_articles,
+                    signature_store,
+                    near_duplicates.get("max_distance", DEFAULT_MAX_DISTANCE),
+                ),
+                key=lambda x: x["timestamp"],
+                reverse=True,
+            )
 
-    new_articles_count = len(filtered_articles) - len(existing_news)
-    logger.info(
-        f"Added {new_articles_count} new relevant articles for {token['name']}. Total articles: {len(filtered_articles)}"
-    )
+        with sharding.fenced(token):
+            save_token_news(token, config, filtered_articles)
+            if article_index.shared_index is not None:
+                article_index.shared_index.replace_token(
+                    token["symbol"].lower(), filtered_articles
+                )
+            if changelog.shared_changelog is not None:
+                stored_keys = {duplicate_key(article) for article in existing_news}
+                changelog.shared_changelog.publish(
+                    token["symbol"].lower(),
+                    [
+                        article
+                        for article in filtered_articles
+                        if duplicate_key(article) not in stored_keys
+                    ],
+                )
+            if signature_store is not None:
+                signature_store.save(filtered_articles)
+            if high_water is not None:
+                high_water.save()
+            checkpoint.clear()
 
-    for article in filtered_articles[:new_articles_count]:
-        logger.info(f"New article for {token['name']}: {article['title']}")
+        new_articles_count = len(filtered_articles) - len(existing_news)
+        metrics.inc("new_articles", max(new_articles_count, 0))
+        logger.info(
+            "Added %s new relevant articles for %s. Total articles: %s",
+            new_articles_count,
+            token["name"],
+            len(filtered_articles),
+        )
+
+        for article in filtered_articles[:new_articles_count]:
+            logger.info(
+                "New article for %s: %s", token["name"], article["title"], extra=SAMPLED
+            )
+
+        return new_articles_count
+
+
+def rescore_token(token: Dict, config: Dict) -> Tuple[int, int]:
+    """
+    Score a token's stored articles again with its current phrases and
+    threshold, and drop the ones that are no longer relevant.
+
+    Articles that were below the threshold when fetched were never stored, so
+    a lower threshold only applies to articles fetched from now on.
+
+    :return: Tuple of (articles kept, articles dropped)
+    """
+    with metrics.token_context(token["symbol"]):
+        articles = load_token_news(token, config)
+        keywords, additional_phrases = token_phrases(token)
+        score_articles(articles, keywords, additional_phrases)
+        relevance_threshold = token.get(
+            "relevance_threshold", config.get("default_relevance_threshold", 0.5)
+        )
+        kept = filter_and_sort_articles(articles, relevance_threshold)
+
+        with sharding.fenced(token):
+            save_token_news(token, config, kept)
+            if article_index.shared_index is not None:
+                article_index.shared_index.replace_token(token["symbol"].lower(), kept)
+
+        logger.info(
+            "Rescored %s articles for %s: kept %s",
+            len(articles),
+            token["name"],
+            len(kept),
+        )
+        return len(kept), len(articles) - len(kept)
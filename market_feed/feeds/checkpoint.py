@@ -0,0 +1,103 @@
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from market_feed.utils.article import Article
+from market_feed.utils.json_utils import read_json_lines
+from market_feed.utils.logger import get_logger
+
+logger = get_logger()
+
+
+def get_checkpoint_file(token: Dict, output_dir: str) -> str:
+    return f"{output_dir}/{token['symbol'].lower()}_news.checkpoint"
+
+
+class Checkpoint:
+    """
+    Per-token record of the SerpAPI pages fetched by a cycle that has not
+    saved yet.
+
+    The first line holds the cycle's date window and each further line one
+    fetched page, with its query and page number. Pages are appended and
+    synced as they arrive. A cycle that dies before saving leaves the file
+    behind, and the next cycle resumes it: it reuses the window, replays the
+    pages and fetches only the pages that are still missing.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.start_date: Optional[datetime] = None
+        self.end_date: Optional[datetime] = None
+        self.pages: List[Tuple[str, int, List[Dict]]] = []
+
+    def resume(self) -> bool:
+        """Load an unfinished cycle, returning whether there was one."""
+        if not os.path.exists(self.path):
+            return False
+        lines = read_json_lines(self.path)
+        try:
+            header = json.loads(lines[0])
+            start_date = datetime.fromisoformat(header["start_date"])
+            end_date = datetime.fromisoformat(header["end_date"])
+        except (IndexError, KeyError, ValueError) as e:
+            logger.warning("Ignoring unreadable checkpoint %s: %s", self.path, e)
+            return False
+
+        pages = []
+        for line in lines[1:]:
+            try:
+                page = json.loads(line)
+            except ValueError:
+                logger.warning("Skipping unreadable checkpoint entry in %s", self.path)
+                continue
+            pages.append(
+                (
+                    page["query"],
+                    page["page"],
+                    [Article.from_dict(article) for article in page["articles"]],
+                )
+            )
+        self.start_date, self.end_date, self.pages = start_date, end_date, pages
+        return True
+
+    def begin(self, start_date: datetime, end_date: datetime):
+        """Start a new cycle, replacing any earlier checkpoint."""
+        self.start_date, self.end_date, self.pages = start_date, end_date, []
+        header = {
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps(header) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def append(self, query: str, page: int, articles: List[Dict]):
+        entry = {
+            "query": query,
+            "page": page,
+            "articles": [dict(article) for article in articles],
+        }
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.pages.append((query, page, articles))
+
+    def progress(self) -> Dict[str, Tuple[int, int]]:
+        """Return the last fetched page of each query and its article count."""
+        progress = {}
+        for query, page, articles in self.pages:
+            progress[query] = (page, len(articles))
+        return progress
+
+    def articles(self) -> List[Dict]:
+        return [article for _, _, articles in self.pages for article in articles]
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,324 @@
+import calendar
+import json
+import os
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, NamedTuple, Optional
+from xml.parsers import expat
+
+import feedparser
+import requests
+
+from market_feed.utils import http_utils, sharding
+from market_feed.utils.logger import get_logger
+
+logger = get_logger()
+
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 30
+DEFAULT_FETCH_TIMEOUT = 60
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+ATOM_NAMESPACE = "http://www.w3.org/2005/Atom"
+RSS_1_NAMESPACE = "http://purl.org/rss/1.0/"
+CONTENT_NAMESPACE = "http://purl.org/rss/1.0/modules/content/"
+DUBLIN_CORE_NAMESPACE = "http://purl.org/dc/elements/1.1/"
+
+FEED_ROOTS = {"rss", "RDF", "feed"}
+ENTRY_ELEMENTS = {"item", "entry"}
+# Entry child elements that are read, by (namespace, local name), and the
+# field their text goes to
+ENTRY_FIELDS = {
+    ("", "title"): "title",
+    (RSS_1_NAMESPACE, "title"): "title",
+    (ATOM_NAMESPACE, "title"): "title",
+    ("", "link"): "link",
+    (RSS_1_NAMESPACE, "link"): "link",
+    ("", "description"): "summary",
+    (RSS_1_NAMESPACE, "description"): "summary",
+    (ATOM_NAMESPACE, "summary"): "summary",
+    (CONTENT_NAMESPACE, "encoded"): "content",
+    (ATOM_NAMESPACE, "content"): "content",
+    ("", "pubDate"): "published",
+    (ATOM_NAMESPACE, "published"): "published",
+    (DUBLIN_CORE_NAMESPACE, "date"): "published",
+    (ATOM_NAMESPACE, "updated"): "updated",
+}
+
+
+class ParsedFeed(NamedTuple):
+    """The subset of a ``feedparser`` result that feeds are read through."""
+
+    feed: Dict
+    entries: List[Dict]
+
+
+class MalformedFeed(Exception):
+    """The document is well-formed XML but not an RSS or Atom feed."""
+
+
+class _HighWaterReached(Exception):
+    pass
+
+
+def parse_date(value: str) -> Optional[time.struct_time]:
+    """Parse an RFC 822 or ISO 8601 feed date to a UTC ``struct_time``."""
+    value = value.strip()
+    try:
+        parsed = (
+            datetime.fromisoformat(value)
+            if value[:4].isdigit()
+            else parsedate_to_datetime(value)
+        )
+    except (TypeError, ValueError, IndexError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.utctimetuple()
+
+
+def entry_timestamp(entry: Dict) -> Optional[int]:
+    published = entry.get("published_parsed") or entry.get("updated_parsed")
+    return calendar.timegm(published) if published else None
+
+
+class _FeedHandler:
+    """
+    Expat callbacks that collect the feed title and the fields
+    ``parse_feed_entry`` reads from each entry.
+    """
+
+    def __init__(self, high_water: Optional[int]):
+        self.high_water = high_water
+        self.feed: Dict = {}
+        self.entries: List[Dict] = []
+        self.path: List[str] = []
+        self.entry: Optional[Dict] = None
+        self.entry_depth = 0
+        self.field: Optional[str] = None
+        self.field_depth = 0
+        self.text: List[str] = []
+        # Stopping early is only safe while the feed lists its newest entries first
+        self.newest_first = True
+
+    def start(self, name: str, attributes: Dict[str, str]):
+        namespace, _, local = name.rpartition(" ")
+        depth = len(self.path)
+        self.path.append(local)
+        if depth == 0:
+            if local not in FEED_ROOTS:
+                raise MalformedFeed(f"<{local}> is not a feed")
+        elif self.field is not None:
+            return
+        elif self.entry is None:
+            if local in ENTRY_ELEMENTS:
+                self.entry, self.entry_depth = {}, depth
+            elif local == "title" and self.path[-2] in ("channel", "feed"):
+                self.field, self.field_depth = "feed_title", depth
+        elif depth == self.entry_depth + 1:
+            if (namespace, local) == (ATOM_NAMESPACE, "link"):
+                if attributes.get("rel", "alternate") == "alternate":
+                    self.entry.setdefault("link", attributes.get("href", ""))
+                return
+            field = ENTRY_FIELDS.get((namespace, local))
+            if field is not None and field not in self.entry:
+                self.field, self.field_depth = field, depth
+
+    def end(self, name: str):
+        self.path.pop()
+        depth = len(self.path)
+        if self.field is not None:
+            if depth == self.field_depth:
+                text = "".join(self.text).strip()
+                if self.field == "feed_title":
+                    self.feed["title"] = text
+                else:
+                    self.entry[self.field] = text
+                self.field, self.text = None, []
+        elif self.entry is not None and depth == self.entry_depth:
+            self.finish_entry()
+
+    def data(self, text: str):
+        if self.field is not None:
+            self.text.append(text)
+
+    def finish_entry(self):
+        fields, self.entry = self.entry, None
+        entry = {
+            "title": fields.get("title", ""),
+            "link": fields.get("link", ""),
+            "summary": fields.get("summary", fields.get("content", "")),
+        }
+        if "published" in fields:
+            entry["published_parsed"] = parse_date(fields["published"])
+        if "updated" in fields:
+            entry["updated_parsed"] = parse_date(fields["updated"])
+
+        timestamp = entry_timestamp(entry)
+        if timestamp is not None and self.entries:
+            previous = entry_timestamp(self.entries[-1])
+            if previous is not None and timestamp > previous:
+                self.newest_first = False
+        if (
+            self.high_water is not None
+            and timestamp is not None
+            and timestamp < self.high_water
+            and self.newest_first
+        ):
+            raise _HighWaterReached
+        self.entries.append(entry)
+
+
+class _Body:
+    """A response body read in chunks, up to a size limit and a deadline."""
+
+    def __init__(self, response: requests.Response, max_bytes: int, deadline: float):
+        self.chunks = response.iter_content(CHUNK_SIZE)
+        self.max_bytes = max_bytes
+        self.deadline = deadline
+        self.received: List[bytes] = []
+        self.size = 0
+        self.truncated: Optional[str] = None
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            self.size += len(chunk)
+            if self.size > self.max_bytes:
+                self.truncated = f"body is larger than {self.max_bytes} bytes"
+                return
+            self.received.append(chunk)
+            yield chunk
+            if time.monotonic() > self.deadline:
+                self.truncated = "fetch timed out"
+                return
+
+
+class FeedParser:
+    """
+    Streaming RSS 1.0, RSS 2.0 and Atom parser, an alternative to ``feedparser``.
+
+    The response body is fed to expat as it arrives, and only the fields
+    ``parse_feed_entry`` uses are kept. Connect and read timeouts, an overall
+    fetch timeout and a maximum body size keep a slow or oversized feed from
+    holding up a token's job. Given a high-water mark, parsing stops at the
+    first entry older than it, as long as the feed lists entries newest first.
+    Feeds expat cannot parse are handed to ``feedparser``.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        fetch_timeout: float = DEFAULT_FETCH_TIMEOUT,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.fetch_timeout = fetch_timeout
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def from_config(cls, settings: Optional[Dict]) -> Optional["FeedParser"]:
+        """Build a parser from the ``rss`` config section, if ``fast_parser`` is set."""
+        if not settings or not settings.get("fast_parser"):
+            return None
+        return cls(
+            settings.get("connect_timeout", DEFAULT_CONNECT_TIMEOUT),
+            settings.get("read_timeout", DEFAULT_READ_TIMEOUT),
+            settings.get("fetch_timeout", DEFAULT_FETCH_TIMEOUT),
+            settings.get("max_bytes", DEFAULT_MAX_BYTES),
+        )
+
+    def parse(self, url: str, high_water: Optional[int] = None) -> ParsedFeed:
+        """
+        Fetch and parse a feed.
+
+        :param url: Feed URL
+        :param high_water: Timestamp of the newest entry seen by an earlier fetch
+        :return: The feed title and entries; empty if the feed could not be fetched
+        """
+        handler = _FeedHandler(high_water)
+        parser = expat.ParserCreate(namespace_separator=" ")
+        parser.buffer_text = True
+        parser.StartElementHandler = handler.start
+        parser.EndElementHandler = handler.end
+        parser.CharacterDataHandler = handler.data
+
+        try:
+            # The fetch also ends with the job's deadline, if that comes first
+            fetch_timeout = http_utils.request_timeout(self.fetch_timeout)
+            deadline = time.monotonic() + fetch_timeout
+            with http_utils.get(
+                url,
+                headers={"User-Agent": feedparser.USER_AGENT},
+                timeout=(self.connect_timeout, self.read_timeout),
+                stream=True,
+            ) as response:
+                response.raise_for_status()
+                body = _Body(response, self.max_bytes, deadline)
+                try:
+                    for chunk in body:
+                        parser.Parse(chunk, False)
+                    if body.truncated is None:
+                        parser.Parse(b"", True)
+                    else:
+                        logger.warning(
+                            "Stopped reading feed %s: %s", url, body.truncated
+                        )
+                except _HighWaterReached:
+                    pass
+                except (expat.ExpatError, MalformedFeed) as e:
+                    logger.info("Falling back to feedparser for %s: %s", url, e)
+                    # Reads the rest of the body, within the same limits
+                    for _ in body:
+                        pass
+                    parsed = feedparser.parse(b"".join(body.received))
+                    return ParsedFeed(parsed.feed, parsed.entries)
+        except requests.RequestException as e:
+            logger.warning("Could not fetch feed %s: %s", url, e)
+        return ParsedFeed(handler.feed, handler.entries)
+
+
+class HighWaterMarks:
+    """
+    Persistent per-token record of the newest entry timestamp seen in each
+    feed that lists its newest entries first. It is saved after the token's
+    articles, so a failed fetch never moves a mark past articles that were not
+    stored.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.marks: Dict[str, int] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self.marks = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable feed marks %s: %s", path, e)
+
+    def get(self, feed_url: str) -> Optional[int]:
+        return self.marks.get(feed_url)
+
+    def advance(self, feed_url: str, entries: List[Dict]):
+        timestamps = [
+            timestamp
+            for timestamp in map(entry_timestamp, entries)
+            if timestamp is not None
+        ]
+        if not timestamps:
+            return
+        if any(later > earlier for earlier, later in zip(timestamps, timestamps[1:])):
+            # The feed does not list its newest entries first, so it is always read in full
+            self.marks.pop(feed_url, None)
+        else:
+            self.marks[feed_url] = max(self.marks.get(feed_url, 0), timestamps[0])
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.marks, f)
+        sharding.check_fence()
+        os.replace(tmp_path, self.path)
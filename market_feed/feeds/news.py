@@ -1,19 +1,35 @@
 import os
 from datetime import datetime, timezone
 from itertools import combinations
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from dotenv import load_dotenv
 from serpapi import GoogleSearch
 
+from market_feed.feeds.checkpoint import Checkpoint
+from market_feed.utils import http_utils, metrics
 from market_feed.utils.content_utils import clean_article
 from market_feed.utils.date_utils import parse_relative_date
 from market_feed.utils.logger import get_logger
+from market_feed.utils.request_budget import RequestBudget
 
 logger = get_logger()
 
 load_dotenv()
 
+# Results per SerpAPI request; a shorter page is the query's last
+PAGE_SIZE = 100
+SERPAPI_HOST = "serpapi.com"
+SERPAPI_TIMEOUT = 60
+
+# Shared across all tokens so the whole service stays within one SerpAPI budget
+request_budget: Optional[RequestBudget] = None
+
+
+def set_request_budget(budget: Optional[RequestBudget]):
+    global request_budget
+    request_budget = budget
+
 
 def fetch_news_page(
     query: str, start_date: datetime, end_date: datetime, page: int
@@ -21,17 +37,23 @@ def fetch_news_page(
     params = {
         "q": query,
         "tbm": "nws",
-        "num": 100,
+        "num": PAGE_SIZE,
         "api_key": os.getenv("SERP_API_KEY"),
         "tbs": f"cdr:1,cd_min:{start_date.strftime('%m/%d/%Y')},cd_max:{end_date.strftime('%m/%d/%Y')}",
-        "start": (page - 1) * 100 if page > 1 else None,
+        "start": (page - 1) * PAGE_SIZE if page > 1 else None,
     }
 
-    search = GoogleSearch(params)
-    results = search.get_dict()
+    with http_utils.guarded(SERPAPI_HOST):
+        if request_budget is not None:
+            request_budget.acquire()
+
+        search = GoogleSearch(params)
+        search.timeout = http_utils.request_timeout(SERPAPI_TIMEOUT)
+        results = search.get_dict()
+    metrics.inc("requests", kind="serpapi")
 
     if "error" in results:
-        logger.error(f"API Error: {results['error']}")
+        logger.error("API Error: %s", results["error"])
         return []
 
     return [
@@ -52,22 +74,35 @@ def fetch_news_page(
     ]
 
 
-def fetch_news(query: str, start_date: datetime, end_date: datetime) -> List[Dict]:
-    logger.info(f"Fetching news for query: {query} from {start_date} to {end_date}")
-    all_news_articles = []
-    page = 1
+def iter_news_pages(
+    query: str, start_date: datetime, end_date: datetime, first_page: int = 1
+) -> Iterator[List[Dict]]:
+    """Yield each page of results for a query as soon as it is fetched."""
+    logger.info(
+        "Fetching news for query: %s from %s to %s", query, start_date, end_date
+    )
+    total = 0
+    page = first_page
 
     while True:
-        logger.info(f"Fetching page {page} for query: {query}")
+        logger.info("Fetching page %s for query: %s", page, query)
         news_articles = fetch_news_page(query, start_date, end_date, page)
-        all_news_articles.extend(news_articles)
+        total += len(news_articles)
+        yield news_articles
 
-        if len(news_articles) < 100:
+        if len(news_articles) < PAGE_SIZE:
             break
         page += 1
 
-    logger.info(f"Fetched a total of {len(all_news_articles)} news articles")
-    return all_news_articles
+    logger.info("Fetched a total of %s news articles", total)
+
+
+def fetch_news(query: str, start_date: datetime, end_date: datetime) -> List[Dict]:
+    return [
+        article
+        for page in iter_news_pages(query, start_date, end_date)
+        for article in page
+    ]
 
 
 def generate_queries(token: Dict) -> List[str]:
@@ -84,12 +119,62 @@ def generate_queries(token: Dict) -> List[str]:
     return queries
 
 
-def fetch_token_news(
+def iter_query_pages(
+    token: Dict,
+    start_date: datetime,
+    end_date: datetime,
+    progress: Optional[Dict[str, Tuple[int, int]]] = None,
+) -> Iterator[Tuple[str, int, List[Dict]]]:
+    """
+    Yield every page of every query for a token, with its query and page number.
+
+    :param progress: Last page already fetched for each query and its article
+        count; those pages are skipped, and so are queries whose last page was
+        their final one
+    """
+    progress = progress or {}
+    for query in generate_queries(token):
+        last_page, count = progress.get(query, (0, PAGE_SIZE))
+        if count < PAGE_SIZE:
+            continue
+        pages = iter_news_pages(query, start_date, end_date, last_page + 1)
+        for page, articles in enumerate(pages, last_page + 1):
+            yield query, page, articles
+
+
+def iter_token_news(
     token: Dict, start_date: datetime, end_date: datetime
+) -> Iterator[List[Dict]]:
+    """Yield every page of every query for a token, one page at a time."""
+    for _, _, articles in iter_query_pages(token, start_date, end_date):
+        yield articles
+
+
+@metrics.instrument("fetch_token_news")
+def fetch_token_news(
+    token: Dict,
+    start_date: datetime,
+    end_date: datetime,
+    checkpoint: Optional[Checkpoint] = None,
 ) -> List[Dict]:
-    queries = generate_queries(token)
-    return [
-        article
-        for query in queries
-        for article in fetch_news(query, start_date, end_date)
-    ]
+    """
+    Fetch every page of every query for a token.
+
+    :param checkpoint: Records each page as it is fetched; pages it already
+        holds are replayed instead of fetched again
+    """
+    if checkpoint is None:
+        return [
+            article
+            for page in iter_token_news(token, start_date, end_date)
+            for article in page
+        ]
+
+    if checkpoint.pages:
+        logger.info(
+            "Resuming from a checkpoint with %s fetched pages", len(checkpoint.pages)
+        )
+    pages = iter_query_pages(token, start_date, end_date, checkpoint.progress())
+    for query, page, articles in pages:
+        checkpoint.append(query, page, articles)
+    return checkpoint.articles()
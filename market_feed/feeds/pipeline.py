@@ -0,0 +1,346 @@
+"""
+Streaming variant of get_content.
+
+SerpAPI pages and RSS feeds are pulled one at a time and pass through
+deduplication, near-duplicate collapsing and scoring as they arrive. After
+each page, the articles it added are appended to a per-token journal and
+upserted into the article index. That makes them durable and visible to
+readers before the cycle ends. Each SerpAPI page is journaled too, so a
+resumed cycle fetches only the pages that are still missing. The token's
+news file is rewritten once, at the end, after which the journal is removed.
+
+Apart from the page in flight, a cycle holds the stored articles once. The
+batch pipeline holds several full copies of them at the same time.
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from market_feed.feeds import (
+    duplicate_key,
+    get_signature_file,
+    get_start_date,
+    load_token_news,
+    save_token_news,
+)
+from market_feed.feeds.feed_parser import HighWaterMarks
+from market_feed.feeds.news import iter_query_pages
+from market_feed.feeds.rss import get_high_water_marks, iter_token_rss
+from market_feed.utils import article_index, changelog, keyword_index, metrics, sharding
+from market_feed.utils.article import Article
+from market_feed.utils.json_utils import read_json_lines
+from market_feed.utils.keyword_index import token_phrases
+from market_feed.utils.logger import SAMPLED, get_logger
+from market_feed.utils.near_duplicates import (
+    DEFAULT_MAX_DISTANCE,
+    SignatureIndex,
+    SignatureStore,
+    merge_aliases,
+)
+from market_feed.utils.relevance_analyzer import score_articles
+
+logger = get_logger()
+
+
+def get_journal_file(token: Dict, output_dir: str) -> str:
+    return f"{output_dir}/{token['symbol'].lower()}_news.journal"
+
+
+class Journal:
+    """
+    Append-only JSON-lines log of an unfinished streaming cycle.
+
+    The first line holds the cycle's date window and each further line one
+    accepted article, or one fetched SerpAPI page with its query, page number
+    and article count. A cycle that is interrupted leaves its journal behind,
+    and the next cycle resumes it: it reuses the window, so pages older than
+    the journaled articles are still fetched, replays the articles, so they
+    are not lost, and skips the pages already fetched, as :class:`Checkpoint`
+    does for the batch pipeline.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.start_date: Optional[datetime] = None
+        self.end_date: Optional[datetime] = None
+        self.articles: List[Dict] = []
+        self.pages: Dict[str, Tuple[int, int]] = {}
+
+    def resume(self) -> bool:
+        """Load an unfinished cycle, returning whether there was one."""
+        if not os.path.exists(self.path):
+            return False
+        lines = read_json_lines(self.path)
+        try:
+            header = json.loads(lines[0])
+            start_date = datetime.fromisoformat(header["start_date"])
+            end_date = datetime.fromisoformat(header["end_date"])
+        except (IndexError, KeyError, ValueError) as e:
+            logger.warning("Ignoring unreadable journal %s: %s", self.path, e)
+            return False
+
+        articles, pages = [], {}
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+                if "fetched" in entry:
+                    fetched = entry["fetched"]
+                    pages[fetched["query"]] = (fetched["page"], fetched["count"])
+                else:
+                    articles.append(Article.from_dict(entry))
+            except (KeyError, ValueError):
+                logger.warning("Skipping unreadable journal entry in %s", self.path)
+        self.start_date, self.end_date = start_date, end_date
+        self.articles, self.pages = articles, pages
+        return True
+
+    def begin(self, start_date: datetime, end_date: datetime):
+        """Start a new cycle, replacing any earlier journal."""
+        self.start_date, self.end_date = start_date, end_date
+        self.articles, self.pages = [], {}
+        header = {
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps(header) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def append(
+        self, articles: List[Dict], fetched: Optional[Tuple[str, int, int]] = None
+    ):
+        """
+        Append accepted articles, and the SerpAPI page they came from.
+
+        :param articles: Articles accepted from the page
+        :param fetched: Query, page number and article count of a SerpAPI
+            page; written in the same sync as its articles
+        """
+        sharding.check_fence()
+        lines = [json.dumps(dict(article)) + "\n" for article in articles]
+        if fetched is not None:
+            query, page, count = fetched
+            entry = {"query": query, "page": page, "count": count}
+            lines.append(json.dumps({"fetched": entry}) + "\n")
+        with open(self.path, "a") as f:
+            f.write("".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+        if fetched is not None:
+            self.pages[query] = (page, count)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class ArticleStream:
+    """
+    Incremental dedup, near-duplicate collapsing and scoring for one token.
+
+    The stream starts from the token's stored articles. Earlier cycles
+    already accepted those, so they are not scored again. Unlike the batch
+    pipeline, which orders a whole cycle by time, the first relevant copy of
+    a story to arrive becomes its canonical article. A stored copy is always
+    canonical, because stored articles are seen first.
+    """
+
+    def __init__(
+        self,
+        token: Dict,
+        stored: List[Dict],
+        relevance_threshold: float,
+        signature_store: Optional[SignatureStore] = None,
+        max_distance: int = DEFAULT_MAX_DISTANCE,
+    ):
+        self.token = token
+        self.relevance_threshold = relevance_threshold
+        self.keywords, self.additional_phrases = token_phrases(token)
+        self.seen = {duplicate_key(article) for article in stored}
+        self.signature_store = signature_store
+        self.signature_index = (
+            SignatureIndex(max_distance) if signature_store is not None else None
+        )
+        # Aligned with the signature index positions
+        self.canonical: List[Dict] = []
+        for article in sorted(stored, key=lambda x: x["timestamp"]):
+            self._canonical_of(article)
+
+    def _canonical_of(self, article: Dict) -> Optional[Dict]:
+        # Returns the earlier copy of the article's story, or indexes the article
+        if self.signature_index is None:
+            return None
+        signature = self.signature_store.signature(article)
+        if signature is None:
+            return None
+        position = self.signature_index.find(signature)
+        if position is not None:
+            return self.canonical[position]
+        self.signature_index.add(signature)
+        self.canonical.append(article)
+        return None
+
+    def _score(self, articles: List[Dict]):
+        unscored = [article for article in articles if "relevance" not in article]
+        index = keyword_index.shared_index
+        if index is not None and index.covers(self.token):
+            for article in unscored:
+                article["relevance"] = index.score(article, self.token)
+        else:
+            score_articles(unscored, self.keywords, self.additional_phrases)
+
+    def accept(self, page: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Pass one page of fetched articles through the pipeline.
+
+        :param page: Cleaned articles from one SerpAPI page or RSS feed
+        :return: Tuple of (newly accepted articles, previously accepted
+            articles that gained aliases)
+        """
+        candidates = []
+        for article in page:
+            key = duplicate_key(article)
+            if key in self.seen:
+                continue
+            self.seen.add(key)
+            candidates.append(article)
+
+        # Scored before clustering, so an irrelevant copy never becomes canonical
+        self._score(candidates)
+        accepted, updated = [], {}
+        for article in candidates:
+            if article.pop("relevance", 0) < self.relevance_threshold:
+                continue
+            target = self._canonical_of(article)
+            if target is None:
+                accepted.append(article)
+                continue
+            merge_aliases(target, article)
+            updated[id(target)] = target
+        return accepted, list(updated.values())
+
+
+def iter_token_pages(
+    token: Dict,
+    config: Dict,
+    start_date: datetime,
+    end_date: datetime,
+    high_water: Optional[HighWaterMarks] = None,
+    progress: Optional[Dict[str, Tuple[int, int]]] = None,
+) -> Iterator[Tuple[Optional[str], Optional[int], List[Dict]]]:
+    """
+    Yield each SerpAPI page with its query and page number, then each RSS feed.
+
+    :param progress: Last page already fetched for each query and its article
+        count, as journaled; those pages are not fetched again
+    """
+    yield from iter_query_pages(token, start_date, end_date, progress)
+    for articles in iter_token_rss(
+        token, config.get("default_rss_feeds", []), high_water
+    ):
+        yield None, None, articles
+
+
+def replay(stored: List[Dict], journaled: List[Dict]) -> List[Dict]:
+    """Apply journaled articles over the stored ones; a later copy of an article wins."""
+    articles = {duplicate_key(article): article for article in stored}
+    for article in journaled:
+        articles[duplicate_key(article)] = article
+    return list(articles.values())
+
+
+def stream_content(token: Dict, config: Dict) -> int:
+    with metrics.token_context(token["symbol"]):
+        logger.info(
+            "Streaming news updates for %s (%s)", token["name"], token["symbol"]
+        )
+        output_dir = config.get("output_dir", "token_news")
+        symbol = token["symbol"].lower()
+        relevance_threshold = token.get(
+            "relevance_threshold", config.get("default_relevance_threshold", 0.5)
+        )
+
+        stored = load_token_news(token, config)
+        stored_count = len(stored)
+        journal = Journal(get_journal_file(token, output_dir))
+        if not journal.resume():
+            journal.begin(get_start_date(token, stored), datetime.now(timezone.utc))
+        else:
+            logger.info(
+                "Resuming an unfinished fetch with %s journaled articles and "
+                "%s fetched queries",
+                len(journal.articles),
+                len(journal.pages),
+            )
+            stored = replay(stored, journal.articles)
+
+        near_duplicates = config.get("near_duplicates") or {}
+        signature_store = None
+        if near_duplicates.get("enabled"):
+            signature_store = SignatureStore(get_signature_file(token, output_dir))
+
+        stream = ArticleStream(
+            token,
+            stored,
+            relevance_threshold,
+            signature_store,
+            near_duplicates.get("max_distance", DEFAULT_MAX_DISTANCE),
+        )
+        articles = stored
+
+        high_water = get_high_water_marks(token, output_dir)
+        # An interrupted cycle is resumed over its own window, from the pages
+        # it had not fetched yet
+        pages = iter_token_pages(
+            token,
+            config,
+            journal.start_date,
+            journal.end_date,
+            high_water,
+            dict(journal.pages),
+        )
+        for query, number, page in pages:
+            accepted, updated = stream.accept(page)
+            changed = accepted + updated
+            # SerpAPI pages are journaled even when they add nothing
+            fetched = (query, number, len(page)) if query is not None else None
+            if not changed and fetched is None:
+                continue
+            with sharding.fenced(token):
+                journal.append(changed, fetched)
+                if changed and article_index.shared_index is not None:
+                    article_index.shared_index.add_articles(symbol, changed)
+                if changed and changelog.shared_changelog is not None:
+                    changelog.shared_changelog.publish(symbol, accepted)
+            articles.extend(accepted)
+            for article in accepted:
+                logger.info(
+                    "New article for %s: %s",
+                    token["name"],
+                    article["title"],
+                    extra=SAMPLED,
+                )
+
+        articles.sort(key=lambda x: x["timestamp"], reverse=True)
+        with sharding.fenced(token):
+            save_token_news(token, config, articles)
+            journal.clear()
+            if signature_store is not None:
+                signature_store.save(articles)
+            if high_water is not None:
+                high_water.save()
+
+        new_articles_count = len(articles) - stored_count
+        metrics.inc("new_articles", max(new_articles_count, 0))
+        logger.info(
+            "Added %s new relevant articles for %s. Total articles: %s",
+            new_articles_count,
+            token["name"],
+            len(articles),
+        )
+        return new_articles_count
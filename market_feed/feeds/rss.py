@@ -1,15 +1,36 @@
 from datetime import datetime, timezone
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional
 
 import feedparser
+import requests
 
+from market_feed.feeds.feed_parser import FeedParser, HighWaterMarks
+from market_feed.utils import http_utils, metrics
+from market_feed.utils.article import Article
 from market_feed.utils.content_utils import clean_article
 from market_feed.utils.logger import get_logger
 
 logger = get_logger()
 
+# Streaming parser used in place of feedparser when configured
+feed_parser: Optional[FeedParser] = None
 
-def parse_feed_entry(entry: Dict, feed_title: str, tag: str, is_default: bool) -> Dict:
+
+def set_feed_parser(parser: Optional[FeedParser]):
+    global feed_parser
+    feed_parser = parser
+
+
+def get_high_water_marks(token: Dict, output_dir: str) -> Optional[HighWaterMarks]:
+    """Load the token's feed high-water marks; only the streaming parser uses them."""
+    if feed_parser is None:
+        return None
+    return HighWaterMarks(f"{output_dir}/{token['symbol'].lower()}_feeds.json")
+
+
+def parse_feed_entry(
+    entry: Dict, feed_title: str, tag: str, is_default: bool
+) -> Article:
     published = entry.get("published_parsed") or entry.get("updated_parsed")
     timestamp = (
         datetime(*published[:6], tzinfo=timezone.utc).timestamp()
@@ -31,33 +52,67 @@ def parse_feed_entry(entry: Dict, feed_title: str, tag: str, is_default: bool) -
     )
 
     if not is_default:
-        article["relevance"] = 10.0
+        article.relevance = 10.0
 
     return article
 
 
-def fetch_rss_feed(feed_url: str, tag: str, is_default: bool) -> List[Dict]:
+def fetch_rss_feed(
+    feed_url: str,
+    tag: str,
+    is_default: bool,
+    high_water: Optional[HighWaterMarks] = None,
+) -> List[Dict]:
     """Fetch articles from an RSS feed."""
-    logger.info(f"Fetching RSS feed: {feed_url}")
-    feed = feedparser.parse(feed_url)
+    logger.info("Fetching RSS feed: %s", feed_url)
+    metrics.inc("requests", kind="rss")
+    if feed_parser is not None:
+        feed = feed_parser.parse(
+            feed_url, high_water.get(feed_url) if high_water is not None else None
+        )
+    else:
+        try:
+            response = http_utils.get(
+                feed_url, headers={"User-Agent": feedparser.USER_AGENT}
+            )
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logger.warning("Could not fetch feed %s: %s", feed_url, e)
+            return []
+        feed = feedparser.parse(response.content, response_headers=response.headers)
+    if high_water is not None:
+        high_water.advance(feed_url, feed.entries)
     feed_title = feed.feed.get("title", "Unknown")
     return [
         parse_feed_entry(entry, feed_title, tag, is_default) for entry in feed.entries
     ]
 
 
-def fetch_token_rss(token: Dict, default_rss_feeds: List[str]) -> List[Dict]:
-    """Fetch articles from RSS feeds for a given token."""
-    default_articles = [
-        article
-        for feed_url in default_rss_feeds
-        for article in fetch_rss_feed(feed_url, tag="independent-news", is_default=True)
-    ]
+def iter_token_rss(
+    token: Dict,
+    default_rss_feeds: List[str],
+    high_water: Optional[HighWaterMarks] = None,
+) -> Iterator[List[Dict]]:
+    """Yield the articles of each RSS feed of a token, one feed at a time."""
+    for feed_url in default_rss_feeds:
+        yield fetch_rss_feed(
+            feed_url, tag="independent-news", is_default=True, high_water=high_water
+        )
+    for feed in token.get("rss_feeds", []):
+        yield fetch_rss_feed(
+            feed["url"], tag=feed["tag"], is_default=False, high_water=high_water
+        )
+
 
-    token_articles = [
+@metrics.instrument("fetch_token_rss")
+def fetch_token_rss(
+    token: Dict,
+    default_rss_feeds: List[str],
+    high_water: Optional[HighWaterMarks] = None,
+) -> List[Dict]:
+    """Fetch articles from RSS feeds for a given token."""
+    return [
         article
-        for feed in token.get("rss_feeds", [])
-        for article in fetch_rss_feed(feed["url"], tag=feed["tag"], is_default=False)
+        for feed_articles in iter_token_rss(token, default_rss_feeds, high_water)
+        for article in feed_articles
     ]
-
-    return default_articles + token_articles
@@ -0,0 +1,317 @@
+"""
+The news fetching service: schedules every configured token's fetches and
+serves the article API, event stream and metrics. Run it with ``market-feed serve``.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from market_feed.feeds import check_storage, get_content, rescore_token
+from market_feed.feeds.feed_parser import FeedParser
+from market_feed.feeds.news import generate_queries, set_request_budget
+from market_feed.feeds.rss import set_feed_parser
+from market_feed.utils import article_index, changelog, http_utils, metrics, sharding
+from market_feed.utils.adaptive_interval import AdaptiveIntervals
+from market_feed.utils.article_api import start_article_api
+from market_feed.utils.article_index import ArticleIndex, set_article_index
+from market_feed.utils.changelog import Changelog, set_changelog, start_event_stream
+from market_feed.utils.config_utils import load_config, load_tokens
+from market_feed.utils.date_utils import set_proxy_pool
+from market_feed.utils.keyword_index import KeywordIndex, set_keyword_index
+from market_feed.utils.logger import configure_logging, get_logger
+from market_feed.utils.proxy_pool import ProxyPool
+from market_feed.utils.relevance_analyzer import ScoringPool, set_scoring_pool
+from market_feed.utils.request_budget import RequestBudget
+from market_feed.utils.schedule_utils import apply_token_changes, setup_schedules
+from market_feed.utils.scheduler import Scheduler
+from market_feed.utils.sharding import ShardCoordinator
+from market_feed.utils.token_watcher import TokenWatcher
+
+CONFIG_FILE = "config.yaml"
+DEFAULT_RELOAD_INTERVAL = 30
+DEFAULT_RELOAD_JITTER = 300
+
+logger = get_logger()
+
+
+def create_job(token: Dict, config: Dict):
+    job_deadline = (config.get("outbound") or {}).get("job_deadline")
+
+    def job():
+        # Every request the fetch makes is cut short by the job's deadline
+        with http_utils.deadline(job_deadline):
+            return get_content(token, config)
+
+    return job
+
+
+def setup_article_index(config: Dict):
+    """Open the queryable article index, if enabled, for stored articles to be mirrored to."""
+    index_config = config.get("article_index") or {}
+    if index_config.get("enabled"):
+        output_dir = config.get("output_directory", "token_news")
+        set_article_index(
+            ArticleIndex(index_config.get("path", f"{output_dir}/articles.db"))
+        )
+
+
+def setup_fetching(config: Dict, tokens: List[Dict]) -> Optional[ScoringPool]:
+    """
+    Set up the state shared by every token's fetches: request budgets, circuit
+    breakers, proxies, parsers, indexes and the changelog.
+
+    :return: The scoring process pool, to be closed by the caller, if enabled
+    """
+    output_dir = config.get("output_directory", "token_news")
+    # Ensure the output directory exists
+    os.makedirs(output_dir, exist_ok=True)
+    check_storage(config)
+
+    # One SerpAPI request budget shared by every token
+    request_budget = RequestBudget.from_config(config.get("serpapi_budget"))
+    set_request_budget(request_budget)
+    if request_budget is not None:
+        logger.info(
+            "SerpAPI budget: %s requests per hour",
+            config["serpapi_budget"]["requests_per_hour"],
+        )
+
+    # Circuit breakers and retry budgets shared by all outbound requests, per host
+    http_utils.configure(config.get("outbound"))
+
+    # Article pages scraped for publication dates go through healthy proxies
+    proxy_pool = ProxyPool.from_config(config.get("proxies"))
+    set_proxy_pool(proxy_pool)
+    if proxy_pool is not None:
+        logger.info(
+            "Scraping article pages through %s proxies", len(proxy_pool.proxies)
+        )
+
+    # Relevance scoring is CPU-bound; with concurrent fetches it goes to worker processes
+    scoring_pool = ScoringPool.from_config(config)
+    set_scoring_pool(scoring_pool)
+    if scoring_pool is not None:
+        logger.info("Scoring articles in %s processes", config["scoring"]["processes"])
+
+    # RSS feeds are streamed through expat, with timeouts, instead of feedparser
+    feed_parser = FeedParser.from_config(config.get("rss"))
+    set_feed_parser(feed_parser)
+    if feed_parser is not None:
+        logger.info("Parsing RSS feeds with the streaming parser")
+
+    # Shared feeds are scanned once for every token's phrases
+    set_keyword_index(KeywordIndex(tokens))
+
+    setup_article_index(config)
+
+    # New articles are pushed to subscribers instead of being found by re-reading files
+    set_changelog(Changelog.from_config(config.get("changelog"), output_dir))
+
+    return scoring_pool
+
+
+def serve(config_file: str = CONFIG_FILE):
+    """Run the fetching service until interrupted."""
+    logger.info("Starting the news fetching service")
+
+    config = load_config(config_file)
+    configure_logging(config)
+    tokens = load_tokens(config)
+    output_dir = config.get("output_directory", "token_news")
+    default_interval = config.get(
+        "default_fetch_interval", 3600
+    )  # Default to 1 hour if not specified
+
+    if not tokens:
+        logger.error("No tokens found in the configuration. Exiting.")
+        return
+
+    scoring_pool = setup_fetching(config, tokens)
+
+    scheduler = Scheduler(max_workers=config.get("max_concurrent_fetches", 1))
+
+    # Each fetch issues at least one SerpAPI request per generated query
+    intervals = AdaptiveIntervals.from_config(
+        config, cost_fn=lambda token: len(generate_queries(token))
+    )
+    if intervals is not None:
+        logger.info("Adaptive fetch intervals enabled")
+
+    # Setup schedules for all tokens
+    setup_schedules(
+        scheduler, tokens, output_dir, default_interval, create_job, config, intervals
+    )
+
+    # Pick up token additions, removals and edits without a restart
+    watcher = TokenWatcher(config_file, config, tokens)
+    reload_interval = config.get("token_reload_interval", DEFAULT_RELOAD_INTERVAL)
+    max_jitter = config.get("token_reload_jitter", DEFAULT_RELOAD_JITTER)
+
+    def reload_tokens():
+        changes = watcher.poll()
+        if changes:
+            set_keyword_index(KeywordIndex(list(watcher.tokens.values())))
+            apply_token_changes(
+                scheduler,
+                changes,
+                output_dir,
+                default_interval,
+                create_job,
+                config,
+                max_jitter,
+                intervals,
+            )
+
+    scheduler.add("token-reload", reload_tokens, reload_interval, reload_interval)
+
+    # Workers sharing a lease store split the tokens between them; every worker
+    # schedules every token and skips the ones it does not own
+    shard_coordinator = ShardCoordinator.from_config(config.get("sharding"), output_dir)
+    sharding.set_coordinator(shard_coordinator)
+    heartbeat_stopped = None
+    if shard_coordinator is not None:
+        sharding.heartbeat(list(watcher.tokens.values()))
+        heartbeat_stopped = sharding.start_heartbeat(
+            lambda: list(watcher.tokens.values()), shard_coordinator.lease_ttl / 3
+        )
+        logger.info(
+            "Sharding tokens as worker %s: %s of %s owned",
+            shard_coordinator.worker_id,
+            len(shard_coordinator.leases),
+            len(watcher.tokens),
+        )
+
+    index_config = config.get("article_index") or {}
+    if article_index.shared_index is not None and index_config.get("port"):
+        start_article_api(article_index.shared_index.path, index_config["port"])
+
+    if changelog.shared_changelog is not None and config["changelog"].get("port"):
+        start_event_stream(changelog.shared_changelog, config["changelog"]["port"])
+
+    metrics_config = config.get("metrics") or {}
+    if metrics_config.get("enabled"):
+        metrics.enable()
+        if metrics_config.get("port", metrics.DEFAULT_PORT):
+            metrics.start_metrics_server(
+                metrics_config.get("port", metrics.DEFAULT_PORT)
+            )
+        summary_interval = metrics_config.get(
+            "summary_interval", metrics.DEFAULT_SUMMARY_INTERVAL
+        )
+        scheduler.add(
+            "metrics-summary", metrics.log_summary, summary_interval, summary_interval
+        )
+
+    logger.info("All schedules set up. Running jobs...")
+
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        logger.info("Keyboard interrupt received. Exiting.")
+    finally:
+        if scoring_pool is not None:
+            scoring_pool.close()
+        if heartbeat_stopped is not None:
+            heartbeat_stopped.set()
+        if shard_coordinator is not None:
+            shard_coordinator.close()
+
+
+def select_tokens(tokens: List[Dict], symbols: Sequence[str]) -> List[Dict]:
+    """Keep the tokens with the given symbols, case-insensitive; all if none are given."""
+    if symbols:
+        wanted = {symbol.lower() for symbol in symbols}
+        tokens = [token for token in tokens if token["symbol"].lower() in wanted]
+    if not tokens:
+        logger.error("No matching tokens found in the configuration.")
+    return tokens
+
+
+def is_sharded(config: Dict, command: str) -> bool:
+    """
+    Tell whether workers share the tokens, logging why ``command`` will not run.
+
+    One-off commands hold no leases, so their writes would race the workers
+    that own the tokens.
+    """
+    if not (config.get("sharding") or {}).get("enabled"):
+        return False
+    logger.error(
+        "Sharding is enabled, so the tokens belong to the serving workers; "
+        "run %s with sharding disabled while no worker is serving",
+        command,
+    )
+    return True
+
+
+def fetch_once(config_file: str = CONFIG_FILE, symbols: Sequence[str] = ()) -> int:
+    """
+    Fetch every configured token, or the given ones, once and return.
+
+    :param symbols: Symbols of the tokens to fetch, case-insensitive; all if empty
+    :return: The number of tokens whose fetch failed, or 1 if none was fetched
+    """
+    config = load_config(config_file)
+    configure_logging(config)
+    if is_sharded(config, "fetch-once"):
+        return 1
+    tokens = select_tokens(load_tokens(config), symbols)
+    if not tokens:
+        return 1
+
+    scoring_pool = setup_fetching(config, tokens)
+    failures = 0
+    try:
+        with ThreadPoolExecutor(config.get("max_concurrent_fetches", 1)) as executor:
+            futures = {
+                token["symbol"]: executor.submit(create_job(token, config))
+                for token in tokens
+            }
+            for symbol, future in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    failures += 1
+                    logger.error("Fetching %s failed: %s", symbol, e, exc_info=True)
+    finally:
+        if scoring_pool is not None:
+            scoring_pool.close()
+    logger.info("Fetched %s tokens, %s failed", len(tokens), failures)
+    return failures
+
+
+def rescore(config_file: str = CONFIG_FILE, symbols: Sequence[str] = ()) -> int:
+    """
+    Score every configured token's stored articles, or the given tokens', again.
+
+    :param symbols: Symbols of the tokens to rescore, case-insensitive; all if empty
+    :return: 1 if sharding is enabled or no token matched, otherwise 0
+    """
+    config = load_config(config_file)
+    configure_logging(config)
+    if is_sharded(config, "rescore"):
+        return 1
+    tokens = select_tokens(load_tokens(config), symbols)
+    if not tokens:
+        return 1
+
+    check_storage(config)
+    scoring_pool = ScoringPool.from_config(config)
+    set_scoring_pool(scoring_pool)
+    setup_article_index(config)
+    try:
+        dropped = sum(rescore_token(token, config)[1] for token in tokens)
+    finally:
+        if scoring_pool is not None:
+            scoring_pool.close()
+    logger.info("Rescored %s tokens, dropped %s articles", len(tokens), dropped)
+    return 0
+
+
+def main():
+    serve()
+
+
+if __name__ == "__main__":
+    main()
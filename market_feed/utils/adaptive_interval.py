@@ -0,0 +1,139 @@
+import threading
+from typing import Callable, Dict, Optional
+
+from market_feed.utils.logger import get_logger
+
+logger = get_logger()
+
+DEFAULT_MIN_INTERVAL = 900  # 15 minutes
+DEFAULT_MAX_INTERVAL = 86400  # 1 day
+DEFAULT_TARGET_NEW_ARTICLES = 1.0
+DEFAULT_SMOOTHING = 0.3
+IDLE_GROWTH = 1.5
+
+
+class AdaptiveIntervals:
+    """
+    Per-token fetch intervals that follow each token's observed article velocity.
+
+    Each token's velocity (new articles per second) is tracked as an exponential
+    moving average of the new-article counts reported after every fetch. The
+    desired interval is the time expected to produce ``target_new_articles``,
+    clamped to ``[min_interval, max_interval]``; tokens that keep coming back
+    empty back off geometrically. When an hourly API budget is set, all
+    intervals are stretched by a common factor until the projected number of
+    API calls per hour fits the budget.
+
+    Fetch jobs report from the scheduler's worker threads, so every method
+    holds a lock. A token unregistered while its fetch was running is ignored
+    when that fetch reports.
+    """
+
+    def __init__(
+        self,
+        cost_fn: Callable[[Dict], int],
+        min_interval: float = DEFAULT_MIN_INTERVAL,
+        max_interval: float = DEFAULT_MAX_INTERVAL,
+        target_new_articles: float = DEFAULT_TARGET_NEW_ARTICLES,
+        hourly_api_budget: Optional[float] = None,
+        smoothing: float = DEFAULT_SMOOTHING,
+    ):
+        self.cost_fn = cost_fn
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_new_articles = target_new_articles
+        self.hourly_api_budget = hourly_api_budget
+        self.smoothing = smoothing
+        self.costs: Dict[str, int] = {}
+        self.desired: Dict[str, float] = {}
+        self.velocity: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(
+        cls, config: Dict, cost_fn: Callable[[Dict], int]
+    ) -> Optional["AdaptiveIntervals"]:
+        """Build the controller from ``adaptive_scheduling``, or None if disabled."""
+        settings = config.get("adaptive_scheduling") or {}
+        if not settings.get("enabled"):
+            return None
+        return cls(
+            cost_fn,
+            min_interval=settings.get("min_interval", DEFAULT_MIN_INTERVAL),
+            max_interval=settings.get("max_interval", DEFAULT_MAX_INTERVAL),
+            target_new_articles=settings.get(
+                "target_new_articles", DEFAULT_TARGET_NEW_ARTICLES
+            ),
+            hourly_api_budget=settings.get("hourly_api_budget"),
+        )
+
+    def _clamp(self, interval: float) -> float:
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def _budget_scale(self) -> float:
+        if not self.hourly_api_budget:
+            return 1.0
+        usage = sum(
+            self.costs[key] * 3600 / interval for key, interval in self.desired.items()
+        )
+        return max(1.0, usage / self.hourly_api_budget)
+
+    def budget_scale(self) -> float:
+        """Factor by which all intervals are stretched to respect the API budget."""
+        with self._lock:
+            return self._budget_scale()
+
+    def register(self, key: str, token: Dict, interval: float) -> float:
+        """
+        Start tracking a token.
+
+        :param key: Scheduler tag of the token
+        :param token: Token configuration, used to estimate API calls per fetch
+        :param interval: Configured fetch interval in seconds
+        :return: Interval to schedule the token with
+        """
+        cost = max(self.cost_fn(token), 1)
+        with self._lock:
+            self.costs[key] = cost
+            self.desired[key] = self._clamp(interval)
+            return self.desired[key] * self._budget_scale()
+
+    def unregister(self, key: str):
+        with self._lock:
+            self.costs.pop(key, None)
+            self.desired.pop(key, None)
+            self.velocity.pop(key, None)
+
+    def update(self, key: str, new_articles: int, elapsed: float) -> float:
+        """
+        Record a fetch result and compute the token's next interval.
+
+        :param key: Scheduler tag of the token
+        :param new_articles: Number of new articles the fetch produced
+        :param elapsed: Seconds covered by the fetch (the interval it ran on)
+        :return: Interval until the token's next fetch; ``elapsed`` unchanged if
+            the token was unregistered while it was fetching
+        """
+        observed = max(new_articles, 0) / max(elapsed, 1.0)
+        with self._lock:
+            if key not in self.costs:
+                return elapsed
+            velocity = self.velocity.get(key, observed)
+            velocity = self.smoothing * observed + (1 - self.smoothing) * velocity
+            self.velocity[key] = velocity
+
+            if velocity > 0:
+                desired = self.target_new_articles / velocity
+            else:
+                desired = self.desired.get(key, self.min_interval) * IDLE_GROWTH
+            self.desired[key] = self._clamp(desired)
+
+            interval = self.desired[key] * self._budget_scale()
+        logger.debug(
+            "Adaptive interval for %s: %.0fs (%s new articles, velocity %.2f/h)",
+            key,
+            interval,
+            new_articles,
+            velocity * 3600,
+        )
+        return interval
@@ -0,0 +1,175 @@
+import sys
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Mapping
+
+# In the order clean_article and the stored files have always used
+FIELDS = (
+    "title",
+    "link",
+    "snippet",
+    "source",
+    "timestamp",
+    "utc_time",
+    "tag",
+    "canonical_link",
+    "aliases",
+    "relevance",
+)
+FIELD_SET = frozenset(FIELDS)
+
+
+class _Missing:
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "MISSING"
+
+    def __reduce__(self) -> str:
+        # Unpickled as the module singleton, so identity checks hold in worker processes
+        return "MISSING"
+
+
+# Value of a field the article does not have, as opposed to one set to None
+MISSING: Any = _Missing()
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+def _timestamp(value: Any) -> Any:
+    # Whole seconds, as clean_article and the stored files have always used
+    return int(value) if type(value) is float else value
+
+
+class Article(MutableMapping):
+    """
+    Compact record of one article.
+
+    Known fields are stored in slots rather than a per-article dict, and
+    ``source`` and ``tag`` are interned, so every article from one outlet
+    shares a single string. ``timestamp`` is kept in whole seconds. Any other
+    key is kept in ``extra``. Article is a mutable mapping, so code written
+    against article dicts works unchanged. :meth:`from_dict` and
+    :meth:`to_dict` convert losslessly at the storage edge.
+    """
+
+    __slots__ = FIELDS + ("extra",)
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "Article":
+        article = cls.__new__(cls)
+        get = data.get
+        article.title = get("title", MISSING)
+        article.link = get("link", MISSING)
+        article.snippet = get("snippet", MISSING)
+        article.source = _intern(get("source", MISSING))
+        article.timestamp = _timestamp(get("timestamp", MISSING))
+        article.utc_time = get("utc_time", MISSING)
+        article.tag = _intern(get("tag", MISSING))
+        article.canonical_link = get("canonical_link", MISSING)
+        article.aliases = get("aliases", MISSING)
+        article.relevance = get("relevance", MISSING)
+        article.extra = (
+            None
+            if FIELD_SET.issuperset(data)
+            else {key: value for key, value in data.items() if key not in FIELD_SET}
+        )
+        return article
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            name: value
+            for name in FIELDS
+            if (value := getattr(self, name)) is not MISSING
+        }
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def copy(self) -> "Article":
+        article = Article.__new__(Article)
+        article.title = self.title
+        article.link = self.link
+        article.snippet = self.snippet
+        article.source = self.source
+        article.timestamp = self.timestamp
+        article.utc_time = self.utc_time
+        article.tag = self.tag
+        article.canonical_link = self.canonical_link
+        article.aliases = self.aliases
+        article.relevance = self.relevance
+        article.extra = dict(self.extra) if self.extra else None
+        return article
+
+    def __getitem__(self, key: str) -> Any:
+        if key in FIELD_SET:
+            value = getattr(self, key)
+            if value is not MISSING:
+                return value
+        elif self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in FIELD_SET:
+            value = getattr(self, key)
+            return default if value is MISSING else value
+        if self.extra is not None:
+            return self.extra.get(key, default)
+        return default
+
+    def __contains__(self, key: object) -> bool:
+        if key in FIELD_SET:
+            return getattr(self, key) is not MISSING
+        return self.extra is not None and key in self.extra
+
+    def __setitem__(self, key: str, value: Any):
+        if key in ("source", "tag"):
+            setattr(self, key, _intern(value))
+        elif key == "timestamp":
+            self.timestamp = _timestamp(value)
+        elif key in FIELD_SET:
+            setattr(self, key, value)
+        elif self.extra is None:
+            self.extra = {key: value}
+        else:
+            self.extra[key] = value
+
+    def __delitem__(self, key: str):
+        if key in FIELD_SET and getattr(self, key) is not MISSING:
+            setattr(self, key, MISSING)
+        elif key not in FIELD_SET and self.extra is not None and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for name in FIELDS:
+            if getattr(self, name) is not MISSING:
+                yield name
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return sum(getattr(self, name) is not MISSING for name in FIELDS) + len(
+            self.extra or ()
+        )
+
+    def __repr__(self) -> str:
+        return f"Article({self.to_dict()!r})"
+
+
+def to_articles(records: List[Mapping[str, Any]]) -> List[Article]:
+    """Convert loaded article dicts to Articles in place, releasing each dict as it goes."""
+    for position, record in enumerate(records):
+        if not isinstance(record, Article):
+            records[position] = Article.from_dict(record)
+    return records
+
+
+def to_dicts(articles: List[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        article.to_dict() if isinstance(article, Article) else article
+        for article in articles
+    ]
@@ -0,0 +1,248 @@
+import hashlib
+import json
+import sys
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
+
+from market_feed.utils.article_index import (
+    DEFAULT_LIMIT,
+    ArticleIndex,
+    ArticleQuery,
+    SearchQuery,
+)
+from market_feed.utils.logger import get_logger
+
+logger = get_logger()
+
+DEFAULT_PORT = 9109
+DEFAULT_CACHE_SIZE = 256
+
+Query = Union[ArticleQuery, SearchQuery]
+
+
+def _split(values: List[str]) -> Tuple[str, ...]:
+    return tuple(
+        sorted({value for item in values for value in item.split(",") if value})
+    )
+
+
+def parse_query(query_string: str) -> ArticleQuery:
+    """
+    Build a query from URL parameters.
+
+    ``token``, ``tag`` and ``source`` take comma-separated or repeated values;
+    ``since`` and ``until`` are Unix timestamps; ``cursor`` is the
+    ``next_cursor`` of the previous page.
+
+    :raises ValueError: If a numeric parameter or the cursor is malformed
+    """
+    params = parse_qs(query_string)
+
+    def number(name: str) -> Optional[int]:
+        return int(params[name][-1]) if name in params else None
+
+    before = None
+    if "cursor" in params:
+        timestamp, _, row_id = params["cursor"][-1].partition(":")
+        before = (int(timestamp), int(row_id))
+    return ArticleQuery(
+        tokens=tuple(token.lower() for token in _split(params.get("token", []))),
+        tags=_split(params.get("tag", [])),
+        sources=_split(params.get("source", [])),
+        since=number("since"),
+        until=number("until"),
+        limit=number("limit") or DEFAULT_LIMIT,
+        before=before,
+    )
+
+
+def parse_search(query_string: str) -> SearchQuery:
+    """
+    Build a full-text search from URL parameters.
+
+    ``q`` is the FTS5 query; the filters are those of :func:`parse_query`, and
+    ``offset`` is the ``next_offset`` of the previous page.
+
+    :raises ValueError: If ``q`` is missing or a numeric parameter is malformed
+    """
+    params = parse_qs(query_string)
+    if not params.get("q"):
+        raise ValueError("Missing search query q")
+    filters = parse_query(query_string)
+    return SearchQuery(
+        text=params["q"][-1],
+        tokens=filters.tokens,
+        tags=filters.tags,
+        sources=filters.sources,
+        since=filters.since,
+        until=filters.until,
+        limit=filters.limit,
+        offset=int(params["offset"][-1]) if "offset" in params else 0,
+    )
+
+
+class ArticleApi:
+    """
+    Read API over an :class:`ArticleIndex` with an LRU cache of hot pages.
+
+    Pages are tagged with the version stamp of the tokens they cover, which
+    grows on every write to any of those tokens, so a cached page or an ETag
+    is valid exactly as long as the stamp is unchanged.
+    """
+
+    def __init__(self, index: ArticleIndex, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.index = index
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Query, Tuple[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def etag(self, query: Query) -> str:
+        stamp = sum(self.index.versions(query.tokens).values())
+        digest = hashlib.sha1(repr(query).encode()).hexdigest()[:16]
+        return f'"{stamp}-{digest}"'
+
+    def _cached(self, query: Query, render: Callable[[], bytes]) -> Tuple[str, bytes]:
+        etag = self.etag(query)
+        with self._lock:
+            cached = self._cache.get(query)
+            if cached is not None and cached[0] == etag:
+                self._cache.move_to_end(query)
+                return cached
+
+        body = render()
+        with self._lock:
+            self._cache[query] = (etag, body)
+            self._cache.move_to_end(query)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return etag, body
+
+    def page(self, query: ArticleQuery) -> Tuple[str, bytes]:
+        """
+        Return the ETag and JSON body of one page of articles.
+
+        :param query: Parsed query
+        :return: Tuple of (etag, body)
+        """
+
+        def render() -> bytes:
+            page = self.index.query(query)
+            next_cursor = (
+                f"{page.next_cursor[0]}:{page.next_cursor[1]}"
+                if page.next_cursor
+                else None
+            )
+            # Stored documents are already JSON; splice them in rather than re-encode
+            return (
+                '{"articles":['
+                + ",".join(page.articles)
+                + f'],"next_cursor":{json.dumps(next_cursor)}}}'
+            ).encode()
+
+        return self._cached(query, render)
+
+    def search(self, query: SearchQuery) -> Tuple[str, bytes]:
+        """
+        Return the ETag and JSON body of one page of full-text search results.
+
+        :param query: Parsed search
+        :raises ValueError: If the query text is not a valid FTS5 query
+        :return: Tuple of (etag, body)
+        """
+
+        def render() -> bytes:
+            page = self.index.search(query)
+            return (
+                '{"articles":['
+                + ",".join(page.articles)
+                + f'],"next_offset":{json.dumps(page.next_offset)}'
+                + f',"truncated":{json.dumps(page.truncated)}}}'
+            ).encode()
+
+        return self._cached(query, render)
+
+
+class ArticleApiHandler(BaseHTTPRequestHandler):
+    api: ArticleApi
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/tokens":
+            self._send(200, json.dumps(self.api.index.tokens()).encode())
+            return
+        if url.path not in ("/articles", "/search"):
+            self.send_error(404)
+            return
+        try:
+            if url.path == "/search":
+                query = parse_search(url.query)
+            else:
+                query = parse_query(url.query)
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+
+        etag = self.api.etag(query)
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        try:
+            if isinstance(query, SearchQuery):
+                etag, body = self.api.search(query)
+            else:
+                etag, body = self.api.page(query)
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        self._send(200, body, {"ETag": etag, "Cache-Control": "no-cache"})
+
+    def _send(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_article_api(
+    index_path: str,
+    port: int = DEFAULT_PORT,
+    host: str = "127.0.0.1",
+    cache_size: int = DEFAULT_CACHE_SIZE,
+) -> ThreadingHTTPServer:
+    """Serve ``/articles``, ``/search`` and ``/tokens`` on a daemon thread."""
+    api = ArticleApi(ArticleIndex(index_path), cache_size)
+    handler = type("BoundArticleApiHandler", (ArticleApiHandler,), {"api": api})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    logger.info("Serving articles on http://%s:%s/articles", host, port)
+    return server
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python -m market_feed.utils.article_api INDEX [PORT]")
+        sys.exit(1)
+
+    port = int(sys.argv[2]) if len(sys.argv) == 3 else DEFAULT_PORT
+    server = start_article_api(sys.argv[1], port)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
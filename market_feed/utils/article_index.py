@@ -0,0 +1,508 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from market_feed.utils import sharding
+from market_feed.utils.url_utils import article_url_key
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS token_versions (
+    token TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    token TEXT NOT NULL,
+    url_key TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    tag TEXT,
+    source TEXT,
+    title TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL,
+    -- duplicate_key of the stored articles; a missing source or title is ''
+    UNIQUE (token, source, url_key, title)
+);
+CREATE INDEX IF NOT EXISTS articles_timeline ON articles (timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS articles_token_timeline
+    ON articles (token, timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS articles_tag_timeline
+    ON articles (tag, timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS articles_source_timeline
+    ON articles (source, timestamp DESC, id DESC);
+"""
+
+# Full-text index over the stored documents. The text is read from the JSON
+# through a view, so the index holds only the terms, and triggers keep it in
+# step with every write to the articles table. SEARCH_VERSION is stored as the
+# database's user_version and bumped whenever SEARCH_SCHEMA or the articles
+# table changes, so that older databases drop and rebuild the index on open.
+SEARCH_VERSION = 3
+DROP_SEARCH_SCHEMA = """
+DROP TRIGGER IF EXISTS articles_fts_insert;
+DROP TRIGGER IF EXISTS articles_fts_delete;
+DROP TRIGGER IF EXISTS articles_fts_update;
+DROP TABLE IF EXISTS articles_fts;
+DROP VIEW IF EXISTS articles_text;
+"""
+SEARCH_SCHEMA = """
+CREATE VIEW IF NOT EXISTS articles_text AS
+SELECT
+    id,
+    json_extract(data, '$.title') AS title,
+    json_extract(data, '$.snippet') AS snippet,
+    json_extract(data, '$.full_content') AS content
+FROM articles;
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title,
+    snippet,
+    content,
+    content = 'articles_text',
+    content_rowid = 'id',
+    tokenize = 'porter unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts (rowid, title, snippet, content) VALUES (
+        new.id,
+        json_extract(new.data, '$.title'),
+        json_extract(new.data, '$.snippet'),
+        json_extract(new.data, '$.full_content')
+    );
+END;
+CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts (articles_fts, rowid, title, snippet, content) VALUES (
+        'delete',
+        old.id,
+        json_extract(old.data, '$.title'),
+        json_extract(old.data, '$.snippet'),
+        json_extract(old.data, '$.full_content')
+    );
+END;
+CREATE TRIGGER IF NOT EXISTS articles_fts_update AFTER UPDATE ON articles BEGIN
+    INSERT INTO articles_fts (articles_fts, rowid, title, snippet, content) VALUES (
+        'delete',
+        old.id,
+        json_extract(old.data, '$.title'),
+        json_extract(old.data, '$.snippet'),
+        json_extract(old.data, '$.full_content')
+    );
+    INSERT INTO articles_fts (rowid, title, snippet, content) VALUES (
+        new.id,
+        json_extract(new.data, '$.title'),
+        json_extract(new.data, '$.snippet'),
+        json_extract(new.data, '$.full_content')
+    );
+END;
+"""
+# bm25 weights of the title, snippet and content columns
+SEARCH_RANK = "bm25(articles_fts, 10.0, 4.0, 1.0)"
+# Matches ranked per search, newest first. bm25 scores every match it is given,
+# so a broad term would otherwise cost time in proportion to the whole index
+MAX_SEARCH_CANDIDATES = 5000
+
+# Article ids are (timestamp << ID_SEQUENCE_BITS) + a sequence number within
+# the second, so id order is timestamp order. The full-text index walks its
+# matches by id, which makes "newest matches first" an index scan.
+ID_SEQUENCE_BITS = 20
+# The user_version from which the articles table has its current columns,
+# key and ids; older tables are rebuilt on open
+ARTICLES_VERSION = 3
+
+
+class ArticleQuery(NamedTuple):
+    tokens: Tuple[str, ...] = ()
+    tags: Tuple[str, ...] = ()
+    sources: Tuple[str, ...] = ()
+    since: Optional[int] = None
+    until: Optional[int] = None
+    limit: int = DEFAULT_LIMIT
+    # Keyset cursor: (timestamp, id) of the last article of the previous page
+    before: Optional[Tuple[int, int]] = None
+
+
+class ArticlePage(NamedTuple):
+    # Stored article JSON documents, newest first, each with a "token" key
+    articles: List[str]
+    next_cursor: Optional[Tuple[int, int]]
+
+
+class SearchQuery(NamedTuple):
+    # FTS5 query: words, "quoted phrases", AND/OR/NOT, prefix*, title: ...
+    text: str
+    tokens: Tuple[str, ...] = ()
+    tags: Tuple[str, ...] = ()
+    sources: Tuple[str, ...] = ()
+    since: Optional[int] = None
+    until: Optional[int] = None
+    limit: int = DEFAULT_LIMIT
+    offset: int = 0
+
+
+class SearchPage(NamedTuple):
+    # Matching documents, best match first
+    articles: List[str]
+    next_offset: Optional[int]
+    # More than MAX_SEARCH_CANDIDATES articles matched, and only the newest
+    # of them were ranked
+    truncated: bool = False
+
+
+def _placeholders(values: Sequence) -> str:
+    return ",".join("?" * len(values))
+
+
+def _filters(
+    query: Union[ArticleQuery, SearchQuery], prefix: str = ""
+) -> Tuple[List[str], List[Any]]:
+    """Build the token, tag, source and time conditions shared by both query kinds."""
+    conditions, params = [], []
+    for column, values in (
+        ("token", query.tokens),
+        ("tag", query.tags),
+        ("source", query.sources),
+    ):
+        if values:
+            conditions.append(f"{prefix}{column} IN ({_placeholders(values)})")
+            params.extend(values)
+    if query.since is not None:
+        conditions.append(f"{prefix}timestamp >= ?")
+        params.append(query.since)
+    if query.until is not None:
+        conditions.append(f"{prefix}timestamp < ?")
+        params.append(query.until)
+    return conditions, params
+
+
+class ArticleIndex:
+    """
+    Time-sorted SQLite index of every token's stored articles.
+
+    The fetch service replaces a token's rows after each save, and readers
+    page through timelines by keyset cursor, so no query loads a whole news
+    file. Every replace bumps the token's version, which readers use for
+    cache invalidation and ETags. A full-text index over titles, snippets and
+    any full content is maintained alongside, for ranked :meth:`search`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        (version,) = self._conn.execute("PRAGMA user_version").fetchone()
+        if version < ARTICLES_VERSION:
+            self._rebuild_articles()
+        if version < SEARCH_VERSION:
+            # Index the articles stored before full-text search was added, or
+            # with an older search schema
+            self._conn.executescript(DROP_SEARCH_SCHEMA + SEARCH_SCHEMA)
+            self._conn.execute(
+                "INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')"
+            )
+            self._conn.execute(f"PRAGMA user_version = {SEARCH_VERSION}")
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def _rebuild_articles(self):
+        """Rebuild the articles table with the current key and ids that follow timestamps."""
+        # In one transaction, so an interrupted rebuild is rolled back. The
+        # search schema is dropped first, since its triggers would follow the
+        # renamed table, and rebuilt from the new table by the caller
+        self._conn.executescript(
+            "BEGIN;"
+            + DROP_SEARCH_SCHEMA
+            + """
+            DROP INDEX IF EXISTS articles_timeline;
+            DROP INDEX IF EXISTS articles_token_timeline;
+            DROP INDEX IF EXISTS articles_tag_timeline;
+            DROP INDEX IF EXISTS articles_source_timeline;
+            ALTER TABLE articles RENAME TO articles_old;
+            """
+            + SCHEMA
+            + f"""
+            INSERT INTO articles
+                (id, token, url_key, timestamp, tag, source, title, data)
+            SELECT
+                (timestamp << {ID_SEQUENCE_BITS})
+                    + ROW_NUMBER() OVER (PARTITION BY timestamp ORDER BY id) - 1,
+                token, url_key, timestamp, tag,
+                IFNULL(source, ''),
+                IFNULL(json_extract(data, '$.title'), ''),
+                data
+            FROM articles_old;
+            DROP TABLE articles_old;
+            COMMIT;
+            """
+        )
+
+    def _rows(self, token: str, articles: Iterable[Dict[str, Any]]) -> List[Tuple]:
+        rows = [
+            (
+                token,
+                article_url_key(article),
+                int(article.get("timestamp") or 0),
+                article.get("tag"),
+                article.get("source") or "",
+                article.get("title") or "",
+                json.dumps({**article, "token": token}),
+            )
+            for article in articles
+        ]
+        # Oldest first, so that new ids reach the full-text index in ascending
+        # order, which it appends most cheaply
+        rows.sort(key=lambda row: row[2])
+        return rows
+
+    def _write(self, token: str, rows: List[Tuple]) -> int:
+        # A new row takes the next free id of its second, and a row whose
+        # timestamp changed moves to the new second
+        self._conn.executemany(
+            f"""
+            INSERT INTO articles
+                (id, token, url_key, timestamp, tag, source, title, data)
+            VALUES (
+                (
+                    SELECT COALESCE(MAX(id) + 1, ?3 << {ID_SEQUENCE_BITS})
+                    FROM articles
+                    WHERE id >= ?3 << {ID_SEQUENCE_BITS}
+                    AND id < (?3 + 1) << {ID_SEQUENCE_BITS}
+                ),
+                ?1, ?2, ?3, ?4, ?5, ?6, ?7
+            )
+            ON CONFLICT (token, source, url_key, title) DO UPDATE SET
+                id = CASE
+                    WHEN timestamp = excluded.timestamp THEN id ELSE excluded.id
+                END,
+                timestamp = excluded.timestamp,
+                tag = excluded.tag,
+                data = excluded.data
+            WHERE data != excluded.data
+            """,
+            rows,
+        )
+        self._conn.execute(
+            """
+            INSERT INTO token_versions (token, version) VALUES (?, 1)
+            ON CONFLICT (token) DO UPDATE SET version = version + 1
+            """,
+            (token,),
+        )
+        # Just before the transaction commits, so a stale worker's rows never do
+        sharding.check_fence()
+        return self._conn.execute(
+            "SELECT version FROM token_versions WHERE token = ?", (token,)
+        ).fetchone()[0]
+
+    def replace_token(self, token: str, articles: Iterable[Dict[str, Any]]) -> int:
+        """
+        Replace the indexed articles of a token with its current stored articles.
+
+        :param token: Lowercased token symbol
+        :param articles: The token's stored articles
+        :return: The token's new version
+        """
+        rows = self._rows(token, articles)
+        with self._lock, self._conn:
+            # Unchanged rows are left alone, so the full-text index only
+            # re-indexes the articles that were added, changed or dropped
+            self._conn.execute(
+                """
+                CREATE TEMP TABLE IF NOT EXISTS current_keys (
+                    source TEXT, url_key TEXT, title TEXT,
+                    PRIMARY KEY (source, url_key, title)
+                )
+                """
+            )
+            self._conn.execute("DELETE FROM current_keys")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO current_keys VALUES (?, ?, ?)",
+                [(row[4], row[1], row[5]) for row in rows],
+            )
+            self._conn.execute(
+                """
+                DELETE FROM articles WHERE token = ? AND NOT EXISTS (
+                    SELECT 1 FROM current_keys
+                    WHERE current_keys.source = articles.source
+                    AND current_keys.url_key = articles.url_key
+                    AND current_keys.title = articles.title
+                )
+                """,
+                (token,),
+            )
+            return self._write(token, rows)
+
+    def add_articles(self, token: str, articles: Iterable[Dict[str, Any]]) -> int:
+        """
+        Insert or update some articles of a token, leaving its other rows in place.
+
+        :param token: Lowercased token symbol
+        :param articles: New or changed articles
+        :return: The token's new version
+        """
+        rows = self._rows(token, articles)
+        with self._lock, self._conn:
+            return self._write(token, rows)
+
+    def versions(self, tokens: Sequence[str] = ()) -> Dict[str, int]:
+        """Return the versions of the given tokens, or of all tokens."""
+        query = "SELECT token, version FROM token_versions"
+        if tokens:
+            query += f" WHERE token IN ({_placeholders(tokens)})"
+        with self._lock:
+            return dict(self._conn.execute(query, tuple(tokens)).fetchall())
+
+    def tokens(self) -> List[str]:
+        with self._lock:
+            return [
+                token
+                for (token,) in self._conn.execute(
+                    "SELECT token FROM token_versions ORDER BY token"
+                )
+            ]
+
+    def query(self, query: ArticleQuery) -> ArticlePage:
+        """
+        Return one page of articles matching the query, newest first.
+
+        :param query: Filters, page size and cursor
+        :return: Page of stored article documents and the cursor of the next page
+        """
+        conditions, params = _filters(query)
+        if query.before is not None:
+            conditions.append("(timestamp < ? OR (timestamp = ? AND id < ?))")
+            params.extend([query.before[0], query.before[0], query.before[1]])
+
+        limit = max(1, min(query.limit, MAX_LIMIT))
+        sql = "SELECT id, timestamp, data FROM articles"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        next_cursor = (
+            (rows[limit - 1][1], rows[limit - 1][0]) if len(rows) > limit else None
+        )
+        return ArticlePage([data for _, _, data in rows[:limit]], next_cursor)
+
+    def search(self, query: SearchQuery) -> SearchPage:
+        """
+        Return one page of the articles matching a full-text query, best match first.
+
+        Only the newest :data:`MAX_SEARCH_CANDIDATES` matches are ranked, so a
+        broad term costs no more than a selective one, and paging ends there.
+        The page's ``truncated`` flag tells when that cut was made.
+
+        :param query: FTS5 query text, filters, page size and offset
+        :raises ValueError: If the query text is not a valid FTS5 query
+        :return: Page of stored article documents and the offset of the next page
+        """
+        conditions, params = _filters(query, "articles.")
+        # The time range also bounds the ids, which FTS5 seeks to directly
+        # rather than testing every older match against the timestamp
+        if query.since is not None:
+            conditions.append("articles_fts.rowid >= ?")
+            params.append(query.since << ID_SEQUENCE_BITS)
+        if query.until is not None:
+            conditions.append("articles_fts.rowid < ?")
+            params.append(query.until << ID_SEQUENCE_BITS)
+        limit = max(1, min(query.limit, MAX_LIMIT))
+        # Ids follow timestamps, so FTS5 walks the matches newest first and
+        # stops one past the candidate limit; only those are scored. The first
+        # row counts them, to tell whether any older match was left out
+        sql = f"""
+            WITH matches AS MATERIALIZED (
+                SELECT articles.id, articles.timestamp, {SEARCH_RANK} AS score
+                FROM articles_fts
+                JOIN articles ON articles.id = articles_fts.rowid
+                WHERE articles_fts MATCH ? {"".join(f" AND {c}" for c in conditions)}
+                ORDER BY articles_fts.rowid DESC
+                LIMIT ?
+            ), candidates AS (
+                SELECT * FROM matches ORDER BY id DESC LIMIT ?
+            ), page AS (
+                SELECT * FROM candidates
+                ORDER BY score, timestamp DESC
+                LIMIT ? OFFSET ?
+            )
+            SELECT COUNT(*), NULL FROM matches
+            UNION ALL
+            SELECT * FROM (
+                SELECT NULL, articles.data FROM page
+                JOIN articles ON articles.id = page.id
+                ORDER BY page.score, page.timestamp DESC
+            )
+        """
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    sql,
+                    [
+                        query.text,
+                        *params,
+                        MAX_SEARCH_CANDIDATES + 1,
+                        MAX_SEARCH_CANDIDATES,
+                        limit + 1,
+                        max(query.offset, 0),
+                    ],
+                ).fetchall()
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"Invalid search query {query.text!r}: {e}") from e
+        (matched, _), *rows = rows
+        next_offset = max(query.offset, 0) + limit if len(rows) > limit else None
+        return SearchPage(
+            [data for _, data in rows[:limit]],
+            next_offset,
+            matched > MAX_SEARCH_CANDIDATES,
+        )
+
+
+# Kept up to date by get_content when the article index is enabled
+shared_index: Optional[ArticleIndex] = None
+
+
+def set_article_index(index: Optional[ArticleIndex]):
+    global shared_index
+    shared_index = index
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python -m market_feed.utils.article_index NEWS_DIR INDEX")
+        sys.exit(1)
+
+    from market_feed.utils.article_store import COMPACT_EXTENSION, load_articles
+
+    news_dir, index_path = sys.argv[1:]
+    index = ArticleIndex(index_path)
+    for name in sorted(os.listdir(news_dir)):
+        for extension in (".json", COMPACT_EXTENSION):
+            if name.endswith(f"_news{extension}"):
+                token = name[: -len(f"_news{extension}")]
+                articles = load_articles(os.path.join(news_dir, name))
+                index.replace_token(token, articles)
+                print(f"Indexed {len(articles)} articles for {token}")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-import requests
+from market_feed.utils import http_utils
 
 CHAINIDS_URL = (
     "https://raw.githubusercontent.com/DefiLlama/chainlist/main/constants/chainIds.json"
@@ -8,8 +8,8 @@ RPCS_URL = "https://chainlist.org/rpcs.json"
 
 def load_data():
     """Load chain IDs and RPCs data from URLs."""
-    chain_ids = requests.get(CHAINIDS_URL).json()
-    rpcs = requests.get(RPCS_URL).json()
+    chain_ids = http_utils.get(CHAINIDS_URL, retries=2).json()
+    rpcs = http_utils.get(RPCS_URL, retries=2).json()
     return chain_ids, rpcs
 
 
@@ -0,0 +1,348 @@
+import json
+import sqlite3
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+from urllib.parse import parse_qs, urlsplit
+
+from market_feed.utils import sharding
+from market_feed.utils.logger import get_logger
+
+logger = get_logger()
+
+DEFAULT_PORT = 9110
+DEFAULT_RETENTION = 100000
+DEFAULT_BATCH = 500
+# Idle streams send a comment this often, which also detects closed connections
+KEEPALIVE_INTERVAL = 15.0
+# How often an idle stream checks whether the server is shutting down
+STOP_CHECK_INTERVAL = 1.0
+# How often a reader checks for events published by another process
+POLL_INTERVAL = 0.2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    offset INTEGER PRIMARY KEY AUTOINCREMENT,
+    token TEXT NOT NULL,
+    created REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS consumers (
+    name TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL
+);
+"""
+
+
+class Event(NamedTuple):
+    offset: int
+    token: str
+    # The article's JSON document, with a "token" key
+    data: str
+
+
+class EventBatch(NamedTuple):
+    events: List[Event]
+    # Offset to read after next; past the events other tokens' filters skipped
+    next_offset: int
+
+
+class Changelog:
+    """
+    Append-only SQLite log of newly accepted articles, read by offset.
+
+    Each published article gets the next offset. Consumers read the events
+    after the last offset they processed and may commit that offset under a
+    name, so they resume where they stopped after a restart or disconnect.
+    :meth:`wait` wakes readers in this process as soon as events are
+    published and polls the store for events published by other processes.
+    Only the newest ``retention`` events are kept.
+    """
+
+    def __init__(self, path: str, retention: int = DEFAULT_RETENTION):
+        self.path = path
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._published = threading.Condition(self._lock)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    @classmethod
+    def from_config(
+        cls, settings: Optional[Dict], output_dir: str
+    ) -> Optional["Changelog"]:
+        """Build a changelog from the ``changelog`` config section, if enabled."""
+        if not settings or not settings.get("enabled"):
+            return None
+        return cls(
+            settings.get("path", f"{output_dir}/changelog.db"),
+            settings.get("retention", DEFAULT_RETENTION),
+        )
+
+    def close(self):
+        self._conn.close()
+
+    def publish(self, token: str, articles: Iterable[Dict[str, Any]]) -> int:
+        """
+        Append one event per article.
+
+        :param token: Lowercased token symbol
+        :param articles: Newly accepted articles
+        :return: The offset of the last event, or the current head if there were none
+        """
+        now = time.time()
+        rows = [
+            (token, now, json.dumps({**article, "token": token}))
+            for article in articles
+        ]
+        with self._published, self._conn:
+            self._conn.executemany(
+                "INSERT INTO events (token, created, data) VALUES (?, ?, ?)", rows
+            )
+            head = self._head()
+            if rows and self.retention:
+                self._conn.execute(
+                    "DELETE FROM events WHERE offset <= ?", (head - self.retention,)
+                )
+            # Just before the transaction commits, so a stale worker's events never do
+            sharding.check_fence()
+            if rows:
+                self._published.notify_all()
+        return head
+
+    def _head(self) -> int:
+        return self._conn.execute("SELECT MAX(offset) FROM events").fetchone()[0] or 0
+
+    def head(self) -> int:
+        """Offset of the newest event, 0 if there are none."""
+        with self._lock:
+            return self._head()
+
+    def read(
+        self, after: int, limit: int = DEFAULT_BATCH, tokens: Sequence[str] = ()
+    ) -> EventBatch:
+        """
+        Return up to ``limit`` events after the offset ``after``, oldest first.
+
+        :param after: Last offset the reader has seen; 0 reads from the start
+        :param limit: Maximum number of events
+        :param tokens: Lowercased symbols to keep, or all tokens if empty
+        :return: The events and the offset the next read should start after
+        """
+        sql = "SELECT offset, token, data FROM events WHERE offset > ? AND offset <= ?"
+        if tokens:
+            sql += f" AND token IN ({','.join('?' * len(tokens))})"
+        sql += " ORDER BY offset LIMIT ?"
+        with self._lock:
+            # Bounded by the head, so next_offset never skips a later event
+            head = self._head()
+            params = [after, head, *tokens, limit]
+            events = [Event(*row) for row in self._conn.execute(sql, params)]
+        if len(events) == limit:
+            return EventBatch(events, events[-1].offset)
+        return EventBatch(events, max(after, head))
+
+    def wait(self, after: int, timeout: float) -> bool:
+        """
+        Block until there is an event after ``after`` or ``timeout`` seconds pass.
+
+        :return: Whether there is a newer event
+        """
+        deadline = time.monotonic() + timeout
+        with self._published:
+            while self._head() <= after:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                self._published.wait(min(left, POLL_INTERVAL))
+        return True
+
+    def offset(self, consumer: str) -> int:
+        """Last offset committed by a consumer, 0 if it never committed."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT offset FROM consumers WHERE name = ?", (consumer,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def commit(self, consumer: str, offset: int):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO consumers (name, offset) VALUES (?, ?)",
+                (consumer, offset),
+            )
+
+    def subscribe(
+        self, consumer: str, tokens: Sequence[str] = (), timeout: Optional[float] = None
+    ) -> Iterator[Event]:
+        """
+        Yield events from a consumer's committed offset on, waiting for new ones.
+
+        The offset is committed once every event of a batch has been taken, so
+        after a crash the consumer gets the unfinished batch again rather than
+        missing it.
+
+        :param consumer: Name the offset is committed under
+        :param tokens: Lowercased symbols to keep, or all tokens if empty
+        :param timeout: Stop after this many seconds without events; never if None
+        """
+        after = self.offset(consumer)
+        while True:
+            batch = self.read(after, tokens=tokens)
+            yield from batch.events
+            if batch.next_offset != after:
+                after = batch.next_offset
+                self.commit(consumer, after)
+            if batch.events:
+                continue
+            if not self.wait(after, float("inf") if timeout is None else timeout):
+                return
+
+
+# Published to by get_content when the changelog is enabled
+shared_changelog: Optional[Changelog] = None
+
+
+def set_changelog(changelog: Optional[Changelog]):
+    global shared_changelog
+    shared_changelog = changelog
+
+
+class EventStreamHandler(BaseHTTPRequestHandler):
+    """
+    Server-sent event stream of the changelog at ``/events``.
+
+    Events start after the ``Last-Event-ID`` header, the ``after`` parameter
+    or the committed offset of the ``consumer`` parameter, in that order, and
+    otherwise at the head. ``token`` takes comma-separated or repeated symbols.
+    With ``consumer`` set, the offset is committed after each batch is sent.
+    """
+
+    changelog: Changelog
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != "/events":
+            self.send_error(404)
+            return
+        params = parse_qs(url.query)
+        consumer = params.get("consumer", [None])[-1]
+        tokens = tuple(
+            sorted(
+                {
+                    token.lower()
+                    for item in params.get("token", [])
+                    for token in item.split(",")
+                    if token
+                }
+            )
+        )
+        try:
+            if self.headers.get("Last-Event-ID"):
+                after = int(self.headers["Last-Event-ID"])
+            elif "after" in params:
+                after = int(params["after"][-1])
+            elif consumer:
+                after = self.changelog.offset(consumer)
+            else:
+                after = self.changelog.head()
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        last_write = time.monotonic()
+        try:
+            while not self.server.stopped.is_set():
+                batch = self.changelog.read(after, tokens=tokens)
+                if batch.events:
+                    self.wfile.write(
+                        "".join(
+                            f"id: {event.offset}\nevent: article\ndata: {event.data}\n\n"
+                            for event in batch.events
+                        ).encode()
+                    )
+                    self.wfile.flush()
+                    last_write = time.monotonic()
+                if consumer and batch.next_offset != after:
+                    self.changelog.commit(consumer, batch.next_offset)
+                after = batch.next_offset
+                if batch.events or self.changelog.wait(after, STOP_CHECK_INTERVAL):
+                    continue
+                if time.monotonic() - last_write >= KEEPALIVE_INTERVAL:
+                    self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+                    last_write = time.monotonic()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class EventStreamServer(ThreadingHTTPServer):
+    """Threading server whose open streams end when it shuts down or closes."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stopped = threading.Event()
+        self.streams: List[threading.Thread] = []
+
+    def process_request(self, request, client_address):
+        # Daemon threads, as in ThreadingHTTPServer, but kept to be joined on close
+        thread = threading.Thread(
+            target=self.process_request_thread,
+            args=(request, client_address),
+            daemon=True,
+        )
+        self.streams = [stream for stream in self.streams if stream.is_alive()]
+        self.streams.append(thread)
+        thread.start()
+
+    def shutdown(self):
+        self.stopped.set()
+        super().shutdown()
+
+    def server_close(self):
+        self.stopped.set()
+        super().server_close()
+        for thread in self.streams:
+            thread.join(STOP_CHECK_INTERVAL * 2)
+
+
+def start_event_stream(
+    changelog: Changelog, port: int = DEFAULT_PORT, host: str = "127.0.0.1"
+) -> EventStreamServer:
+    """Serve the changelog as server-sent events on ``/events`` on a daemon thread."""
+    handler = type(
+        "BoundEventStreamHandler", (EventStreamHandler,), {"changelog": changelog}
+    )
+    server = EventStreamServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    logger.info("Streaming new articles on http://%s:%s/events", host, port)
+    return server
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python -m market_feed.utils.changelog CHANGELOG [PORT]")
+        sys.exit(1)
+
+    port = int(sys.argv[2]) if len(sys.argv) == 3 else DEFAULT_PORT
+    server = start_event_stream(Changelog(sys.argv[1]), port)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,11 @@ from typing import List, Optional, Tuple
 from web3 import Web3
 from web3.exceptions import ContractLogicError
 
+from . import http_utils
 from .chainlist_utils import get_rpc_urls
 
+RPC_TIMEOUT = 10
+
 # ABI for ERC20 token interface (minimal for name and symbol)
 ERC20_ABI = [
     {
@@ -32,14 +35,21 @@ def get_web3_instance(rpc_url: str) -> Optional[Web3]:
         rpc_url (str): The RPC URL
 
     Returns:
-        Optional[Web3]: A connected Web3 instance or None if connection fails
+        Optional[Web3]: A connected Web3 instance or None if connection fails,
+        or if the RPC's circuit is open
     """
+    timeout = http_utils.request_timeout(RPC_TIMEOUT)
+    breaker = http_utils.breaker_for(http_utils.host_of(rpc_url))
+    if not breaker.allow():
+        return None
     try:
-        web3 = Web3(Web3.HTTPProvider(rpc_url))
+        web3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={"timeout": timeout}))
         if web3.is_connected():
+            breaker.record_success()
             return web3
     except Exception:
         pass
+    breaker.record_failure()
     return None
 
 
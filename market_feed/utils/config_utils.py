@@ -1,6 +1,26 @@
+from typing import Dict, List
+
 import yaml
 
 
 def load_config(config_file="config.yaml"):
     with open(config_file, "r") as file:
         return yaml.safe_load(file)
+
+
+def load_tokens(config: Dict) -> List[Dict]:
+    """
+    Load the active tokens, from the token registry when one is configured.
+
+    Tokens marked inactive (e.g. delisted from Curve) are skipped.
+    """
+    registry_path = config.get("token_registry")
+    if registry_path:
+        from market_feed.utils.token_registry import TokenRegistry
+
+        registry = TokenRegistry(registry_path)
+        try:
+            return registry.tokens()
+        finally:
+            registry.close()
+    return [token for token in config.get("tokens", []) if token.get("active", True)]
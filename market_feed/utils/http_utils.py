@@ -0,0 +1,375 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Collection, Dict, Iterator, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+import requests
+
+from market_feed.utils.logger import get_logger
+
+logger = get_logger()
+
+DEFAULT_TIMEOUT = 30
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 60.0
+DEFAULT_RETRY_RATIO = 0.2
+DEFAULT_RETRY_BURST = 10
+DEFAULT_BACKOFF = 0.5
+
+# Responses that say the host is struggling rather than that the request was wrong
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+TimeoutValue = Union[None, float, Tuple[Optional[float], Optional[float]]]
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of calling a host whose circuit breaker is open."""
+
+
+class DeadlineExceeded(requests.Timeout):
+    """Raised instead of making a request once the job's deadline has passed."""
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls fail fast for ``reset_timeout`` seconds. The circuit then goes
+    half-open and lets a single probe through: a success closes it again and
+    a failure re-opens it for another ``reset_timeout``.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(
+        self,
+        host: str,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.host = host
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead; in half-open state only the probe may."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = self.clock()
+            if self.state == self.OPEN:
+                if now - self.opened_at < self.reset_timeout:
+                    return False
+                logger.info("Circuit for %s is half-open, probing", self.host)
+                self.state = self.HALF_OPEN
+            elif (
+                self.probe_started is not None
+                and now - self.probe_started < self.reset_timeout
+            ):
+                # Another caller's probe is still in flight
+                return False
+            self.probe_started = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Circuit for %s closed", self.host)
+            self.state = self.CLOSED
+            self.failures = 0
+            self.probe_started = None
+
+    def release(self):
+        """End a call that never reached the host, freeing the probe slot."""
+        with self._lock:
+            self.probe_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self.failures >= self.failure_threshold
+            ):
+                logger.warning(
+                    "Circuit for %s opened after %s failures", self.host, self.failures
+                )
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+                self.probe_started = None
+
+
+class RetryBudget:
+    """
+    Per-host allowance of retries as a fraction of requests.
+
+    Every request deposits ``ratio`` of a retry, up to ``burst`` retries, and
+    every retry withdraws one; when the budget is spent failures are returned
+    at once, so retries cannot multiply the load on a host that is down.
+    """
+
+    def __init__(
+        self, ratio: float = DEFAULT_RETRY_RATIO, burst: int = DEFAULT_RETRY_BURST
+    ):
+        self.ratio = ratio
+        self.burst = burst
+        self.balance = float(burst)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.balance = min(self.burst, self.balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.balance < 1:
+                return False
+            self.balance -= 1
+            return True
+
+
+# Settings of the breakers and budgets created from now on; see configure()
+_settings = {
+    "failure_threshold": DEFAULT_FAILURE_THRESHOLD,
+    "reset_timeout": DEFAULT_RESET_TIMEOUT,
+    "retry_ratio": DEFAULT_RETRY_RATIO,
+    "retry_burst": DEFAULT_RETRY_BURST,
+}
+_hosts_lock = threading.Lock()
+_breakers: Dict[str, CircuitBreaker] = {}
+_retry_budgets: Dict[str, RetryBudget] = {}
+
+
+def configure(settings: Optional[Dict]):
+    """Apply the ``outbound`` config section, resetting every host's state."""
+    settings = settings or {}
+    with _hosts_lock:
+        for key in _settings:
+            if key in settings:
+                _settings[key] = settings[key]
+        _breakers.clear()
+        _retry_budgets.clear()
+
+
+def breaker_for(host: str) -> CircuitBreaker:
+    with _hosts_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker(
+                host, _settings["failure_threshold"], _settings["reset_timeout"]
+            )
+        return breaker
+
+
+def retry_budget_for(host: str) -> RetryBudget:
+    with _hosts_lock:
+        budget = _retry_budgets.get(host)
+        if budget is None:
+            budget = _retry_budgets[host] = RetryBudget(
+                _settings["retry_ratio"], _settings["retry_burst"]
+            )
+        return budget
+
+
+def host_of(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+
+# Monotonic time by which the current job must finish; None for no deadline
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "deadline", default=None
+)
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Give every request made inside the block at most ``seconds`` in total.
+
+    Nested deadlines can only shorten the outer one; ``None`` adds no deadline.
+    """
+    if seconds is None:
+        yield
+        return
+    expires = time.monotonic() + seconds
+    outer = _deadline.get()
+    if outer is not None:
+        expires = min(expires, outer)
+    reset_token = _deadline.set(expires)
+    try:
+        yield
+    finally:
+        _deadline.reset(reset_token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None without one."""
+    expires = _deadline.get()
+    return None if expires is None else expires - time.monotonic()
+
+
+def request_timeout(timeout: TimeoutValue) -> TimeoutValue:
+    """
+    Cap a requests-style timeout by the time left before the deadline.
+
+    :raises DeadlineExceeded: If the deadline has already passed
+    """
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("Job deadline exceeded")
+    if isinstance(timeout, tuple):
+        return tuple(left if part is None else min(part, left) for part in timeout)
+    return left if timeout is None else min(timeout, left)
+
+
+def _is_failure(error: BaseException) -> bool:
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+@contextmanager
+def guarded(host: str) -> Iterator[CircuitBreaker]:
+    """
+    Run a call to ``host`` made by a client other than :func:`request` through
+    the host's circuit breaker. Connection errors and timeouts count as
+    failures; the block completing, or raising anything else, as a success.
+
+    :raises CircuitOpenError: If the circuit is open
+    """
+    breaker = breaker_for(host)
+    if not breaker.allow():
+        raise CircuitOpenError(f"Circuit for {host} is open")
+    try:
+        yield breaker
+    except (CircuitOpenError, DeadlineExceeded):
+        breaker.release()
+        raise
+    except Exception as e:
+        if _is_failure(e):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+    breaker.record_success()
+
+
+def request(
+    method: str,
+    url: str,
+    timeout: TimeoutValue = DEFAULT_TIMEOUT,
+    retries: int = 0,
+    backoff: float = DEFAULT_BACKOFF,
+    session: Optional[requests.Session] = None,
+    proxy_statuses: Collection[int] = (),
+    **kwargs,
+) -> requests.Response:
+    """
+    Make an HTTP request through the host's circuit breaker, within the current
+    deadline and retry budget.
+
+    Connection errors, timeouts, 429 and 5xx responses count as failures and
+    are retried up to ``retries`` times with exponential backoff, while the
+    host's retry budget and the deadline allow.
+
+    :param method: HTTP method
+    :param url: URL to request
+    :param timeout: Request timeout in seconds, or a (connect, read) tuple
+    :param retries: Retries after the first attempt
+    :param backoff: Delay before the first retry, doubled for each further one
+    :param session: Session to send the request with, such as a proxy's
+    :param proxy_statuses: Statuses that mean the proxy refused the request; they
+        are returned at once and not counted for or against the host
+    :param kwargs: Passed on to ``requests.request``
+    :raises requests.exceptions.ProxyError: If the proxy failed; not counted against the host
+    :raises CircuitOpenError: If the host's circuit is open
+    :raises DeadlineExceeded: If the deadline passes before a response
+    :return: The last response; 4xx and 5xx responses are returned, not raised
+    """
+    host = host_of(url)
+    breaker = breaker_for(host)
+    budget = retry_budget_for(host)
+    budget.deposit()
+    attempt = 0
+    while True:
+        attempt_timeout = request_timeout(timeout)
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit for {host} is open")
+        try:
+            response = (session or requests).request(
+                method, url, timeout=attempt_timeout, **kwargs
+            )
+        except requests.exceptions.ProxyError:
+            # The proxy failed, which says nothing about the host
+            breaker.release()
+            raise
+        except requests.RequestException as e:
+            if not _is_failure(e):
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if not _may_retry(host, budget, attempt, retries, backoff):
+                raise
+            logger.warning("Request to %s failed: %s", url, e)
+        else:
+            if response.status_code in proxy_statuses:
+                breaker.release()
+                return response
+            if response.status_code not in RETRYABLE_STATUSES:
+                breaker.record_success()
+                return response
+            breaker.record_failure()
+            if not _may_retry(host, budget, attempt, retries, backoff):
+                return response
+            response.close()
+            logger.warning("Request to %s got HTTP %s", url, response.status_code)
+        time.sleep(backoff * 2**attempt)
+        attempt += 1
+
+
+def _may_retry(
+    host: str, budget: RetryBudget, attempt: int, retries: int, backoff: float
+) -> bool:
+    if attempt >= retries:
+        return False
+    left = remaining()
+    if left is not None and left <= backoff * 2**attempt:
+        return False
+    if not budget.withdraw():
+        logger.warning("Retry budget for %s exhausted", host)
+        return False
+    return True
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def conditional_get_json(
+    url: str, etag: Optional[str] = None, timeout: float = DEFAULT_TIMEOUT
+) -> Tuple[Optional[Any], Optional[str]]:
+    """
+    Fetch a JSON document, revalidating against a previously seen ETag.
+
+    :param url: URL to fetch
+    :param etag: ETag returned by the previous successful fetch, if any
+    :param timeout: Request timeout in seconds
+    :return: Tuple of (payload, etag); payload is None when the server answered 304
+    """
+    headers = {"If-None-Match": etag} if etag else {}
+    response = get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304:
+        return None, etag
+    response.raise_for_status()
+    return response.json(), response.headers.get("ETag")
@@ -2,19 +2,31 @@ import json
 import os
 from typing import Any, List
 
+from market_feed.utils import metrics, sharding
 
+
+@metrics.instrument("load_from_json")
 def load_from_json(file_path: str) -> List[Any]:
     """Load a list of dictionaries from a JSON file."""
     if os.path.exists(file_path):
         with open(file_path, "r") as f:
-            return json.load(f)
+            data = json.load(f)
+            metrics.inc("bytes", f.tell(), kind="json_read")
+            return data
     return []
 
 
+@metrics.instrument("save_to_json")
 def save_to_json(data: List[Any], file_path: str) -> None:
-    """Save a list of dictionaries to a JSON file."""
-    with open(file_path, "w") as f:
+    """Save a list of dictionaries to a JSON file, replacing it atomically."""
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "w") as f:
         json.dump(data, f, indent=2)
+        metrics.inc("bytes", f.tell(), kind="json_write")
+        f.flush()
+        os.fsync(f.fileno())
+    sharding.check_fence()
+    os.replace(tmp_path, file_path)
 
 
 def append_to_json(item: Any, file_path: str) -> None:
@@ -22,3 +34,20 @@ def append_to_json(item: Any, file_path: str) -> None:
     existing_data = load_from_json(file_path)
     existing_data.append(item)
     save_to_json(existing_data, file_path)
+
+
+def read_json_lines(file_path: str) -> List[str]:
+    """
+    Read the complete lines of an append-only JSON-lines file.
+
+    A write interrupted mid-line leaves a partial last line behind. It is cut
+    from the file, so that the next append starts on a line of its own.
+    """
+    with open(file_path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+            f.flush()
+            os.fsync(f.fileno())
+    return data[:end].decode().splitlines()
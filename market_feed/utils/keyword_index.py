@@ -0,0 +1,216 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from market_feed.utils.relevance_analyzer import (
+    calculate_date_relevance,
+    combine_content_relevance,
+    combine_relevance,
+    combine_text_relevance,
+    unique_word_ratio,
+)
+from market_feed.utils.token_registry import token_key
+
+DEFAULT_CACHE_SIZE = 50_000
+
+
+def token_phrases(token: Dict) -> Tuple[List[str], List[str]]:
+    """
+    Return the keywords and additional phrases a token's articles are scored by.
+
+    :param token: Token configuration
+    :return: Keywords (name, symbol and mandatory phrases) and additional phrases
+    """
+    keywords = [token["name"], token["symbol"]] + token.get("mandatory_phrases", [])
+    return keywords, token.get("additional_phrases", [])
+
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton that counts many phrases in a single pass over a text.
+
+    Counts are non-overlapping and leftmost-first per phrase, so they equal
+    ``text.count(phrase)`` for every phrase.
+    """
+
+    def __init__(self, phrases: List[str]):
+        self.phrases = phrases
+        self.lengths = [len(phrase) for phrase in phrases]
+        self.empty = [index for index, phrase in enumerate(phrases) if not phrase]
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail = [0]
+        self.outputs: List[List[int]] = [[]]
+
+        for index, phrase in enumerate(phrases):
+            if not phrase:
+                continue
+            state = 0
+            for char in phrase:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.outputs.append([])
+                state = next_state
+            self.outputs[state].append(index)
+
+        # Breadth-first, so every fail target is complete before it is used
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.outputs[next_state] = (
+                    self.outputs[next_state] + self.outputs[self.fail[next_state]]
+                )
+
+    def count(self, text: str) -> Dict[int, int]:
+        """
+        Count the occurrences of every phrase in ``text``.
+
+        :param text: Text to scan
+        :return: Occurrences by phrase index, for phrases that occur at least once
+        """
+        counts: Dict[int, int] = {index: len(text) + 1 for index in self.empty}
+        next_start: Dict[int, int] = {}
+        goto, fail, outputs, lengths = self.goto, self.fail, self.outputs, self.lengths
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in outputs[state]:
+                start = position - lengths[index] + 1
+                if start >= next_start.get(index, 0):
+                    counts[index] = counts.get(index, 0) + 1
+                    next_start[index] = position + 1
+        return counts
+
+
+class KeywordIndex:
+    """
+    Inverted index from the phrases of every token to the tokens that use them.
+
+    One scan of an article's title, snippet and full content yields the
+    candidate tokens and their phrase counts; only candidates get a content
+    score, and the tokenization behind the unique word ratio runs once per
+    text rather than once per token. Every other token scores on date
+    relevance alone, exactly as the per-token analysis would.
+
+    Results are cached per article text, so an article shared by many tokens'
+    feeds is scanned once.
+    """
+
+    def __init__(self, tokens: List[Dict], cache_size: int = DEFAULT_CACHE_SIZE):
+        phrase_ids: Dict[str, int] = {}
+        self.token_phrases: Dict[str, Tuple[List[str], List[str]]] = {}
+        self.keyword_ids: Dict[str, List[int]] = {}
+        self.additional_ids: Dict[str, List[int]] = {}
+        self.postings: Dict[int, List[str]] = {}
+
+        for token in tokens:
+            key = token_key(token)
+            keywords, additional_phrases = token_phrases(token)
+            self.token_phrases[key] = (keywords, additional_phrases)
+            for target, phrases in (
+                (self.keyword_ids, keywords),
+                (self.additional_ids, additional_phrases),
+            ):
+                # Repeated phrases are kept, since each one adds to the token's counts
+                ids = [
+                    phrase_ids.setdefault(phrase.lower(), len(phrase_ids))
+                    for phrase in phrases
+                ]
+                target[key] = ids
+                for phrase_id in ids:
+                    postings = self.postings.setdefault(phrase_id, [])
+                    if key not in postings:
+                        postings.append(key)
+
+        self.matcher = PhraseMatcher(list(phrase_ids))
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, str, str], Dict[str, float]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.token_phrases)
+
+    def covers(self, token: Dict) -> bool:
+        """Whether the index was built from this token's current phrases."""
+        return self.token_phrases.get(token_key(token)) == token_phrases(token)
+
+    def _text_relevance(self, text: str) -> Dict[str, float]:
+        text = text.lower()
+        counts = self.matcher.count(text)
+        candidates = {key for phrase_id in counts for key in self.postings[phrase_id]}
+        if not candidates:
+            return {}
+
+        unique_ratio = unique_word_ratio(text)
+        return {
+            key: combine_text_relevance(
+                sum(counts.get(phrase_id, 0) for phrase_id in self.keyword_ids[key]),
+                sum(counts.get(phrase_id, 0) for phrase_id in self.additional_ids[key]),
+                unique_ratio,
+            )
+            for key in candidates
+        }
+
+    def content_relevance(self, article: Dict) -> Dict[str, float]:
+        """
+        Score an article's content against every indexed token at once.
+
+        :param article: Article dictionary
+        :return: Content relevance by token key, for candidate tokens only
+        """
+        full_content = article.get("full_content") or ""
+        cache_key = (article["title"], article["snippet"], full_content)
+        with self._lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                self._cache.move_to_end(cache_key)
+                return cached
+
+        title = self._text_relevance(article["title"])
+        snippet = self._text_relevance(article["snippet"])
+        content = self._text_relevance(full_content) if full_content else {}
+        relevance = {
+            key: combine_content_relevance(
+                title.get(key, 0.0), snippet.get(key, 0.0), content.get(key, 0.0)
+            )
+            for key in title.keys() | snippet.keys() | content.keys()
+        }
+
+        with self._lock:
+            self._cache[cache_key] = relevance
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return relevance
+
+    def score(self, article: Dict, token: Dict) -> float:
+        """
+        Score a single article for one token, as analyze_articles does on its own.
+
+        :param article: Article dictionary
+        :param token: Token configuration, which must be covered by the index
+        :return: Relevance score
+        """
+        content_relevance = self.content_relevance(article).get(token_key(token), 0.0)
+        date_relevance = calculate_date_relevance([article])
+        return combine_relevance(content_relevance, next(iter(date_relevance.values())))
+
+
+# Built from every configured token and swapped on token reloads
+shared_index: Optional[KeywordIndex] = None
+
+
+def set_keyword_index(index: Optional[KeywordIndex]):
+    global shared_index
+    shared_index = index
@@ -1,4 +1,15 @@
+import atexit
+import contextvars
+import copy
+import json
 import logging
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Dict, Optional, Tuple
 
 from rich.console import Console
 from rich.logging import RichHandler
@@ -17,17 +28,173 @@ custom_theme = Theme(
 # Create a Rich console with our custom theme
 console = Console(theme=custom_theme)
 
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+DATE_FORMAT = "[%X]"
+
 # Configure the Rich logger
 logging.basicConfig(
     level="INFO",
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    datefmt="[%X]",
+    format=LOG_FORMAT,
+    datefmt=DATE_FORMAT,
     handlers=[RichHandler(console=console, rich_tracebacks=True)],
 )
 
 # Create a logger
 logger = logging.getLogger("market_feed")
 
+# Pass as ``extra`` to mark a high-volume message for per-token sampling
+SAMPLED = {"sample": True}
+
+DEFAULT_SAMPLE_BURST = 20
+DEFAULT_SAMPLE_INTERVAL = 60.0
+
 
 def get_logger():
     return logger
+
+
+class TokenFilter(logging.Filter):
+    """Attach the token being processed, from a context variable, to each record."""
+
+    def __init__(self, current_token: contextvars.ContextVar):
+        super().__init__()
+        self.current_token = current_token
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.token = self.current_token.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Per-token rate limit for messages logged with ``extra=SAMPLED``.
+
+    Each token may log ``burst`` records of one message template per
+    ``interval`` seconds. The rest are dropped and counted, and the count is
+    reported on the first record let through in the next interval. Records
+    that are not marked pass untouched.
+    """
+
+    def __init__(
+        self,
+        burst: int = DEFAULT_SAMPLE_BURST,
+        interval: float = DEFAULT_SAMPLE_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.clock = clock
+        # (token, template) -> [window start, records let through, records dropped]
+        self._windows: Dict[Tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "sample", False):
+            return True
+        key = (getattr(record, "token", ""), str(record.msg))
+        now = self.clock()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window is not None else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects for log shippers."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "token", ""):
+            entry["token"] = record.token
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+class _RichHandler(RichHandler):
+    def render_message(self, record: logging.LogRecord, message: str):
+        if getattr(record, "suppressed", 0):
+            message = f"{message} (+{record.suppressed} similar suppressed)"
+        return super().render_message(record, message)
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Arguments may change once the caller moves on, so interpolate them
+        # now; rendering, including tracebacks, is left to the writer thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class _QueueListener(QueueListener):
+    def stop(self):
+        # Stopped at exit as well, so a second call is a no-op
+        if self._thread is not None:
+            super().stop()
+
+
+def configure_logging(config: Dict) -> Optional[QueueListener]:
+    """
+    Apply the ``logging`` section of the config to the root logger.
+
+    ``format`` selects the rich console (the default) or JSON lines on stdout.
+    ``queue`` moves rendering and writing to a background thread, so logging
+    calls only enqueue records. ``sampling`` rate-limits high-volume messages
+    per token.
+
+    :param config: Service configuration
+    :return: The background queue listener when ``queue`` is set, stopped at exit
+    """
+    from market_feed.utils.metrics import current_token
+
+    settings = config.get("logging") or {}
+    if settings.get("format") == "json":
+        target = logging.StreamHandler(sys.stdout)
+        target.setFormatter(JsonFormatter())
+    else:
+        target = _RichHandler(console=console, rich_tracebacks=True)
+        target.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT))
+
+    listener = None
+    if settings.get("queue"):
+        handler = _QueueHandler(queue.SimpleQueue())
+        listener = _QueueListener(handler.queue, target, respect_handler_level=True)
+        listener.start()
+        # Flushes the records still queued when the service exits
+        atexit.register(listener.stop)
+    else:
+        handler = target
+
+    handler.addFilter(TokenFilter(current_token))
+    sampling = settings.get("sampling") or {}
+    if sampling.get("enabled"):
+        handler.addFilter(
+            SamplingFilter(
+                sampling.get("burst", DEFAULT_SAMPLE_BURST),
+                sampling.get("interval", DEFAULT_SAMPLE_INTERVAL),
+            )
+        )
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(settings.get("level", "INFO"))
+    return listener
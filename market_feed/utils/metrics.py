@@ -0,0 +1,196 @@
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+
+from market_feed.utils.logger import get_logger
+
+logger = get_logger()
+
+PREFIX = "market_feed"
+DEFAULT_PORT = 9108
+DEFAULT_SUMMARY_INTERVAL = 300
+
+# Checked before any work is done, so instrumentation is a single branch when off
+_enabled = False
+_lock = threading.Lock()
+_values: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+_types: Dict[str, str] = {}
+
+current_token: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "current_token", default=""
+)
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _values.clear()
+        _types.clear()
+
+
+def _add(name: str, metric_type: str, value: float, labels: Dict[str, str]):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _types.setdefault(name, metric_type)
+        _values[key] = _values.get(key, 0.0) + value
+
+
+def inc(name: str, value: float = 1, **labels: str):
+    """Increment a counter, labelled with the token currently being processed."""
+    if not _enabled:
+        return
+    _add(f"{name}_total", "counter", value, {"token": current_token.get(), **labels})
+
+
+def observe(stage: str, seconds: float, articles: Optional[int] = None):
+    """Record one timed run of a pipeline stage."""
+    if not _enabled:
+        return
+    labels = {"stage": stage, "token": current_token.get()}
+    _add("stage_seconds_sum", "summary", seconds, labels)
+    _add("stage_seconds_count", "summary", 1, labels)
+    if articles is not None:
+        _add("stage_articles_total", "counter", articles, labels)
+
+
+@contextmanager
+def token_context(symbol: str):
+    """Attribute metrics recorded inside the block to ``symbol``."""
+    reset_token = current_token.set(symbol)
+    try:
+        yield
+    finally:
+        current_token.reset(reset_token)
+
+
+def instrument(stage: str) -> Callable:
+    """
+    Time every call of the decorated function as a pipeline stage.
+
+    List results are counted as articles produced by the stage; exceptions are
+    counted as stage errors and re-raised.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                inc("stage_errors", stage=stage)
+                raise
+            observe(
+                stage,
+                time.perf_counter() - start,
+                len(result) if isinstance(result, list) else None,
+            )
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def render_prometheus() -> str:
+    """Render all metrics in the Prometheus text exposition format."""
+    with _lock:
+        values = sorted(_values.items())
+        types = dict(_types)
+
+    lines = []
+    declared = set()
+    for (name, labels), value in values:
+        family = name[: -len("_sum")] if name.endswith("_sum") else name
+        family = family[: -len("_count")] if family.endswith("_count") else family
+        if family not in declared:
+            declared.add(family)
+            lines.append(f"# TYPE {PREFIX}_{family} {types[name]}")
+        label_text = ",".join(
+            f'{key}="{value_text}"'
+            for key, value_text in labels
+            if value_text or key != "token"
+        )
+        lines.append(f"{PREFIX}_{name}{{{label_text}}} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def summarize() -> Dict[str, Dict[str, float]]:
+    """Aggregate stage timings and counters across tokens."""
+    summary: Dict[str, Dict[str, float]] = {}
+    with _lock:
+        values = list(_values.items())
+    for (name, labels), value in values:
+        labels = dict(labels)
+        group = labels.get("stage") or ",".join(
+            f"{key}={value_text}"
+            for key, value_text in sorted(labels.items())
+            if key != "token"
+        )
+        entry = summary.setdefault(group or name, {})
+        entry[name] = entry.get(name, 0.0) + value
+    return summary
+
+
+def log_summary():
+    """Log per-stage call counts and mean latency, plus request and cache counters."""
+    for group, entry in sorted(summarize().items()):
+        if "stage_seconds_count" in entry:
+            count = entry["stage_seconds_count"]
+            logger.info(
+                "[metrics] %s: %.0f calls, %.1f ms avg, %.0f articles, %.0f errors",
+                group,
+                count,
+                entry["stage_seconds_sum"] / count * 1000,
+                entry.get("stage_articles_total", 0),
+                entry.get("stage_errors_total", 0),
+            )
+        else:
+            counters = ", ".join(
+                f"{name}={value:g}" for name, value in sorted(entry.items())
+            )
+            logger.info("[metrics] %s: %s", group, counters)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int = DEFAULT_PORT, host: str = "127.0.0.1"):
+    """Serve ``/metrics`` on a daemon thread."""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    logger.info("Serving metrics on http://%s:%s/metrics", host, port)
+    return server
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import re
+from typing import Dict, List, Optional
+
+from market_feed.utils import sharding
+from market_feed.utils.logger import get_logger
+from market_feed.utils.url_utils import article_url_key
+
+logger = get_logger()
+
+SIGNATURE_BITS = 64
+# Headline-plus-snippet texts are short, so one appended or truncated phrase
+# moves a signature by several bits; unrelated stories sit 12+ bits apart
+DEFAULT_MAX_DISTANCE = 7
+# Shorter texts share too few words for their signatures to mean anything
+MIN_WORDS = 8
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def _hash64(value: str) -> int:
+    # Stable across processes, unlike hash(), so signatures can be persisted
+    return int.from_bytes(
+        hashlib.blake2b(value.encode(), digest_size=8).digest(), "big"
+    )
+
+
+def simhash(text: str) -> Optional[int]:
+    """
+    Compute the 64-bit SimHash of a text over its lowercased words.
+
+    :param text: Text to sign
+    :return: Signature, or None when the text is too short to compare
+    """
+    words: Dict[str, int] = {}
+    for word in WORD_PATTERN.findall(text.lower()):
+        words[word] = words.get(word, 0) + 1
+    if len(words) < MIN_WORDS:
+        return None
+
+    weights = [0] * SIGNATURE_BITS
+    for word, weight in words.items():
+        value = _hash64(word)
+        for bit in range(SIGNATURE_BITS):
+            weights[bit] += weight if value >> bit & 1 else -weight
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def article_text(article: Dict) -> str:
+    return f"{article.get('title') or ''}\n{article.get('snippet') or ''}"
+
+
+def article_signature_key(article: Dict) -> str:
+    return hashlib.blake2b(article_text(article).encode(), digest_size=8).hexdigest()
+
+
+class SignatureIndex:
+    """
+    LSH index of SimHash signatures for sublinear near-duplicate lookups.
+
+    Signatures are split into ``max_distance + 1`` bands. Any two signatures
+    within ``max_distance`` bits of each other agree exactly on at least one
+    band, so a lookup only compares against articles sharing a band bucket
+    instead of the whole history.
+    """
+
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE):
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        bounds = [SIGNATURE_BITS * band // bands for band in range(bands + 1)]
+        self.bands = [
+            (start, (1 << (end - start)) - 1) for start, end in zip(bounds, bounds[1:])
+        ]
+        self.buckets: List[Dict[int, List[int]]] = [{} for _ in self.bands]
+        self.signatures: List[int] = []
+
+    def _bands(self, signature: int):
+        for band, (shift, mask) in enumerate(self.bands):
+            yield band, signature >> shift & mask
+
+    def add(self, signature: int) -> int:
+        """Add a signature and return its position in the index."""
+        position = len(self.signatures)
+        self.signatures.append(signature)
+        for band, value in self._bands(signature):
+            self.buckets[band].setdefault(value, []).append(position)
+        return position
+
+    def find(self, signature: int) -> Optional[int]:
+        """Return the position of the first indexed near-duplicate, if any."""
+        for band, value in self._bands(signature):
+            for position in self.buckets[band].get(value, ()):
+                if (
+                    self.signatures[position] ^ signature
+                ).bit_count() <= self.max_distance:
+                    return position
+        return None
+
+
+class SignatureStore:
+    """
+    Persistent per-token cache of article signatures, keyed by a hash of the
+    article text so that stored articles are not re-signed on every fetch.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.signatures: Dict[str, Optional[int]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self.signatures = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable signature index %s: %s", path, e)
+
+    def signature(self, article: Dict) -> Optional[int]:
+        key = article_signature_key(article)
+        if key not in self.signatures:
+            self.signatures[key] = simhash(article_text(article))
+        return self.signatures[key]
+
+    def save(self, articles: List[Dict]):
+        """Write the signatures of ``articles``, dropping everything else."""
+        keys = {article_signature_key(article) for article in articles}
+        signatures = {
+            key: value for key, value in self.signatures.items() if key in keys
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(signatures, f)
+        sharding.check_fence()
+        os.replace(tmp_path, self.path)
+        self.signatures = signatures
+
+
+def alias_of(article: Dict) -> Dict:
+    return {
+        "source": article["source"],
+        "link": article["link"],
+        "canonical_link": article_url_key(article),
+        "title": article["title"],
+        "timestamp": article["timestamp"],
+    }
+
+
+def merge_aliases(target: Dict, article: Dict):
+    """Record ``article``, and any aliases it had collected, as aliases of ``target``."""
+    aliases = target.setdefault("aliases", [])
+    known = {article_url_key(alias) for alias in aliases}
+    known.add(article_url_key(target))
+    for alias in [alias_of(article)] + article.get("aliases", []):
+        if article_url_key(alias) not in known:
+            known.add(article_url_key(alias))
+            aliases.append(alias)
+
+
+def collapse_near_duplicates(
+    articles: List[Dict],
+    store: SignatureStore,
+    max_distance: int = DEFAULT_MAX_DISTANCE,
+) -> List[Dict]:
+    """
+    Cluster syndicated copies of the same story and keep one article per cluster.
+
+    Articles are visited oldest first, so the earliest copy becomes the
+    canonical article; later copies, and any aliases they had collected, are
+    recorded in its ``aliases`` list.
+
+    :param articles: Articles, already free of exact duplicates
+    :param store: Signature store of the token the articles belong to
+    :param max_distance: Maximum Hamming distance between near-duplicates
+    :return: Canonical articles
+    """
+    index = SignatureIndex(max_distance)
+    # Aligned with the index positions
+    canonical: List[Dict] = []
+    # Too short to sign, so never clustered
+    unsigned: List[Dict] = []
+    merged = 0
+
+    for article in sorted(articles, key=lambda x: x["timestamp"]):
+        signature = store.signature(article)
+        if signature is None:
+            unsigned.append(article)
+            continue
+        position = index.find(signature)
+        if position is None:
+            index.add(signature)
+            canonical.append(article)
+            continue
+
+        merge_aliases(canonical[position], article)
+        merged += 1
+
+    if merged:
+        logger.info("Collapsed %s near-duplicate articles into aliases", merged)
+    return canonical + unsigned
@@ -0,0 +1,213 @@
+import threading
+import time
+from typing import Callable, Collection, Dict, List, Optional
+
+import requests
+
+from market_feed.utils.logger import get_logger
+
+logger = get_logger()
+
+DEFAULT_MAX_CONCURRENT = 4
+DEFAULT_MIN_SUCCESS_RATE = 0.5
+DEFAULT_MIN_SAMPLES = 5
+DEFAULT_EVICTION_TIME = 300.0
+DEFAULT_ACQUIRE_TIMEOUT = 30.0
+# Weight of the newest result in the success rate and latency averages
+SMOOTHING = 0.2
+
+# Answers that mean the proxy is blocked or throttled, whatever the site's health
+PROXY_FAILURE_STATUSES = {403, 407, 429}
+
+
+class Proxy:
+    """One proxy with its health statistics and a session for its requests."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.session = requests.Session()
+        self.session.proxies = {"http": url, "https": url}
+        self.active = 0
+        self.samples = 0
+        self.success_rate = 1.0
+        self.latency = 0.0
+        self.evicted_until: Optional[float] = None
+        self.probing = False
+
+    def record(self, ok: bool, latency: float):
+        self.samples += 1
+        if self.samples == 1:
+            self.success_rate = float(ok)
+        else:
+            self.success_rate += SMOOTHING * (float(ok) - self.success_rate)
+        if ok:
+            self.latency = (
+                latency
+                if self.samples == 1
+                else self.latency + SMOOTHING * (latency - self.latency)
+            )
+
+    def __repr__(self) -> str:
+        return f"Proxy({self.url!r})"
+
+
+class ProxyPool:
+    """
+    Pool of outbound proxies that routes each request to a healthy one.
+
+    Every proxy takes at most ``max_concurrent`` requests at a time; callers
+    wait for a free slot. The pool tracks each proxy's success rate and
+    latency and prefers fast, reliable proxies. A proxy whose success rate
+    falls below ``min_success_rate`` after ``min_samples`` requests is evicted
+    for ``eviction_time`` seconds, then gets one probe request: a success
+    brings it back with fresh statistics, a failure evicts it again. Each host
+    sticks to one proxy, and so to its session, while that proxy stays healthy.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+        min_success_rate: float = DEFAULT_MIN_SUCCESS_RATE,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+        eviction_time: float = DEFAULT_EVICTION_TIME,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.proxies = [Proxy(url) for url in urls]
+        self.max_concurrent = max(max_concurrent, 1)
+        self.min_success_rate = min_success_rate
+        self.min_samples = min_samples
+        self.eviction_time = eviction_time
+        self.clock = clock
+        # host -> proxy its requests stick to
+        self.sticky: Dict[str, Proxy] = {}
+        self._changed = threading.Condition()
+
+    @classmethod
+    def from_config(cls, settings: Optional[Dict]) -> Optional["ProxyPool"]:
+        """Build a pool from the ``proxies`` config section, if enabled."""
+        if not settings or not settings.get("enabled") or not settings.get("urls"):
+            return None
+        return cls(
+            settings["urls"],
+            settings.get("max_concurrent", DEFAULT_MAX_CONCURRENT),
+            settings.get("min_success_rate", DEFAULT_MIN_SUCCESS_RATE),
+            settings.get("min_samples", DEFAULT_MIN_SAMPLES),
+            settings.get("eviction_time", DEFAULT_EVICTION_TIME),
+        )
+
+    def _available(self, proxy: Proxy, now: float) -> bool:
+        if proxy.active >= self.max_concurrent:
+            return False
+        if proxy.evicted_until is None:
+            return True
+        # An evicted proxy takes a single probe once its eviction is over
+        return now >= proxy.evicted_until and not proxy.probing
+
+    def _waitable(self, exclude: Collection[Proxy]) -> bool:
+        # Only worth waiting for a busy proxy, not for an eviction to end
+        now = self.clock()
+        return any(
+            proxy not in exclude
+            and (proxy.evicted_until is None or now >= proxy.evicted_until)
+            for proxy in self.proxies
+        )
+
+    def _choose(self, host: str, exclude: Collection[Proxy]) -> Optional[Proxy]:
+        now = self.clock()
+        proxy = self.sticky.get(host)
+        if proxy is not None and proxy not in exclude and proxy.evicted_until is None:
+            # Wait for the host's own proxy rather than move it to another
+            return proxy if self._available(proxy, now) else None
+        candidates = [
+            proxy
+            for proxy in self.proxies
+            if proxy not in exclude and self._available(proxy, now)
+        ]
+        if not candidates:
+            return None
+        proxy = min(
+            candidates,
+            key=lambda proxy: (
+                proxy.evicted_until is not None,
+                proxy.latency / max(proxy.success_rate, 0.05),
+                proxy.active,
+            ),
+        )
+        if proxy.evicted_until is not None:
+            logger.info("Probing evicted proxy %s", proxy.url)
+            proxy.probing = True
+        self.sticky[host] = proxy
+        return proxy
+
+    def acquire(
+        self,
+        host: str,
+        timeout: float = DEFAULT_ACQUIRE_TIMEOUT,
+        exclude: Collection[Proxy] = (),
+    ) -> Optional[Proxy]:
+        """
+        Take a request slot on the best proxy for ``host``.
+
+        :param host: Host the request goes to
+        :param timeout: Seconds to wait for a free slot
+        :param exclude: Proxies not to use, such as ones that already failed this request
+        :return: The proxy, or None if no proxy had a free slot in time or every
+            proxy is excluded or evicted
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                proxy = self._choose(host, exclude)
+                if proxy is not None:
+                    proxy.active += 1
+                    return proxy
+                left = deadline - time.monotonic()
+                if left <= 0 or not self._waitable(exclude):
+                    return None
+                # Also wakes up to notice evictions that have ended
+                self._changed.wait(min(left, 1.0))
+
+    def release(self, proxy: Proxy, ok: Optional[bool], latency: float):
+        """
+        Free a request slot and record how the request went.
+
+        :param ok: False if the proxy failed or was refused, rather than the site;
+            None if the request says nothing about the proxy, such as a site
+            timeout, which leaves its statistics alone
+        :param latency: Seconds the request took
+        """
+        with self._changed:
+            proxy.active -= 1
+            if ok is None:
+                # A probe that proved nothing leaves the proxy up for another one
+                proxy.probing = False
+            elif proxy.probing:
+                proxy.probing = False
+                if ok:
+                    logger.info("Proxy %s is healthy again", proxy.url)
+                    proxy.evicted_until = None
+                    proxy.samples, proxy.success_rate = 0, 1.0
+                    proxy.record(ok, latency)
+                else:
+                    self._evict(proxy)
+            elif proxy.evicted_until is None:
+                # Requests still in flight when the proxy was evicted are not counted
+                proxy.record(ok, latency)
+                if (
+                    proxy.samples >= self.min_samples
+                    and proxy.success_rate < self.min_success_rate
+                ):
+                    self._evict(proxy)
+            self._changed.notify_all()
+
+    def _evict(self, proxy: Proxy):
+        logger.warning(
+            "Evicting proxy %s for %s seconds (success rate %.0f%%)",
+            proxy.url,
+            self.eviction_time,
+            proxy.success_rate * 100,
+        )
+        proxy.evicted_until = self.clock() + self.eviction_time
+        for host in [host for host, sticky in self.sticky.items() if sticky is proxy]:
+            del self.sticky[host]
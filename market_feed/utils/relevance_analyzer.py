@@ -1,17 +1,65 @@
+import multiprocessing
 import re
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, FrozenSet, List, Optional
 
 import nltk
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
 
+from market_feed.utils import metrics
+
 # Download required NLTK data
 nltk.download("punkt_tab", quiet=True)
 nltk.download("punkt", quiet=True)
 nltk.download("stopwords", quiet=True)
 
+DEFAULT_CHUNK_SIZE = 32
+
+_stop_words: Optional[FrozenSet[str]] = None
+
+
+def get_stop_words() -> FrozenSet[str]:
+    """Return the English stopword set, loading it from the NLTK corpus once."""
+    global _stop_words
+    if _stop_words is None:
+        _stop_words = frozenset(stopwords.words("english"))
+    return _stop_words
+
+
+def unique_word_ratio(text: str) -> float:
+    """
+    Calculate the share of distinct words among the non-stopword words of a text.
+
+    :param text: Lowercased text to analyze
+    :return: Unique word ratio, 0 for texts without words
+    """
+    stop_words = get_stop_words()
+    tokens = [word.lower() for word in word_tokenize(text) if word.isalnum()]
+    tokens = [word for word in tokens if word not in stop_words]
+
+    unique_words = len(set(tokens))
+    total_words = len(tokens)
+    return unique_words / total_words if total_words > 0 else 0
+
+
+def combine_text_relevance(
+    keyword_count: int, phrase_count: int, unique_ratio: float
+) -> float:
+    """
+    Combine phrase counts and the unique word ratio into a text relevance score.
+
+    :param keyword_count: Occurrences of keywords (mandatory phrases)
+    :param phrase_count: Occurrences of additional phrases
+    :param unique_ratio: Unique word ratio of the text
+    :return: Relevance score
+    """
+    keyword_score = keyword_count * 10.0  # Increase weight for mandatory phrases
+    base_score = keyword_score + phrase_count
+    return base_score * (1 + unique_ratio)
+
 
 def calculate_text_relevance(
     text: str, keywords: List[str], additional_phrases: List[str]
@@ -28,26 +76,11 @@ def calculate_text_relevance(
 
     # Count keyword (mandatory phrase) occurrences with higher weight
     keyword_count = sum(text.count(keyword.lower()) for keyword in keywords)
-    keyword_score = keyword_count * 10.0  # Increase weight for mandatory phrases
 
     # Count additional phrase occurrences
     phrase_count = sum(text.count(phrase.lower()) for phrase in additional_phrases)
 
-    # Tokenize and remove stopwords
-    stop_words = set(stopwords.words("english"))
-    tokens = [word.lower() for word in word_tokenize(text) if word.isalnum()]
-    tokens = [word for word in tokens if word not in stop_words]
-
-    # Calculate unique word ratio
-    unique_words = len(set(tokens))
-    total_words = len(tokens)
-    unique_ratio = unique_words / total_words if total_words > 0 else 0
-
-    # Calculate score
-    base_score = keyword_score + phrase_count
-    adjusted_score = base_score * (1 + unique_ratio)
-
-    return adjusted_score
+    return combine_text_relevance(keyword_count, phrase_count, unique_word_ratio(text))
 
 
 def calculate_content_relevance(
@@ -75,6 +108,22 @@ def calculate_content_relevance(
             article["full_content"], keywords, additional_phrases
         )
 
+    return combine_content_relevance(
+        title_relevance, snippet_relevance, article_relevance
+    )
+
+
+def combine_content_relevance(
+    title_relevance: float, snippet_relevance: float, article_relevance: float = 0.0
+) -> float:
+    """
+    Weight title, snippet and full-content relevance into a content relevance score.
+
+    :param title_relevance: Relevance of the title
+    :param snippet_relevance: Relevance of the snippet
+    :param article_relevance: Relevance of the full content, 0 when unavailable
+    :return: Content relevance score
+    """
     # Combine relevance scores with weights
     if article_relevance > 0:
         total_relevance = (
@@ -106,6 +155,24 @@ def calculate_date_relevance(articles: List[Dict[str, Any]]) -> Dict[str, float]
     return date_relevance
 
 
+def combine_relevance(content_relevance: float, date_relevance_score: float) -> float:
+    """
+    Combine content and date relevance into the stored relevance score.
+
+    :param content_relevance: Content relevance score
+    :param date_relevance_score: Date relevance score
+    :return: Relevance normalized to between 0 and 10, rounded to 2 decimals
+    """
+    # Combine content and date relevance
+    total_relevance = content_relevance + date_relevance_score
+
+    # Normalize the total relevance to be between 0 and 10
+    normalized_relevance = min(total_relevance, 10.0)
+
+    return round(normalized_relevance, 2)
+
+
+@metrics.instrument("analyze_articles")
 def analyze_articles(
     articles: List[Dict[str, Any]], keywords: List[str], additional_phrases: List[str]
 ) -> List[Dict[str, Any]]:
@@ -127,15 +194,123 @@ def analyze_articles(
         date = str(datetime.fromtimestamp(article["timestamp"]).date())
         date_relevance_score = date_relevance.get(date, 0.0)
 
-        # Combine content and date relevance
-        total_relevance = content_relevance + date_relevance_score
-
-        # Normalize the total relevance to be between 0 and 10
-        normalized_relevance = min(total_relevance, 10.0)
-
         # Add the single relevance score to the article
-        article["relevance"] = round(normalized_relevance, 2)
+        article["relevance"] = combine_relevance(
+            content_relevance, date_relevance_score
+        )
 
         analyzed_articles.append(article)
 
     return analyzed_articles
+
+
+def score_article(
+    article: Dict[str, Any], keywords: List[str], additional_phrases: List[str]
+) -> float:
+    """
+    Score a single article on its own, as get_content does for unscored articles.
+
+    :param article: Article dictionary (left unmodified)
+    :param keywords: List of keywords to search for
+    :param additional_phrases: List of additional phrases to search for
+    :return: Relevance score
+    """
+    return analyze_articles([dict(article)], keywords, additional_phrases)[0][
+        "relevance"
+    ]
+
+
+def _warm_worker():
+    # Load the stopword corpus and the punkt tables before the first chunk arrives
+    get_stop_words()
+    word_tokenize("Warm up the tokenizer.")
+
+
+def _score_chunk(
+    chunk: List[Dict[str, Any]], keywords: List[str], additional_phrases: List[str]
+) -> List[float]:
+    return [score_article(article, keywords, additional_phrases) for article in chunk]
+
+
+class ScoringPool:
+    """
+    Process pool that scores articles in chunks, off the parent's GIL.
+
+    Workers are spawned once and warmed with the stopword set and tokenizer.
+    Each worker runs exactly the serial scoring code, so results match
+    :func:`score_article` bit for bit.
+    """
+
+    def __init__(
+        self, workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ):
+        self.chunk_size = chunk_size
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+        )
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["ScoringPool"]:
+        """Build a pool from the ``scoring`` config section, or None to score serially."""
+        settings = config.get("scoring") or {}
+        if not settings.get("processes"):
+            return None
+        return cls(
+            settings["processes"], settings.get("chunk_size", DEFAULT_CHUNK_SIZE)
+        )
+
+    def score(
+        self,
+        articles: List[Dict[str, Any]],
+        keywords: List[str],
+        additional_phrases: List[str],
+    ) -> List[float]:
+        chunks = [
+            articles[start : start + self.chunk_size]
+            for start in range(0, len(articles), self.chunk_size)
+        ]
+        futures = [
+            self.executor.submit(_score_chunk, chunk, keywords, additional_phrases)
+            for chunk in chunks
+        ]
+        return [score for future in futures for score in future.result()]
+
+    def close(self):
+        self.executor.shutdown()
+
+
+scoring_pool: Optional[ScoringPool] = None
+
+
+def set_scoring_pool(pool: Optional[ScoringPool]):
+    global scoring_pool
+    scoring_pool = pool
+
+
+@metrics.instrument("score_articles")
+def score_articles(
+    articles: List[Dict[str, Any]], keywords: List[str], additional_phrases: List[str]
+) -> List[Dict[str, Any]]:
+    """
+    Add a relevance score to each article, scoring every article on its own.
+
+    Batches larger than one chunk go to the configured process pool, if any;
+    otherwise articles are scored serially in this process.
+
+    :param articles: List of article dictionaries, updated in place
+    :param keywords: List of keywords to search for
+    :param additional_phrases: List of additional phrases to search for
+    :return: The same list of articles
+    """
+    pool = scoring_pool
+    if pool is not None and len(articles) > pool.chunk_size:
+        scores = pool.score(articles, keywords, additional_phrases)
+    else:
+        scores = [
+            score_article(article, keywords, additional_phrases) for article in articles
+        ]
+    for article, score in zip(articles, scores):
+        article["relevance"] = score
+    return articles
@@ -0,0 +1,66 @@
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from market_feed.utils.logger import get_logger
+
+logger = get_logger()
+
+DEFAULT_BURST = 10
+
+
+class RequestBudget:
+    """
+    Thread-safe token bucket shared by every caller of a rate-limited API.
+
+    Tokens refill continuously at ``requests_per_hour / 3600`` per second up to
+    ``burst``; :meth:`acquire` blocks until a token is available.
+    """
+
+    def __init__(
+        self,
+        requests_per_hour: float,
+        burst: int = DEFAULT_BURST,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.rate = requests_per_hour / 3600
+        self.capacity = max(burst, 1)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = float(self.capacity)
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, settings: Optional[Dict]) -> Optional["RequestBudget"]:
+        """Build a budget from a ``{requests_per_hour, burst}`` mapping, if set."""
+        if not settings or not settings.get("requests_per_hour"):
+            return None
+        return cls(settings["requests_per_hour"], settings.get("burst", DEFAULT_BURST))
+
+    def try_acquire(self) -> float:
+        """
+        Take a token if one is available.
+
+        :return: 0 if a token was taken, otherwise the seconds until one will be
+        """
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """Block until a token is available and take it."""
+        while True:
+            wait = self.try_acquire()
+            if wait == 0:
+                return
+            logger.debug("Request budget exhausted, waiting %.1f seconds", wait)
+            self.sleep(wait)
@@ -1,40 +1,128 @@
-import time
-from typing import Callable, Dict
-
-import schedule
+import random
+from typing import Callable, Dict, Optional
 
+from market_feed.utils.adaptive_interval import AdaptiveIntervals
 from market_feed.utils.logger import get_logger
+from market_feed.utils.scheduler import Scheduler
+from market_feed.utils.token_registry import token_key
 
 logger = get_logger()
 
+DEFAULT_INITIAL_SPREAD = 300
+
 
 def schedule_token_fetch(
+    scheduler: Scheduler,
     token: Dict,
     output_dir: str,
     default_interval: int,
     job_creator: Callable,
     config: Dict,
+    initial_delay: float = 0.0,
+    intervals: Optional[AdaptiveIntervals] = None,
 ):
     interval = token.get("fetch_interval", default_interval)
+    tag = token_key(token)
 
     job = job_creator(token, config)
 
-    # Run the job immediately
-    job()
-    logger.info(f"Ran initial fetch for {token['name']}")
+    if intervals is not None:
+        interval = intervals.register(tag, token, interval)
+        fetch = job
+        current_interval = interval
+
+        def job():
+            nonlocal current_interval
+            new_articles = fetch()
+            if new_articles is None:
+                # Skipped, as another worker owns the token
+                return
+            current_interval = intervals.update(tag, new_articles, current_interval)
+            # Takes effect when the scheduler computes the next run
+            scheduler.set_interval(tag, current_interval)
+
+    scheduler.add(tag, job, interval, delay=initial_delay)
+    logger.info(
+        "Scheduled %s to fetch every %.0f seconds, first run in %.0f seconds",
+        token["name"],
+        interval,
+        initial_delay,
+    )
 
-    # Schedule the job to run at regular intervals
-    schedule.every(interval).seconds.do(job)
-    logger.info(f"Scheduled {token['name']} to fetch every {interval} seconds")
+
+def unschedule_token_fetch(
+    scheduler: Scheduler, token: Dict, intervals: Optional[AdaptiveIntervals] = None
+):
+    tag = token_key(token)
+    scheduler.remove(tag)
+    if intervals is not None:
+        intervals.unregister(tag)
+    logger.info("Unscheduled %s", token["name"])
 
 
 def setup_schedules(
+    scheduler: Scheduler,
     tokens: list[Dict],
     output_dir: str,
     default_interval: int,
     job_creator: Callable,
     config: Dict,
+    intervals: Optional[AdaptiveIntervals] = None,
 ):
+    """
+    Schedule every token, spreading first runs evenly over ``initial_run_spread``
+    seconds so startup does not fire all tokens at once.
+    """
     logger.info("Setting up schedules for all tokens")
-    for token in tokens:
-        schedule_token_fetch(token, output_dir, default_interval, job_creator, config)
+    spread = config.get("initial_run_spread", DEFAULT_INITIAL_SPREAD)
+    step = spread / len(tokens) if tokens else 0
+    for index, token in enumerate(tokens):
+        schedule_token_fetch(
+            scheduler,
+            token,
+            output_dir,
+            default_interval,
+            job_creator,
+            config,
+            initial_delay=index * step,
+            intervals=intervals,
+        )
+
+
+def apply_token_changes(
+    scheduler: Scheduler,
+    changes,
+    output_dir: str,
+    default_interval: int,
+    job_creator: Callable,
+    config: Dict,
+    max_jitter: float,
+    intervals: Optional[AdaptiveIntervals] = None,
+):
+    """
+    Add, remove and reschedule jobs for changed tokens only.
+
+    New and edited tokens get a random first-run delay of up to ``max_jitter``
+    seconds so a large batch of additions does not fire at once.
+    """
+    for token in changes.removed + changes.changed:
+        unschedule_token_fetch(scheduler, token, intervals)
+
+    for token in changes.added + changes.changed:
+        schedule_token_fetch(
+            scheduler,
+            token,
+            output_dir,
+            default_interval,
+            job_creator,
+            config,
+            initial_delay=random.uniform(0, max_jitter),
+            intervals=intervals,
+        )
+
+    logger.info(
+        "Token changes applied: %s added, %s removed, %s rescheduled",
+        len(changes.added),
+        len(changes.removed),
+        len(changes.changed),
+    )
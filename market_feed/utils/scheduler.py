@@ -0,0 +1,164 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from market_feed.utils.logger import get_logger
+
+logger = get_logger()
+
+DEFAULT_BASE_BACKOFF = 60.0
+
+
+class ScheduledJob:
+    __slots__ = ("key", "func", "interval", "failures", "version", "removed")
+
+    def __init__(self, key: str, func: Callable, interval: float):
+        self.key = key
+        self.func = func
+        self.interval = interval
+        self.failures = 0
+        self.version = 0
+        self.removed = False
+
+
+class Scheduler:
+    """
+    Heap-based job scheduler keyed by job name.
+
+    Next-run times live in a binary heap, so the loop sleeps exactly until the
+    earliest due job instead of polling. Removed or rescheduled jobs leave stale
+    heap entries behind that are skipped when popped. A failing job is retried
+    with exponential backoff (capped at its interval) without affecting the
+    others. With ``max_workers`` above 1, due jobs run on a thread pool so a slow
+    job does not delay the rest.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 1,
+        base_backoff: float = DEFAULT_BASE_BACKOFF,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.base_backoff = base_backoff
+        self.clock = clock
+        self._jobs: Dict[str, ScheduledJob] = {}
+        self._heap: List[Tuple[float, int, ScheduledJob, int]] = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._executor = ThreadPoolExecutor(max_workers) if max_workers > 1 else None
+        self._stopped = False
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._jobs
+
+    def _push(self, job: ScheduledJob, when: float):
+        job.version += 1
+        heapq.heappush(self._heap, (when, next(self._counter), job, job.version))
+
+    def add(self, key: str, func: Callable, interval: float, delay: float = 0.0):
+        """
+        Schedule ``func`` to run every ``interval`` seconds, first after ``delay``.
+
+        Adding a job under an existing key replaces it.
+        """
+        with self._lock:
+            self._remove(key)
+            job = ScheduledJob(key, func, interval)
+            self._jobs[key] = job
+            self._push(job, self.clock() + delay)
+            self._wakeup.notify()
+
+    def _remove(self, key: str) -> bool:
+        job = self._jobs.pop(key, None)
+        if job is None:
+            return False
+        job.removed = True
+        return True
+
+    def remove(self, key: str) -> bool:
+        """Unschedule a job; a run already in progress is allowed to finish."""
+        with self._lock:
+            return self._remove(key)
+
+    def set_interval(self, key: str, interval: float):
+        """Change a job's interval, effective from its next completion."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                job.interval = interval
+
+    def _next_delay(self) -> Optional[float]:
+        while self._heap:
+            when, _, job, version = self._heap[0]
+            if job.removed or version != job.version:
+                heapq.heappop(self._heap)
+                continue
+            return max(when - self.clock(), 0.0)
+        return None
+
+    def _pop_due(self) -> Optional[ScheduledJob]:
+        delay = self._next_delay()
+        if delay is None or delay > 0:
+            return None
+        return heapq.heappop(self._heap)[2]
+
+    def _run(self, job: ScheduledJob):
+        try:
+            job.func()
+            job.failures = 0
+            delay = job.interval
+        except Exception as e:
+            job.failures += 1
+            delay = min(job.interval, self.base_backoff * 2 ** (job.failures - 1))
+            logger.error(
+                "Job %s failed (%s in a row): %s. Retrying in %.0f seconds",
+                job.key,
+                job.failures,
+                str(e),
+                delay,
+                exc_info=True,
+            )
+        with self._lock:
+            if not job.removed:
+                self._push(job, self.clock() + delay)
+            self._wakeup.notify()
+
+    def run_pending(self):
+        """Run every job that is due now."""
+        while True:
+            with self._lock:
+                job = self._pop_due()
+            if job is None:
+                return
+            if self._executor is not None:
+                self._executor.submit(self._run, job)
+            else:
+                self._run(job)
+
+    def run_forever(self):
+        """Run jobs as they become due until :meth:`stop` is called."""
+        self._stopped = False
+        try:
+            while True:
+                self.run_pending()
+                with self._lock:
+                    if self._stopped:
+                        return
+                    delay = self._next_delay()
+                    if delay is None or delay > 0:
+                        self._wakeup.wait(delay)
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            self._wakeup.notify()
@@ -0,0 +1,347 @@
+import bisect
+import contextvars
+import hashlib
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from market_feed.utils.logger import get_logger
+from market_feed.utils.token_registry import token_key
+
+logger = get_logger()
+
+DEFAULT_LEASE_TTL = 60.0
+DEFAULT_REPLICAS = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    fence INTEGER NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+
+class LeaseLost(Exception):
+    """Raised when a worker tries to persist a token whose lease it no longer holds."""
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring over worker ids.
+
+    Each worker gets ``replicas`` points on the ring, so when a worker joins
+    or leaves only the keys next to its points change owner.
+    """
+
+    def __init__(self, workers: Iterable[str], replicas: int = DEFAULT_REPLICAS):
+        points = sorted(
+            (_hash(f"{worker}#{replica}"), worker)
+            for worker in workers
+            for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._workers = [worker for _, worker in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._hashes:
+            return None
+        position = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._workers[position]
+
+
+class ShardCoordinator:
+    """
+    Lease-based token ownership shared by several workers through SQLite.
+
+    Every :meth:`heartbeat` renews the worker's membership, hashes the token
+    keys onto the ring of live workers, takes or renews the leases of the keys
+    that fall to this worker and releases the ones that no longer do. A worker
+    that stops heartbeating loses its membership and leases after
+    ``lease_ttl`` seconds, and the others take its tokens over.
+
+    Each change of owner bumps the lease's fencing token. :meth:`fence`
+    re-checks the lease in a short transaction on the store before the caller
+    persists, and until the caller is done, heartbeats renew the lease instead
+    of handing it over. A worker can still stall past its lease mid-write, so
+    each write is checked again with :meth:`check` right before it is made
+    visible, which also renews the lease for the rest of the write. The new
+    owner only takes a key over once its lease has been released or has
+    expired, so a stale worker's write is refused rather than overwriting the
+    new owner's files.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        worker_id: Optional[str] = None,
+        lease_ttl: float = DEFAULT_LEASE_TTL,
+        replicas: int = DEFAULT_REPLICAS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_ttl = lease_ttl
+        self.replicas = replicas
+        self.clock = clock
+        # key -> fencing token of the leases this worker holds
+        self.leases: Dict[str, int] = {}
+        self.valid_until = 0.0
+        self._conn = sqlite3.connect(
+            path, timeout=lease_ttl, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        # key -> number of fenced writes in progress
+        self._writing: Dict[str, int] = {}
+        self._writing_lock = threading.Lock()
+
+    @classmethod
+    def from_config(
+        cls, settings: Optional[Dict], output_dir: str
+    ) -> Optional["ShardCoordinator"]:
+        """Build a coordinator from the ``sharding`` config section, if enabled."""
+        if not settings or not settings.get("enabled"):
+            return None
+        return cls(
+            settings.get("path", f"{output_dir}/leases.db"),
+            settings.get("worker_id"),
+            settings.get("lease_ttl", DEFAULT_LEASE_TTL),
+        )
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def heartbeat(self, keys: Iterable[str]) -> Dict[str, int]:
+        """
+        Renew membership and rebalance the leases of ``keys``.
+
+        :param keys: Keys of every configured token
+        :return: The leases this worker now holds, by key, with their fencing tokens
+        """
+        with self._transaction() as conn:
+            now = self.clock()
+            with self._writing_lock:
+                writing = set(self._writing)
+            conn.execute(
+                "INSERT OR REPLACE INTO workers (worker_id, expires) VALUES (?, ?)",
+                (self.worker_id, now + self.lease_ttl),
+            )
+            conn.execute("DELETE FROM workers WHERE expires <= ?", (now,))
+            ring = HashRing(
+                [worker for (worker,) in conn.execute("SELECT worker_id FROM workers")],
+                self.replicas,
+            )
+            leases = {
+                key: (owner, fence, expires)
+                for key, owner, fence, expires in conn.execute(
+                    "SELECT key, owner, fence, expires FROM leases"
+                )
+            }
+
+            held = {}
+            for key in keys:
+                owner, fence, expires = leases.get(key, (None, 0, 0.0))
+                if ring.owner(key) == self.worker_id:
+                    if owner != self.worker_id and expires > now:
+                        # The previous owner still holds it until it hands over or expires
+                        continue
+                    if owner != self.worker_id:
+                        fence += 1
+                    conn.execute(
+                        "INSERT OR REPLACE INTO leases (key, owner, fence, expires) VALUES (?, ?, ?, ?)",
+                        (key, self.worker_id, fence, now + self.lease_ttl),
+                    )
+                    held[key] = fence
+                elif owner == self.worker_id and expires > now:
+                    # A key being persisted is handed over once its write is done
+                    conn.execute(
+                        "UPDATE leases SET expires = ? WHERE key = ?",
+                        (now + self.lease_ttl if key in writing else 0, key),
+                    )
+
+        gained = held.keys() - self.leases.keys()
+        lost = self.leases.keys() - held.keys()
+        if gained or lost:
+            logger.info(
+                "Worker %s now owns %s tokens (%s gained, %s handed over)",
+                self.worker_id,
+                len(held),
+                len(gained),
+                len(lost),
+            )
+        self.leases = held
+        self.valid_until = now + self.lease_ttl
+        return held
+
+    def owns(self, key: str) -> bool:
+        """Whether this worker held the key's lease at its last heartbeat, and still does."""
+        return key in self.leases and self.clock() < self.valid_until
+
+    def check(self, key: str, fence: int):
+        """
+        Confirm that the key's lease still has the fencing token ``fence``,
+        and renew it so that a write about to be made visible has ``lease_ttl``
+        seconds to finish before anyone else may take the key over.
+
+        :raises LeaseLost: If the lease has expired or moved to another worker
+        """
+        with self._transaction() as conn:
+            now = self.clock()
+            row = conn.execute(
+                "SELECT owner, fence, expires FROM leases WHERE key = ?", (key,)
+            ).fetchone()
+            held = row is not None and row[:2] == (self.worker_id, fence)
+            if held and row[2] > now:
+                conn.execute(
+                    "UPDATE leases SET expires = ? WHERE key = ?",
+                    (max(row[2], now + self.lease_ttl), key),
+                )
+                return
+        self.leases.pop(key, None)
+        raise LeaseLost(f"{self.worker_id} lost the lease on {key}")
+
+    @contextmanager
+    def fence(self, key: str) -> Iterator[int]:
+        """
+        Check the key's lease and keep it from being handed over while the
+        caller persists the key's data.
+
+        The check is a short transaction and the caller's writes run outside
+        it, so workers persisting different tokens do not wait on each other.
+        The caller re-checks with :meth:`check` before each write.
+
+        :raises LeaseLost: If the lease has expired or moved to another worker
+        :return: The lease's fencing token
+        """
+        fence = self.leases.get(key)
+        if fence is None:
+            raise LeaseLost(f"{self.worker_id} does not hold the lease on {key}")
+        # Registered before the check, so a heartbeat either sees the write or
+        # has already released the lease, which the check then catches
+        with self._writing_lock:
+            self._writing[key] = self._writing.get(key, 0) + 1
+        try:
+            self.check(key, fence)
+            yield fence
+        finally:
+            with self._writing_lock:
+                self._writing[key] -= 1
+                if not self._writing[key]:
+                    del self._writing[key]
+
+    def close(self):
+        """Leave the ring and release every lease, so others take over at once."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM workers WHERE worker_id = ?", (self.worker_id,))
+            conn.execute(
+                "UPDATE leases SET expires = 0 WHERE owner = ?", (self.worker_id,)
+            )
+        self.leases = {}
+        self._conn.close()
+
+
+# Set when several workers share the tokens; None runs every token here
+coordinator: Optional[ShardCoordinator] = None
+
+
+def set_coordinator(shard_coordinator: Optional[ShardCoordinator]):
+    global coordinator
+    coordinator = shard_coordinator
+
+
+def owns(token: Dict) -> bool:
+    return coordinator is None or coordinator.owns(token_key(token))
+
+
+# Coordinator, key and fencing token of the fenced block being run
+_active_fence: contextvars.ContextVar[
+    Optional[Tuple[ShardCoordinator, str, int]]
+] = contextvars.ContextVar("active_fence", default=None)
+
+
+@contextmanager
+def fenced(token: Dict) -> Iterator[None]:
+    """
+    Guard the writes of a token's data; a no-op unless sharding is enabled.
+
+    Writers call :func:`check_fence` inside the block before each write.
+    """
+    if coordinator is None:
+        yield
+        return
+    key = token_key(token)
+    with coordinator.fence(key) as fence:
+        reset_token = _active_fence.set((coordinator, key, fence))
+        try:
+            yield
+        finally:
+            _active_fence.reset(reset_token)
+
+
+def check_fence():
+    """
+    Re-check the lease of the enclosing :func:`fenced` block right before a
+    write is made visible; a no-op outside one.
+
+    :raises LeaseLost: If the lease has moved on since the block started
+    """
+    active = _active_fence.get()
+    if active is not None:
+        shard_coordinator, key, fence = active
+        shard_coordinator.check(key, fence)
+
+
+def heartbeat(tokens: List[Dict]):
+    if coordinator is not None:
+        coordinator.heartbeat([token_key(token) for token in tokens])
+
+
+def start_heartbeat(
+    tokens: Callable[[], List[Dict]], interval: float
+) -> Optional[threading.Event]:
+    """
+    Renew the leases every ``interval`` seconds on a daemon thread.
+
+    Renewal runs apart from the job scheduler, so a long fetch cannot delay it
+    until the leases expire.
+
+    :param tokens: Returns every configured token
+    :param interval: Seconds between heartbeats
+    :return: Event that stops the thread when set, or None unless sharding is enabled
+    """
+    if coordinator is None:
+        return None
+    stopped = threading.Event()
+
+    def renew():
+        while not stopped.wait(interval):
+            try:
+                heartbeat(tokens())
+            except Exception as e:
+                logger.error("Could not renew the token leases: %s", e)
+
+    threading.Thread(target=renew, name="shard-heartbeat", daemon=True).start()
+    return stopped
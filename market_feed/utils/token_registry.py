@@ -0,0 +1,199 @@
+import json
+import sqlite3
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tokens (
+    key TEXT PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    active INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tokens_version ON tokens (version);
+CREATE TABLE IF NOT EXISTS token_addresses (
+    network TEXT NOT NULL,
+    address TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (network, address)
+);
+INSERT OR IGNORE INTO meta (name, value) VALUES ('version', 0);
+"""
+
+
+def token_key(token: Dict[str, Any]) -> str:
+    """
+    Build the stable registry key for a token.
+
+    Tokens are identified by their on-chain addresses; tokens configured
+    without an address fall back to their symbol.
+
+    :param token: Token configuration
+    :return: Registry key
+    """
+    addresses = token.get("address") or {}
+    if addresses:
+        return ",".join(
+            f"{network}:{address.lower()}"
+            for network, address in sorted(addresses.items())
+        )
+    return token["symbol"].lower()
+
+
+class TokenRegistry:
+    """
+    SQLite-backed token store with a monotonically increasing version stamp.
+
+    Every write bumps the registry version and stamps the written rows with it,
+    so readers can pick up changes with :meth:`changes_since` instead of
+    re-reading the whole token list.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def version(self) -> int:
+        """Return the current registry version."""
+        row = self._conn.execute(
+            "SELECT value FROM meta WHERE name = 'version'"
+        ).fetchone()
+        return row[0]
+
+    def _bump_version(self) -> int:
+        self._conn.execute("UPDATE meta SET value = value + 1 WHERE name = 'version'")
+        return self.version()
+
+    def _write(self, token: Dict[str, Any], version: int):
+        key = token_key(token)
+        self._conn.execute(
+            """
+            INSERT INTO tokens (key, symbol, active, version, data)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET
+                symbol = excluded.symbol,
+                active = excluded.active,
+                version = excluded.version,
+                data = excluded.data
+            """,
+            (
+                key,
+                token["symbol"],
+                int(token.get("active", True)),
+                version,
+                json.dumps(token),
+            ),
+        )
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO token_addresses (network, address, key) VALUES (?, ?, ?)",
+            [
+                (network, address.lower(), key)
+                for network, address in (token.get("address") or {}).items()
+            ],
+        )
+
+    def upsert(self, token: Dict[str, Any]) -> int:
+        """
+        Insert or update a single token.
+
+        :param token: Token configuration
+        :return: The new registry version
+        """
+        with self._conn:
+            version = self._bump_version()
+            self._write(token, version)
+        return version
+
+    def import_tokens(self, tokens: Iterable[Dict[str, Any]]) -> int:
+        """
+        Insert or update many tokens under a single version bump.
+
+        :param tokens: Token configurations
+        :return: The new registry version
+        """
+        with self._conn:
+            version = self._bump_version()
+            for token in tokens:
+                self._write(token, version)
+        return version
+
+    def find(self, network: str, address: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a token by one of its addresses.
+
+        :param network: Network name
+        :param address: Token address (any case)
+        :return: Token configuration if found, None otherwise
+        """
+        row = self._conn.execute(
+            """
+            SELECT tokens.data FROM token_addresses
+            JOIN tokens ON tokens.key = token_addresses.key
+            WHERE token_addresses.network = ? AND token_addresses.address = ?
+            """,
+            (network, address.lower()),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def tokens(self, active_only: bool = True) -> List[Dict[str, Any]]:
+        """
+        Return all tokens in the registry.
+
+        :param active_only: Skip tokens marked inactive
+        :return: List of token configurations
+        """
+        query = "SELECT data FROM tokens"
+        if active_only:
+            query += " WHERE active = 1"
+        return [json.loads(data) for (data,) in self._conn.execute(query)]
+
+    def count(self, active_only: bool = True) -> int:
+        """Return the number of tokens in the registry."""
+        query = "SELECT COUNT(*) FROM tokens"
+        if active_only:
+            query += " WHERE active = 1"
+        return self._conn.execute(query).fetchone()[0]
+
+    def changes_since(self, version: int) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Return tokens written after the given version, including deactivated ones.
+
+        :param version: Version previously returned by this registry
+        :return: Tuple of (current version, changed token configurations)
+        """
+        current = self.version()
+        rows = self._conn.execute(
+            "SELECT data FROM tokens WHERE version > ? AND version <= ? ORDER BY version",
+            (version, current),
+        ).fetchall()
+        return current, [json.loads(data) for (data,) in rows]
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python -m market_feed.utils.token_registry CONFIG_FILE REGISTRY")
+        sys.exit(1)
+
+    from market_feed.utils.config_utils import load_config
+
+    config_file, registry_path = sys.argv[1:]
+    tokens = load_config(config_file).get("tokens", [])
+    registry = TokenRegistry(registry_path)
+    version = registry.import_tokens(tokens)
+    print(f"Imported {len(tokens)} tokens into {registry_path} (version {version})")
+    registry.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import os
+from typing import Dict, List, NamedTuple
+
+from market_feed.utils.config_utils import load_config, load_tokens
+from market_feed.utils.logger import get_logger
+from market_feed.utils.token_registry import TokenRegistry, token_key
+
+logger = get_logger()
+
+
+class TokenChanges(NamedTuple):
+    added: List[Dict]
+    removed: List[Dict]
+    changed: List[Dict]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+class TokenWatcher:
+    """
+    Detect token additions, removals and edits without restarting the service.
+
+    With a token registry configured, changes are read incrementally by version
+    stamp; otherwise the config file's mtime is polled and the token list is
+    re-read only when it changes.
+    """
+
+    def __init__(self, config_file: str, config: Dict, tokens: List[Dict]):
+        self.config_file = config_file
+        self.registry_path = config.get("token_registry")
+        self.tokens = {token_key(token): token for token in tokens}
+        if self.registry_path:
+            self.registry = TokenRegistry(self.registry_path)
+            self.version = self.registry.version()
+        else:
+            self.mtime = self._config_mtime()
+
+    def _config_mtime(self) -> int:
+        try:
+            return os.stat(self.config_file).st_mtime_ns
+        except OSError:
+            return 0
+
+    def _diff(self, updates: Dict[str, Dict], full: bool) -> TokenChanges:
+        added, removed, changed = [], [], []
+        for key, token in updates.items():
+            previous = self.tokens.get(key)
+            if not token.get("active", True):
+                if previous is not None:
+                    removed.append(self.tokens.pop(key))
+            elif previous is None:
+                added.append(token)
+                self.tokens[key] = token
+            elif previous != token:
+                changed.append(token)
+                self.tokens[key] = token
+
+        if full:
+            for key in set(self.tokens) - set(updates):
+                removed.append(self.tokens.pop(key))
+
+        return TokenChanges(added, removed, changed)
+
+    def poll(self) -> TokenChanges:
+        """Return the token changes since the previous poll."""
+        if self.registry_path:
+            version, updates = self.registry.changes_since(self.version)
+            self.version = version
+            return self._diff({token_key(token): token for token in updates}, False)
+
+        mtime = self._config_mtime()
+        if mtime == self.mtime:
+            return TokenChanges([], [], [])
+        self.mtime = mtime
+        try:
+            tokens = load_tokens(load_config(self.config_file))
+        except Exception as e:
+            logger.error(
+                "Failed to reload tokens from %s: %s", self.config_file, str(e)
+            )
+            return TokenChanges([], [], [])
+        return self._diff({token_key(token): token for token in tokens}, True)
@@ -0,0 +1,131 @@
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List, Tuple
+
+# One precompiled pattern splits URLs in about half the time urllib.parse.urlsplit takes
+URL_PATTERN = re.compile(
+    r"^(?P<scheme>https?)://(?P<netloc>[^/?#]+)(?P<path>[^?#]*)"
+    r"(?:\?(?P<query>[^#]*))?(?:#.*)?$",
+    re.IGNORECASE | re.DOTALL,
+)
+# Query parameters that identify a campaign or referrer, never the article
+TRACKING_PARAM_PATTERN = re.compile(
+    r"^(utm_[^=]*|ref|ref_src|ref_url|referrer|fbclid|gclid|dclid|msclkid|mc_cid|"
+    r"mc_eid|_hsenc|_hsmi|mkt_tok|igshid|guccounter|amp|outputtype)(=|$)",
+    re.IGNORECASE,
+)
+AMP_PATH_PATTERN = re.compile(r"(?:/amp)+/?$|^/amp(?=/)", re.IGNORECASE)
+AMP_CACHE_PATTERN = re.compile(
+    r"^https?://[^/]+\.cdn\.ampproject\.org/[a-z]/(?P<secure>s/)?(?P<rest>.+)$",
+    re.IGNORECASE,
+)
+DISCOURSE_TOPIC_PATTERN = re.compile(r"^/t/(?:[^/]+/)?(?P<id>\d+)(?:/\d+)?/?$")
+DEFAULT_PORTS = {"http": ":80", "https": ":443"}
+CACHE_SIZE = 65536
+
+# (path, query parameters) -> (path, query parameters)
+DomainRule = Callable[[str, List[str]], Tuple[str, List[str]]]
+
+
+def _medium_rule(path: str, query: List[str]):
+    # Feed links carry ?source=rss-...; nothing in a Medium query selects content
+    return path, []
+
+
+def _discourse_rule(path: str, query: List[str]):
+    # /t/slug/123, /t/slug/123/4 and /t/123 are all topic 123
+    match = DISCOURSE_TOPIC_PATTERN.match(path)
+    if match:
+        return f"/t/{match.group('id')}", []
+    return path, query
+
+
+DOMAIN_RULES: Dict[str, DomainRule] = {
+    "medium.com": _medium_rule,
+    "research.lido.fi": _discourse_rule,
+}
+
+
+def _domain_rule(host: str):
+    rule = DOMAIN_RULES.get(host)
+    if rule is None and host.endswith(".medium.com"):
+        rule = _medium_rule
+    return rule
+
+
+def _is_canonical(url: str) -> bool:
+    """Tell, without parsing, whether canonicalize_url would return a URL unchanged."""
+    if not url.startswith("https://") or "?" in url or "#" in url or "@" in url:
+        return False
+    slash = url.find("/", len("https://"))
+    if slash == -1:
+        return False
+    host, path = url[len("https://") : slash], url[slash:]
+    return (
+        host.islower()
+        and ":" not in host
+        and not host.startswith(("www.", "amp."))
+        and not host.endswith(".cdn.ampproject.org")
+        and _domain_rule(host) is None
+        and (path == "/" or not path.endswith("/"))
+        and "/amp" not in path.lower()
+        and not url[-1].isspace()
+    )
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize an article URL so that variants of the same page compare equal.
+
+    Tracking parameters, fragments, AMP variants, default ports, ``www.`` and
+    trailing slashes are removed, ``http`` is upgraded to ``https`` and the
+    remaining query parameters are sorted. Per-domain rules then apply.
+
+    :param url: Raw URL as fetched
+    :return: Canonical URL; strings that are not http(s) URLs are returned stripped
+    """
+    # Most feed links are canonical already and need no parse
+    if _is_canonical(url):
+        return url
+    url = url.strip()
+    amp_cache = AMP_CACHE_PATTERN.match(url)
+    if amp_cache:
+        scheme = "https" if amp_cache.group("secure") else "http"
+        url = f"{scheme}://{amp_cache.group('rest')}"
+
+    parts = URL_PATTERN.match(url)
+    if parts is None:
+        return url
+
+    scheme = parts.group("scheme").lower()
+    host = parts.group("netloc").lower()
+    if "@" in host:
+        host = host.rsplit("@", 1)[1]
+    if host.endswith(DEFAULT_PORTS[scheme]):
+        host = host[: -len(DEFAULT_PORTS[scheme])]
+    for prefix in ("www.", "amp."):
+        if host.startswith(prefix):
+            host = host[len(prefix) :]
+
+    path = AMP_PATH_PATTERN.sub("", parts.group("path")) or "/"
+    query = [
+        param
+        for param in (parts.group("query") or "").split("&")
+        if param and not TRACKING_PARAM_PATTERN.match(param)
+    ]
+
+    rule = _domain_rule(host)
+    if rule is not None:
+        path, query = rule(path, query)
+
+    if len(path) > 1:
+        path = path.rstrip("/") or "/"
+    if query:
+        return f"https://{host}{path}?{'&'.join(sorted(query))}"
+    return f"https://{host}{path}"
+
+
+def article_url_key(article: Dict) -> str:
+    """Return the canonical link of an article, for articles stored before it was recorded."""
+    return article.get("canonical_link") or canonicalize_url(article.get("link") or "")
@@ -0,0 +1,53 @@
+from market_feed.utils.adaptive_interval import AdaptiveIntervals
+
+
+def make_intervals(**kwargs):
+    return AdaptiveIntervals(
+        cost_fn=lambda token: token.get("calls", 1),
+        min_interval=600,
+        max_interval=86400,
+        **kwargs,
+    )
+
+
+def test_busy_token_speeds_up_and_quiet_token_backs_off():
+    intervals = make_intervals()
+    intervals.register("busy", {}, 3600)
+    intervals.register("quiet", {}, 3600)
+
+    assert intervals.update("busy", 12, 3600) == 600
+    assert intervals.update("quiet", 0, 3600) == 3600 * 1.5
+    assert intervals.update("quiet", 0, 5400) == 3600 * 1.5 * 1.5
+
+
+def test_interval_is_clamped():
+    intervals = make_intervals()
+    intervals.register("token", {}, 10)
+    assert intervals.desired["token"] == 600
+    for _ in range(30):
+        interval = intervals.update("token", 0, 3600)
+    assert interval == 86400
+
+
+def test_hourly_budget_stretches_intervals():
+    intervals = make_intervals(hourly_api_budget=10)
+    assert intervals.register("a", {"calls": 4}, 3600) == 3600
+    assert intervals.register("b", {"calls": 16}, 3600) == 3600 * 2
+    # 20 calls per hour projected against a budget of 10
+    assert intervals.budget_scale() == 2
+
+    intervals.unregister("b")
+    assert intervals.budget_scale() == 1
+
+
+def test_token_removed_while_fetching_is_ignored():
+    intervals = make_intervals(hourly_api_budget=10)
+    intervals.register("a", {}, 3600)
+    intervals.register("b", {}, 3600)
+
+    # A token reload removes a while its fetch is still running
+    intervals.unregister("a")
+    assert intervals.update("a", 3, 3600) == 3600
+    assert "a" not in intervals.desired
+    assert intervals.update("b", 0, 3600) == 3600 * 1.5
+    assert intervals.budget_scale() == 1
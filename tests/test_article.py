@@ -0,0 +1,97 @@
+import json
+import pickle
+
+import pytest
+
+from market_feed.benchmarks.corpora import synthetic_articles
+from market_feed.feeds import filter_and_sort_articles
+from market_feed.utils.article import MISSING, Article, to_articles
+from market_feed.utils.content_utils import clean_article
+
+
+def test_dict_round_trip_is_lossless():
+    records = synthetic_articles(200, seed=3)
+    records[0]["full_content"] = "Body"
+    records[1]["snippet"] = None
+    del records[2]["utc_time"]
+
+    articles = to_articles([dict(record) for record in records])
+
+    for record, article in zip(records, articles):
+        assert isinstance(article, Article)
+        assert article.to_dict() == record
+        assert json.loads(json.dumps(dict(article))) == record
+    assert articles[0]["full_content"] == "Body"
+    assert articles[1]["snippet"] is None
+    assert "utc_time" not in articles[2]
+    assert articles[2].utc_time is MISSING
+
+
+def test_behaves_like_a_dict():
+    article = Article.from_dict({"title": "Lido", "source": "CoinDesk"})
+    assert len(article) == 2
+    assert article.get("link") is None
+    assert article.setdefault("aliases", []) == []
+    article["relevance"] = 7.5
+    assert article.pop("relevance") == 7.5
+    assert article.pop("relevance", 0) == 0
+    with pytest.raises(KeyError):
+        article["link"]
+    with pytest.raises(KeyError):
+        del article["link"]
+    assert {**article} == {"title": "Lido", "source": "CoinDesk", "aliases": []}
+
+
+def test_source_and_tag_are_interned():
+    first, second = (
+        Article.from_dict(json.loads('{"source": "CoinDesk", "tag": "dao-governance"}'))
+        for _ in range(2)
+    )
+    assert first.source is second.source
+    assert first.tag is second.tag
+
+
+def test_timestamp_is_whole_seconds():
+    article = Article.from_dict({"title": "Lido", "timestamp": 1700000000.75})
+    assert article["timestamp"] == 1700000000
+    assert type(article["timestamp"]) is int
+    article["timestamp"] = 1700000100.5
+    assert type(article.timestamp) is int
+    assert article.to_dict()["timestamp"] == 1700000100
+
+
+def test_copies_and_pickles_are_independent():
+    article = clean_article(
+        {"title": "Lido", "link": "http://www.lido.fi/", "snippet": "<b>Hi</b>"}
+    )
+    article["relevance"] = 9.0
+    copied = article.copy()
+    del copied["relevance"]
+    assert "relevance" not in copied
+    assert article["relevance"] == 9.0
+
+    restored = pickle.loads(pickle.dumps(article))
+    assert restored == article
+    del restored["relevance"]
+    assert "relevance" not in restored
+    assert restored["canonical_link"] == "https://lido.fi/"
+    # Keys come out in the order stored files have always had
+    assert list(restored.to_dict()) == ["title", "link", "snippet", "canonical_link"]
+
+
+def test_kept_articles_lose_their_score_in_place():
+    articles = to_articles(synthetic_articles(6, seed=5))
+    for score, article in enumerate(articles):
+        article["relevance"] = float(score)
+
+    kept = filter_and_sort_articles(articles, 3.0)
+
+    assert len(kept) == 3
+    timestamps = [article["timestamp"] for article in kept]
+    assert timestamps == sorted(timestamps, reverse=True)
+    # Not copies: the caller's articles are the ones returned
+    for article in kept:
+        assert any(article is original for original in articles)
+        assert "relevance" not in article
+    scores = [article["relevance"] for article in articles if "relevance" in article]
+    assert scores == [0.0, 1.0, 2.0]
@@ -0,0 +1,333 @@
+import json
+import sqlite3
+import time
+import urllib.error
+import urllib.request
+from unittest import mock
+
+import pytest
+
+from market_feed.benchmarks.corpora import synthetic_articles
+from market_feed.utils import article_index
+from market_feed.utils.article_api import start_article_api
+from market_feed.utils.article_index import (
+    DROP_SEARCH_SCHEMA,
+    SCHEMA,
+    SEARCH_SCHEMA,
+    ArticleIndex,
+    ArticleQuery,
+    SearchQuery,
+)
+
+
+def make_article(number, title, snippet, **extra):
+    # Shaped like a stored article; full_content is set only when fetched
+    timestamp = 1_700_000_000 + number
+    return {
+        "title": title,
+        "link": f"https://news.example/{number}",
+        "snippet": snippet,
+        "source": "Example",
+        "timestamp": timestamp,
+        "utc_time": time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime(timestamp)),
+        "tag": "independent-news",
+        "canonical_link": f"https://news.example/{number}",
+        **extra,
+    }
+
+
+def pages(index, query):
+    articles = []
+    while True:
+        page = index.query(query)
+        articles.extend(json.loads(article) for article in page.articles)
+        if page.next_cursor is None:
+            return articles
+        query = query._replace(before=page.next_cursor)
+
+
+def titles(index, text, **filters):
+    page = index.search(SearchQuery(text, **filters))
+    return [json.loads(article)["title"] for article in page.articles]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "articles.db")
+
+
+@pytest.fixture
+def index(path):
+    index = ArticleIndex(path)
+    yield index
+    index.close()
+
+
+@pytest.fixture
+def steth(index):
+    steth = synthetic_articles(120, seed=1)
+    index.replace_token("steth", steth)
+    index.replace_token("ldo", synthetic_articles(80, seed=2))
+    return steth
+
+
+@pytest.fixture
+def stories(index):
+    stories = [
+        make_article(1, "Lido staking router goes live", "Node operators join"),
+        make_article(2, "Staking yields compared", "Lido and Rocket Pool"),
+        make_article(3, "Router upgrade for staking", "A staking router vote"),
+        make_article(
+            4,
+            "Market wrap",
+            "Nothing about it",
+            full_content="Lido staking deposits rose as withdrawals cleared.",
+        ),
+    ]
+    index.replace_token("ldo", stories)
+    return stories
+
+
+def test_pagination_returns_each_article_once_newest_first(index, steth):
+    articles = pages(index, ArticleQuery(tokens=("steth",), limit=7))
+    assert len(articles) == len({a["canonical_link"] for a in steth})
+    timestamps = [article["timestamp"] for article in articles]
+    assert timestamps == sorted(timestamps, reverse=True)
+
+
+def test_filters_and_merged_timeline(index, steth):
+    since, until = 1_650_000_000, 1_690_000_000
+    articles = pages(
+        index,
+        ArticleQuery(tags=("dao-governance",), since=since, until=until, limit=10),
+    )
+    assert articles
+    assert {article["token"] for article in articles} == {"steth", "ldo"}
+    for article in articles:
+        assert article["tag"] == "dao-governance"
+        assert since <= article["timestamp"] < until
+
+
+def test_replace_bumps_version(index, steth):
+    before = index.versions(["steth"])["steth"]
+    index.replace_token("steth", steth[:10])
+    assert index.versions(["steth"])["steth"] == before + 1
+    assert len(pages(index, ArticleQuery(tokens=("steth",)))) <= 10
+
+
+def test_ranked_phrase_and_filtered_search(index, stories):
+    # Title matches outrank snippet and content matches
+    assert titles(index, "lido") == [
+        "Lido staking router goes live",
+        "Staking yields compared",
+        "Market wrap",
+    ]
+    assert titles(index, '"staking router"') == [
+        "Lido staking router goes live",
+        "Router upgrade for staking",
+    ]
+    assert titles(index, "stake", since=1_700_000_003) == [
+        "Router upgrade for staking",
+        "Market wrap",
+    ]
+    assert titles(index, "lido", tokens=("steth",)) == []
+
+
+def test_index_follows_replaced_and_added_articles(path, index, stories):
+    index.replace_token("ldo", stories[1:])
+    index.add_articles(
+        "ldo", [make_article(2, "Staking yields compared", "Rocket Pool only")]
+    )
+    assert titles(index, "lido") == ["Market wrap"]
+    assert titles(index, "rocket") == ["Staking yields compared"]
+
+    index.close()
+    reopened = ArticleIndex(path)
+    try:
+        assert titles(reopened, "rocket") == ["Staking yields compared"]
+    finally:
+        reopened.close()
+
+
+def test_articles_are_keyed_like_the_news_file(index, stories):
+    # Same link, another title: distinct stored articles, as duplicate_key has it
+    retitled = make_article(2, "Rocket Pool yields compared", "Lido and Rocket Pool")
+    index.replace_token("ldo", [*stories, retitled])
+    assert titles(index, "yields") == [
+        "Staking yields compared",
+        "Rocket Pool yields compared",
+    ]
+
+    index.replace_token("ldo", [*stories[:1], retitled, *stories[2:]])
+    assert titles(index, "yields") == ["Rocket Pool yields compared"]
+    assert len(pages(index, ArticleQuery(tokens=("ldo",)))) == 4
+
+
+def test_databases_from_before_search_are_indexed_on_open(tmp_path, stories):
+    path = str(tmp_path / "legacy.db")
+    with sqlite3.connect(path) as conn:
+        conn.executescript(SCHEMA)
+        conn.execute(
+            "INSERT INTO articles (token, url_key, timestamp, data) VALUES (?, ?, ?, ?)",
+            ("ldo", "https://news.example/1", 1, json.dumps(stories[0])),
+        )
+    conn.close()
+    index = ArticleIndex(path)
+    try:
+        assert titles(index, "router") == ["Lido staking router goes live"]
+    finally:
+        index.close()
+
+
+def test_older_search_schema_is_rebuilt_on_open(path, index, stories):
+    index.close()
+    with sqlite3.connect(path) as conn:
+        # The first search schema indexed a "content" key articles never have
+        conn.executescript(
+            DROP_SEARCH_SCHEMA + SEARCH_SCHEMA.replace("$.full_content", "$.content")
+        )
+        conn.execute("INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')")
+        conn.execute("PRAGMA user_version = 0")
+    conn.close()
+
+    reopened = ArticleIndex(path)
+    try:
+        assert titles(reopened, "withdrawal") == ["Market wrap"]
+    finally:
+        reopened.close()
+
+
+@pytest.fixture
+def shuffled(index, stories):
+    # Written newest first, so that insertion order is the reverse of time order
+    index.replace_token("ldo", [])
+    for story in reversed(stories):
+        index.add_articles("ldo", [story])
+    return stories
+
+
+def test_only_the_newest_matches_are_ranked(index, shuffled):
+    with mock.patch.object(article_index, "MAX_SEARCH_CANDIDATES", 2):
+        # The newest by timestamp are articles 3 and 4, though written first
+        assert titles(index, "staking") == ["Router upgrade for staking", "Market wrap"]
+        page = index.search(SearchQuery("staking", limit=1, offset=1))
+        assert (page.next_offset, page.truncated) == (None, True)
+        # The cut is only reported when a match was left out
+        assert not index.search(SearchQuery('"staking router"')).truncated
+
+        # A new timestamp moves an article among the newest
+        index.add_articles("ldo", [{**shuffled[0], "timestamp": 1_700_000_005}])
+        assert titles(index, "staking") == [
+            "Lido staking router goes live",
+            "Market wrap",
+        ]
+    assert not index.search(SearchQuery("staking")).truncated
+
+
+# The articles table of the first releases: keyed on the URL alone, with ids
+# in insertion order
+LEGACY_ARTICLES = """
+CREATE TABLE articles (
+    id INTEGER PRIMARY KEY,
+    token TEXT NOT NULL,
+    url_key TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    tag TEXT,
+    source TEXT,
+    data TEXT NOT NULL,
+    UNIQUE (token, url_key)
+);
+"""
+
+
+def test_older_articles_tables_are_rebuilt_on_open(tmp_path, stories):
+    path = str(tmp_path / "legacy.db")
+    with sqlite3.connect(path) as conn:
+        conn.executescript(LEGACY_ARTICLES + SEARCH_SCHEMA)
+        conn.executemany(
+            """
+            INSERT INTO articles (token, url_key, timestamp, source, data)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            [
+                ("ldo", s["link"], s["timestamp"], s["source"], json.dumps(s))
+                for s in reversed(stories)
+            ],
+        )
+        conn.execute("PRAGMA user_version = 1")
+    conn.close()
+
+    index = ArticleIndex(path)
+    try:
+        # Ids now follow timestamps, though the rows were written newest first
+        with mock.patch.object(article_index, "MAX_SEARCH_CANDIDATES", 2):
+            assert titles(index, "staking") == [
+                "Router upgrade for staking",
+                "Market wrap",
+            ]
+        page = index.query(ArticleQuery(tokens=("ldo",)))
+        assert [json.loads(a)["title"] for a in page.articles][0] == "Market wrap"
+
+        # And rows are keyed on the title too
+        retitled = make_article(2, "Rocket Pool yields compared", "Rocket Pool")
+        index.add_articles("ldo", [retitled])
+        assert len(pages(index, ArticleQuery(tokens=("ldo",)))) == 5
+    finally:
+        index.close()
+
+
+def test_paging_and_bad_queries(index, stories):
+    page = index.search(SearchQuery("staking", limit=3))
+    assert (len(page.articles), page.next_offset) == (3, 3)
+    page = index.search(SearchQuery("staking", limit=3, offset=3))
+    assert (len(page.articles), page.next_offset) == (1, None)
+    with pytest.raises(ValueError):
+        index.search(SearchQuery('"unbalanced'))
+
+
+@pytest.fixture
+def api(path, index):
+    index.replace_token("steth", synthetic_articles(30))
+    server = start_article_api(path, port=0)
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def get(url, etag=None):
+    request = urllib.request.Request(url)
+    if etag:
+        request.add_header("If-None-Match", etag)
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers.get("ETag"), response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers.get("ETag"), b""
+
+
+def test_api_etag_revalidation(api, index):
+    status, etag, body = get(api + "/articles?token=stETH&limit=5")
+    assert status == 200
+    assert len(json.loads(body)["articles"]) == 5
+
+    assert get(api + "/articles?token=stETH&limit=5", etag)[0] == 304
+
+    index.replace_token("steth", synthetic_articles(31))
+    status, new_etag, _ = get(api + "/articles?token=stETH&limit=5", etag)
+    assert status == 200
+    assert new_etag != etag
+
+
+def test_api_bad_requests(api):
+    assert get(api + "/articles?since=yesterday")[0] == 400
+    assert get(api + "/nothing")[0] == 404
+    assert get(api + "/search?token=steth")[0] == 400
+    assert get(api + "/search?q=%22lido")[0] == 400
+
+
+def test_api_search(api):
+    status, etag, body = get(api + "/search?q=lido&token=stETH&limit=5")
+    assert status == 200
+    assert json.loads(body)["articles"]
+    assert json.loads(body)["truncated"] is False
+    assert get(api + "/search?q=lido&token=stETH&limit=5", etag)[0] == 304
@@ -0,0 +1,96 @@
+import json
+import os
+from unittest import mock
+
+import pytest
+
+from market_feed.benchmarks.corpora import synthetic_articles
+from market_feed.feeds import check_storage
+from market_feed.utils import article_store
+from market_feed.utils.article_store import (
+    CODECS,
+    check_compression,
+    convert_file,
+    format_utc_times,
+    is_compact_file,
+    load_articles,
+    load_columns,
+    save_articles,
+)
+from market_feed.utils.json_utils import save_to_json
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "steth_news.mfa")
+
+
+@pytest.fixture
+def articles():
+    return synthetic_articles(300, seed=2)
+
+
+def test_round_trip_for_every_codec(path, articles):
+    for compression in CODECS:
+        save_articles(articles, path, compression)
+        assert is_compact_file(path)
+        assert load_articles(path) == articles
+
+
+def test_zstd_without_zstandard_is_refused_up_front(path, articles):
+    compact_zstd = {"storage": {"format": "compact", "compression": "zstd"}}
+    with mock.patch.object(article_store, "zstandard", None):
+        with pytest.raises(ValueError, match="zstandard"):
+            check_storage(compact_zstd)
+        with pytest.raises(ValueError, match="zstandard"):
+            save_articles(articles, path, "zstd")
+        # Only the compact format compresses
+        check_storage({"storage": {"format": "json", "compression": "zstd"}})
+    with pytest.raises(ValueError, match="Unknown compression"):
+        check_compression("lz4")
+
+
+def test_round_trip_keeps_irregular_articles_exact(path, articles):
+    articles = [dict(article) for article in articles[:5]]
+    del articles[0]["tag"]
+    articles[1]["title"] = None
+    articles[2]["aliases"] = [{"link": "https://decrypt.co/1", "timestamp": 1}]
+    articles[3]["snippet"] = "Line one\x00line two"
+    articles[4]["utc_time"] = "not derivable"
+
+    save_articles(articles, path)
+    assert load_articles(path) == articles
+
+
+def test_empty_and_missing_files(tmp_path, path):
+    save_articles([], path)
+    assert load_articles(path) == []
+    assert load_articles(str(tmp_path / "none.mfa")) == []
+
+
+def test_load_columns(path, articles):
+    save_articles(articles, path)
+    columns = load_columns(path, ["timestamp", "utc_time", "source", "nope"])
+    assert set(columns) == {"timestamp", "utc_time", "source"}
+    for name in columns:
+        assert columns[name] == [article[name] for article in articles]
+
+
+def test_utc_time_matches_strftime():
+    assert format_utc_times([0, 1728991996]) == [
+        "1970-01-01 00:00:00 UTC",
+        "2024-10-15 11:33:16 UTC",
+    ]
+
+
+def test_convert_and_read_legacy_json(tmp_path, path, articles):
+    json_path = str(tmp_path / "steth_news.json")
+    save_to_json(articles, json_path)
+    assert load_articles(json_path) == articles
+
+    output_path = convert_file(json_path)
+    assert output_path == path
+    assert load_articles(output_path) == articles
+    assert os.path.getsize(output_path) < os.path.getsize(json_path) / 3
+    with open(json_path) as f:
+        assert json.load(f) == articles
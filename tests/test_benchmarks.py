@@ -0,0 +1,41 @@
+import logging
+
+import pytest
+
+from market_feed.benchmarks import run_benchmarks
+from market_feed.benchmarks.__main__ import main
+
+
+def test_fixture_cases_replay(capsys):
+    names = [
+        "fetch_rss_feed[ghost]",
+        "fetch_publication_date[meta]",
+        "remove_duplicates",
+    ]
+    results = run_benchmarks(names, sizes=[10], min_time=0, trace_memory=False)
+
+    # Failing cases are reported and skipped rather than raised
+    assert "failed" not in capsys.readouterr().out
+    assert [result.key for result in results] == [
+        "fetch_rss_feed[ghost]",
+        "fetch_publication_date[meta]",
+        "remove_duplicates[10]",
+    ]
+    assert all(result.items > 0 and result.runs >= 1 for result in results)
+
+
+@pytest.fixture
+def keep_log_level():
+    # The runner quiets the market_feed logger for the timings
+    logger = logging.getLogger("market_feed")
+    level = logger.level
+    yield
+    logger.setLevel(level)
+
+
+def test_runner_checks_against_a_baseline(tmp_path, capsys, keep_log_level):
+    baseline = str(tmp_path / "baseline.json")
+    args = ["parse_relative_date", "--min-time", "0", "--no-memory"]
+    assert main([*args, "--baseline", baseline, "--save-baseline"]) == 0
+    assert main([*args, "--baseline", baseline, "--check", "--tolerance", "100"]) == 0
+    assert "vs baseline" in capsys.readouterr().out
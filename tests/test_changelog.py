@@ -0,0 +1,124 @@
+import json
+import threading
+import time
+from unittest import mock
+from urllib.request import Request, urlopen
+
+import pytest
+
+from market_feed import feeds
+from market_feed.feeds import news
+from market_feed.utils import changelog
+from market_feed.utils.changelog import Changelog, start_event_stream
+
+
+def make_articles(*titles):
+    return [
+        {
+            "title": title,
+            "link": f"https://news.example/{title}",
+            "snippet": "",
+            "source": "Example",
+            "timestamp": 1700000000 + number,
+            "utc_time": "",
+            "tag": "independent-news",
+        }
+        for number, title in enumerate(titles)
+    ]
+
+
+@pytest.fixture
+def log(tmp_path):
+    log = Changelog(str(tmp_path / "changelog.db"))
+    yield log
+    log.close()
+
+
+def titles(events):
+    return [json.loads(event.data)["title"] for event in events]
+
+
+def test_consumers_resume_from_their_committed_offset(log):
+    log.publish("ldo", make_articles("a", "b"))
+    log.publish("steth", make_articles("c"))
+
+    first = log.subscribe("bot", timeout=0)
+    assert titles(first) == ["a", "b", "c"]
+    log.publish("ldo", make_articles("d"))
+    assert titles(log.subscribe("bot", timeout=0)) == ["d"]
+    assert titles(log.subscribe("other", tokens=("steth",), timeout=0)) == ["c"]
+    assert log.offset("bot") == 4
+
+
+def test_filtered_reads_move_past_other_tokens(log):
+    log.publish("ldo", make_articles(*"abcde"))
+    batch = log.read(0, tokens=("steth",))
+    assert batch.events == []
+    assert batch.next_offset == 5
+    assert log.read(0, limit=2).next_offset == 2
+
+
+def test_retention_drops_the_oldest_events(tmp_path):
+    log = Changelog(str(tmp_path / "changelog.db"), retention=3)
+    log.publish("ldo", make_articles(*"abcde"))
+    assert titles(log.read(0).events) == ["c", "d", "e"]
+
+
+def test_reader_in_another_process_sees_new_events(log):
+    reader = Changelog(log.path)
+    threading.Timer(0.1, log.publish, ("ldo", make_articles("late"))).start()
+    started = time.monotonic()
+    assert reader.wait(0, timeout=5)
+    assert time.monotonic() - started < 1
+    assert titles(reader.read(0).events) == ["late"]
+
+
+def read_events(response, count):
+    events = []
+    while len(events) < count:
+        fields = {}
+        for line in iter(response.readline, b"\n"):
+            name, _, value = line.decode().rstrip("\n").partition(": ")
+            fields[name] = value
+        if "id" in fields:
+            events.append((int(fields["id"]), json.loads(fields["data"])["title"]))
+    return events
+
+
+def test_event_stream_pushes_new_articles_and_resumes(log):
+    server = start_event_stream(log, port=0)
+    url = f"http://127.0.0.1:{server.server_port}/events?consumer=dashboard"
+    try:
+        log.publish("ldo", make_articles("before"))
+        with urlopen(url, timeout=5) as response:
+            # A consumer without a committed offset starts from the beginning
+            assert read_events(response, 1) == [(1, "before")]
+            started = time.monotonic()
+            log.publish("ldo", make_articles("pushed"))
+            assert read_events(response, 1) == [(2, "pushed")]
+            assert time.monotonic() - started < 1
+
+        log.publish("steth", make_articles("missed", "also missed"))
+        request = Request(url, headers={"Last-Event-ID": "2"})
+        with urlopen(request, timeout=5) as response:
+            assert read_events(response, 2) == [(3, "missed"), (4, "also missed")]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_get_content_publishes_only_new_articles(tmp_path, log):
+    config = {"output_dir": str(tmp_path), "default_relevance_threshold": 0}
+    token = {"name": "Lido DAO", "symbol": "LDO", "mandatory_phrases": ["lido"]}
+    pages = [make_articles("lido one"), make_articles("lido one", "lido two")]
+    with mock.patch.object(
+        news, "fetch_news_page", side_effect=lambda *args: pages.pop(0)
+    ), mock.patch.object(feeds, "fetch_token_rss", return_value=[]), mock.patch.object(
+        changelog, "shared_changelog", log
+    ):
+        feeds.get_content(token, config)
+        feeds.get_content(token, config)
+
+    events = log.read(0).events
+    assert {event.token for event in events} == {"ldo"}
+    assert titles(events) == ["lido one", "lido two"]
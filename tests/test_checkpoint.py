@@ -0,0 +1,129 @@
+import os
+from datetime import datetime, timezone
+from unittest import mock
+
+import pytest
+
+from market_feed import feeds
+from market_feed.feeds import news, pipeline
+from market_feed.feeds.checkpoint import Checkpoint, get_checkpoint_file
+from market_feed.feeds.pipeline import get_journal_file
+from market_feed.utils import json_utils
+from market_feed.utils.json_utils import load_from_json, save_to_json
+
+TOKEN = {
+    "name": "Lido DAO",
+    "symbol": "LDO",
+    "mandatory_phrases": ["lido"],
+    "additional_phrases": ["dao"],
+}
+BASE_QUERY, DAO_QUERY = news.generate_queries(TOKEN)
+PAGE_SIZES = {(BASE_QUERY, 1): 100, (BASE_QUERY, 2): 20, (DAO_QUERY, 1): 5}
+
+
+def make_page(query, page):
+    return [
+        {
+            "title": f"{query} {page} {number}",
+            "link": f"https://news.example/{len(query)}/{page}/{number}",
+            "snippet": "",
+            "source": "Example",
+            "timestamp": 1700000000 + number,
+            "utc_time": "",
+            "tag": "independent-news",
+            "relevance": 10.0,
+        }
+        for number in range(PAGE_SIZES[(query, page)])
+    ]
+
+
+class FakeSerpApi:
+    """Serves PAGE_SIZES pages, recording calls and failing at crash_at."""
+
+    def __init__(self):
+        self.calls = []
+        self.crash_at = None
+
+    def fetch_news_page(self, query, start_date, end_date, page):
+        if (query, page) == self.crash_at:
+            raise RuntimeError("killed")
+        self.calls.append((query, page, start_date, end_date))
+        return make_page(query, page)
+
+
+@pytest.fixture
+def serpapi():
+    serpapi = FakeSerpApi()
+    with mock.patch.object(
+        news, "fetch_news_page", serpapi.fetch_news_page
+    ), mock.patch.object(feeds, "fetch_token_rss", return_value=[]), mock.patch.object(
+        pipeline, "iter_token_rss", return_value=[]
+    ):
+        yield serpapi
+
+
+@pytest.fixture
+def config(tmp_path):
+    return {"output_dir": str(tmp_path), "default_relevance_threshold": 5}
+
+
+@pytest.mark.parametrize(
+    "streaming, get_progress_file",
+    [(False, get_checkpoint_file), (True, get_journal_file)],
+    ids=["batch", "streaming"],
+)
+def test_interrupted_cycle_resumes_without_refetching(
+    tmp_path, config, serpapi, streaming, get_progress_file
+):
+    config["pipeline"] = {"streaming": streaming}
+    serpapi.crash_at = (DAO_QUERY, 1)
+    with pytest.raises(RuntimeError):
+        feeds.get_content(TOKEN, config)
+    progress_file = get_progress_file(TOKEN, str(tmp_path))
+    assert os.path.exists(progress_file)
+    first_window = serpapi.calls[0][2:]
+
+    serpapi.crash_at, serpapi.calls = None, []
+    assert feeds.get_content(TOKEN, config) == 125
+
+    # Only the missing page is paid for, over the interrupted cycle's window
+    assert serpapi.calls == [(DAO_QUERY, 1, *first_window)]
+    assert len(load_from_json(str(tmp_path / "ldo_news.json"))) == 125
+    assert not os.path.exists(progress_file)
+
+
+def test_truncated_last_page_is_fetched_again(tmp_path, serpapi):
+    checkpoint = Checkpoint(get_checkpoint_file(TOKEN, str(tmp_path)))
+    start, end = datetime(2024, 1, 1, tzinfo=timezone.utc), datetime.now(timezone.utc)
+    checkpoint.begin(start, end)
+    checkpoint.append(BASE_QUERY, 1, make_page(BASE_QUERY, 1))
+    with open(checkpoint.path, "a") as f:
+        f.write('{"query": "lido", "page": 2, "arti')
+
+    resumed = Checkpoint(checkpoint.path)
+    assert resumed.resume()
+    assert (resumed.start_date, resumed.end_date) == (start, end)
+    assert resumed.progress() == {BASE_QUERY: (1, 100)}
+
+    news.fetch_token_news(TOKEN, start, end, resumed)
+    assert [call[:2] for call in serpapi.calls] == [(BASE_QUERY, 2), (DAO_QUERY, 1)]
+
+    # The partial line was cut, so the pages fetched since are all readable
+    reloaded = Checkpoint(checkpoint.path)
+    assert reloaded.resume()
+    assert reloaded.progress() == {BASE_QUERY: (2, 20), DAO_QUERY: (1, 5)}
+
+
+def test_failed_write_keeps_the_previous_file(tmp_path):
+    path = str(tmp_path / "ldo_news.json")
+    save_to_json([{"title": "Stored"}], path)
+
+    def partial_dump(data, f, **kwargs):
+        f.write('[{"title": ')
+        raise OSError("disk full")
+
+    with mock.patch.object(json_utils.json, "dump", partial_dump):
+        with pytest.raises(OSError):
+            save_to_json([{"title": "New"}], path)
+
+    assert load_from_json(path) == [{"title": "Stored"}]
@@ -0,0 +1,111 @@
+import json
+import subprocess
+import sys
+from unittest import mock
+
+import pytest
+import yaml
+
+from market_feed import __main__ as cli
+
+# Modules only the commands that fetch or score articles may import
+HEAVY_MODULES = {"web3", "nltk", "bs4", "serpapi", "feedparser", "requests", "rich"}
+
+
+def imported_modules(*args):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "market_feed", *args],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return {
+        line.rsplit("|", 1)[1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:") and "|" in line
+    }
+
+
+@pytest.mark.parametrize("args", [["--help"], ["bench", "--list"]])
+def test_light_commands_skip_heavy_imports(args):
+    modules = imported_modules(*args)
+    assert "market_feed" in modules
+    assert not {module.split(".")[0] for module in modules} & HEAVY_MODULES
+
+
+def test_arguments_reach_the_command():
+    with mock.patch("market_feed.service.fetch_once", return_value=2) as fetch_once:
+        assert cli.main(["fetch-once", "--config", "other.yaml", "LDO"]) == 1
+    fetch_once.assert_called_once_with("other.yaml", ["LDO"])
+
+    # Importing curve_tokens loads chain data over the network, so only the
+    # parsed arguments are checked
+    args = cli.build_parser().parse_args(["refresh-tokens", "--config", "other.yaml"])
+    assert (args.handler, args.config) == (cli.refresh_tokens, "other.yaml")
+
+    with pytest.raises(SystemExit):
+        cli.main(["rescore", "--unknown"])
+
+
+def test_bench_options_are_passed_through():
+    with mock.patch("market_feed.benchmarks.__main__.main", return_value=0) as bench:
+        assert cli.main(["bench", "--check", "parse_relative_date"]) == 0
+    assert bench.call_args.args[0] == ["--check", "parse_relative_date"]
+
+
+def test_rescore_drops_articles_below_the_new_threshold(tmp_path):
+    articles = [
+        {
+            "title": f"Lido staking update {number}" if number % 2 else "Unrelated",
+            "link": f"https://news.example/{number}",
+            "snippet": "lido stETH staking rewards" if number % 2 else "",
+            "source": "Example",
+            "timestamp": 1700000000 + number,
+            "utc_time": "",
+            "tag": "independent-news",
+        }
+        for number in range(6)
+    ]
+    (tmp_path / "ldo_news.json").write_text(json.dumps(articles))
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        yaml.safe_dump(
+            {
+                "output_dir": str(tmp_path),
+                "default_relevance_threshold": 5,
+                "tokens": [
+                    {"name": "Lido DAO", "symbol": "LDO", "mandatory_phrases": ["lido"]}
+                ],
+            }
+        )
+    )
+
+    assert cli.main(["rescore", "--config", str(config_file), "ldo"]) == 0
+    kept = json.loads((tmp_path / "ldo_news.json").read_text())
+    assert [article["title"] for article in kept] == [
+        "Lido staking update 5",
+        "Lido staking update 3",
+        "Lido staking update 1",
+    ]
+    assert cli.main(["rescore", "--config", str(config_file), "steth"]) == 1
+
+
+@pytest.mark.parametrize("command", ["fetch-once", "rescore"])
+def test_one_off_commands_refuse_sharded_configs(tmp_path, command):
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        yaml.safe_dump(
+            {
+                "output_dir": str(tmp_path),
+                "sharding": {"enabled": True},
+                "tokens": [{"name": "Lido DAO", "symbol": "LDO"}],
+            }
+        )
+    )
+    with mock.patch("market_feed.service.get_content") as get_content, mock.patch(
+        "market_feed.service.rescore_token"
+    ) as rescore_token:
+        assert cli.main([command, "--config", str(config_file)]) == 1
+    get_content.assert_not_called()
+    rescore_token.assert_not_called()
+    assert not (tmp_path / "leases.db").exists()
@@ -0,0 +1,58 @@
+import html
+import re
+
+import feedparser
+import pytest
+
+from market_feed.benchmarks.corpora import read_fixture
+from market_feed.utils.content_utils import truncate_snippet, truncate_snippets
+
+
+def full_cleanup(snippet, max_length=500):
+    """Clean the whole snippet before truncating, as truncate_snippet used to."""
+    text = " ".join(re.sub(r"<[^>]+>", "", html.unescape(snippet)).split())
+    if len(text) <= max_length:
+        return text
+    truncated = text[:max_length]
+    last_sentence = truncated.rfind(".")
+    return (
+        f"{truncated[:last_sentence + 1]} ..."
+        if last_sentence > 0
+        else f"{truncated}..."
+    )
+
+
+@pytest.mark.parametrize(
+    "feed", ["ghost_blog.rss", "discourse_latest.rss", "medium_feed.rss"]
+)
+def test_matches_full_cleanup_on_feed_summaries(feed):
+    summaries = [
+        entry.get("summary", "")
+        for entry in feedparser.parse(read_fixture(feed)).entries
+    ]
+    assert truncate_snippets(summaries) == [
+        full_cleanup(summary) for summary in summaries
+    ]
+
+
+def test_window_grows_past_markup():
+    # Far more markup than the first window, with the text at the end
+    snippet = '<img src="x.png" alt="">' * 500 + "<p>Lido&nbsp;v3 is live.</p>"
+    assert truncate_snippet(snippet, 20) == "Lido v3 is live."
+
+
+@pytest.mark.parametrize("tail", ['<a href="https://lido.fi">', "&amp;", "&#8217;"])
+def test_cut_inside_a_tag_or_reference(tail):
+    text = "word " * 40
+    snippet = text + tail + "more " * 400
+    for size in range(len(text), len(text) + len(tail)):
+        max_length = size // 4
+        assert truncate_snippet(snippet, max_length) == full_cleanup(
+            snippet, max_length
+        )
+
+
+def test_collapses_whitespace_and_handles_empty():
+    assert truncate_snippet("  Lido\n\n<b>stETH</b>\t ") == "Lido stETH"
+    assert truncate_snippet(None) == ""
+    assert truncate_snippets(["", "a &amp; b"]) == ["", "a & b"]
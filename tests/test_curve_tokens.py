@@ -0,0 +1,99 @@
+import sys
+import types
+from unittest import mock
+
+import pytest
+
+# coin_utils downloads the chain list when imported; the refresh only needs
+# fetch_token_info, which every test replaces
+with mock.patch.dict(
+    sys.modules,
+    {"market_feed.utils.coin_utils": types.SimpleNamespace(fetch_token_info=None)},
+):
+    from market_feed import curve_tokens
+
+NETWORKS = {"ethereum": 1}
+ADDRESSES = ["0x" + "a" * 40, "0x" + "b" * 40]
+
+
+def token_list(*addresses):
+    return {"data": {"tokens": [{"address": address} for address in addresses]}}
+
+
+class FakeCurve:
+    """Curve token API answering with an ETag and 304 for a matching one."""
+
+    def __init__(self, addresses, etag="v1"):
+        self.addresses = addresses
+        self.etag = etag
+        self.requests = []
+
+    def __call__(self, url, etag=None):
+        self.requests.append(etag)
+        if etag == self.etag:
+            return None, etag
+        return token_list(*self.addresses), self.etag
+
+
+@pytest.fixture
+def refresh():
+    config = {"tokens": []}
+    state = {"platforms": {}, "networks": {}}
+    store = curve_tokens.ConfigTokenStore(config)
+
+    def refresh(curve, token_info):
+        with mock.patch.object(
+            curve_tokens, "conditional_get_json", curve
+        ), mock.patch.object(
+            curve_tokens, "fetch_token_info", side_effect=token_info
+        ) as fetch_info, mock.patch.object(
+            curve_tokens, "save_config"
+        ), mock.patch.object(
+            curve_tokens, "save_refresh_state"
+        ):
+            counts = curve_tokens.fetch_and_update_coins(NETWORKS, store, state)
+        return counts, fetch_info.call_count
+
+    refresh.config = config
+    refresh.state = state
+    return refresh
+
+
+def info(address, chain_id):
+    return f"Token {address[2]}", address[2].upper()
+
+
+def test_unchanged_list_is_skipped_on_304(refresh):
+    curve = FakeCurve(ADDRESSES)
+    assert refresh(curve, info) == ((2, 0), 2)
+    assert refresh.state["networks"]["ethereum"]["etag"] == "v1"
+
+    assert refresh(curve, info) == ((0, 0), 0)
+    assert curve.requests == [None, "v1"]
+    assert len(refresh.config["tokens"]) == 2
+
+
+def test_unresolved_tokens_are_retried(refresh):
+    curve = FakeCurve(ADDRESSES)
+
+    def first_fails(address, chain_id):
+        return None if address == ADDRESSES[0] else info(address, chain_id)
+
+    assert refresh(curve, first_fails) == ((1, 0), 2)
+    network = refresh.state["networks"]["ethereum"]
+    # No ETag, so the next refresh is not answered with a 304
+    assert "etag" not in network
+    assert network["addresses"] == [ADDRESSES[1]]
+
+    assert refresh(curve, info) == ((1, 0), 1)
+    assert curve.requests == [None, None]
+    assert network["etag"] == "v1"
+    assert sorted(token["symbol"] for token in refresh.config["tokens"]) == ["A", "B"]
+
+
+def test_delisted_tokens_are_marked_inactive(refresh):
+    refresh(FakeCurve(ADDRESSES), info)
+    assert refresh(FakeCurve(ADDRESSES[1:], etag="v2"), info) == ((0, 1), 0)
+    removed = [token for token in refresh.config["tokens"] if token["symbol"] == "A"]
+    assert removed[0]["active"] is False
+    assert refresh.state["networks"]["ethereum"]["etag"] == "v2"
@@ -0,0 +1,154 @@
+import calendar
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock
+
+import feedparser
+import pytest
+
+from market_feed.benchmarks.corpora import read_fixture
+from market_feed.feeds import feed_parser
+from market_feed.feeds.feed_parser import FeedParser, HighWaterMarks
+from market_feed.feeds.rss import parse_feed_entry
+
+BROKEN_FEED = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Lido &amp; friends</title>
+<item><title>stETH&nbsp;update</title><link>https://blog.lido.fi/a/</link>
+<description>Body</description><pubDate>Tue, 15 Oct 2024 11:33:16 +0000</pubDate></item>
+</channel></rss>"""
+
+
+def response(data, chunk_size=4096):
+    body = mock.MagicMock()
+    body.__enter__.return_value = body
+    body.iter_content.side_effect = lambda size: (
+        data[start : start + chunk_size] for start in range(0, len(data), chunk_size)
+    )
+    return body
+
+
+def parse(data, parser=None, high_water=None):
+    with mock.patch.object(
+        feed_parser.http_utils.requests, "request", return_value=response(data)
+    ):
+        return (parser or FeedParser()).parse("https://blog.lido.fi/rss/", high_water)
+
+
+def articles(feed):
+    title = feed.feed.get("title", "Unknown")
+    return [
+        parse_feed_entry(entry, title, "asset-issuer", False).to_dict()
+        for entry in feed.entries
+    ]
+
+
+@pytest.mark.parametrize(
+    "feed",
+    [
+        "ghost_blog.rss",
+        "discourse_latest.rss",
+        "medium_feed.rss",
+        "atom_feed.xml",
+        "rss1_feed.rdf",
+    ],
+)
+def test_matches_feedparser_articles(feed):
+    data = read_fixture(feed)
+    assert articles(parse(data)) == articles(feedparser.parse(data))
+
+
+def test_reads_rss_1_feeds():
+    feed = parse(read_fixture("rss1_feed.rdf"))
+    assert feed.feed["title"] == "Lido Research Digest"
+    assert len(feed.entries) == 3
+    for entry in feed.entries:
+        assert entry["title"]
+        assert entry["link"].startswith("https://research.lido.fi/t/")
+        assert entry["summary"]
+        assert entry["published_parsed"] is not None
+
+
+def test_stops_at_high_water_mark():
+    data = read_fixture("ghost_blog.rss")
+    entries = feedparser.parse(data).entries
+    mark = calendar.timegm(entries[3].published_parsed)
+
+    feed = parse(data, high_water=mark)
+    assert [entry["link"] for entry in feed.entries[:4]] == [
+        entry.link for entry in entries[:4]
+    ]
+    assert len(feed.entries) == 4
+
+
+def test_ignores_high_water_mark_when_not_newest_first():
+    items = [
+        f"<item><title>{day}</title><pubDate>{day} Oct 2024 10:00:00 +0000</pubDate></item>"
+        for day in (14, 20, 5, 15)
+    ]
+    data = f"<rss><channel><title>Hot</title>{''.join(items)}</channel></rss>"
+    feed = parse(data.encode(), high_water=calendar.timegm((2024, 10, 12, 0, 0, 0)))
+    assert [entry["title"] for entry in feed.entries] == ["14", "20", "5", "15"]
+
+
+def test_falls_back_to_feedparser_for_malformed_feeds():
+    feed = parse(BROKEN_FEED)
+    assert feed.feed["title"] == "Lido & friends"
+    assert len(feed.entries) == 1
+    assert feed.entries[0]["link"] == "https://blog.lido.fi/a/"
+
+
+def test_keeps_complete_entries_of_an_oversized_feed():
+    data = read_fixture("ghost_blog.rss")
+    feed = parse(data, FeedParser(max_bytes=len(data) // 2))
+    assert 0 < len(feed.entries) < 15
+    assert feed.feed["title"] == "Lido Finance"
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml")
+        self.end_headers()
+        self.wfile.write(b"<rss><channel><title>Slow</title>")
+        self.wfile.flush()
+        time.sleep(2)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def slow_server():
+    server = HTTPServer(("127.0.0.1", 0), SlowHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_read_timeout_gives_an_empty_feed(slow_server):
+    started = time.monotonic()
+    feed = FeedParser(read_timeout=0.2).parse(
+        f"http://127.0.0.1:{slow_server.server_port}/rss"
+    )
+    assert time.monotonic() - started < 1.5
+    assert feed.entries == []
+
+
+def test_marks_only_move_forward_and_persist(tmp_path):
+    path = str(tmp_path / "steth_feeds.json")
+    marks = HighWaterMarks(path)
+    entries = feedparser.parse(read_fixture("ghost_blog.rss")).entries
+    marks.advance("ghost", entries[5:])
+    marks.advance("ghost", entries)
+    marks.advance("ghost", entries[8:])
+    marks.advance("undated", [{"title": "No date"}])
+    marks.advance("hot", entries[:1])
+    marks.advance("hot", entries[::-1])
+    marks.save()
+
+    assert HighWaterMarks(path).marks == {
+        "ghost": calendar.timegm(entries[0].published_parsed)
+    }
@@ -0,0 +1,179 @@
+from unittest import mock
+
+import pytest
+import requests
+
+from market_feed.utils import http_utils
+from market_feed.utils.http_utils import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    RetryBudget,
+)
+
+URL = "https://api.example.com/data"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def fresh_hosts():
+    http_utils.configure({"failure_threshold": 3, "reset_timeout": 30})
+    yield
+    http_utils.configure(
+        {
+            "failure_threshold": http_utils.DEFAULT_FAILURE_THRESHOLD,
+            "reset_timeout": http_utils.DEFAULT_RESET_TIMEOUT,
+            "retry_ratio": http_utils.DEFAULT_RETRY_RATIO,
+            "retry_burst": http_utils.DEFAULT_RETRY_BURST,
+        }
+    )
+
+
+@pytest.fixture
+def no_sleep():
+    with mock.patch.object(http_utils.time, "sleep") as sleep:
+        yield sleep
+
+
+def ok(status=200):
+    return mock.Mock(status_code=status)
+
+
+def test_breaker_opens_probes_and_closes():
+    clock = FakeClock()
+    breaker = CircuitBreaker("rpc.example", failure_threshold=2, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    clock.now += breaker.reset_timeout
+    # One probe goes through; everyone else still fails fast
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_the_circuit():
+    clock = FakeClock()
+    breaker = CircuitBreaker("rpc.example", failure_threshold=1, clock=clock)
+    breaker.record_failure()
+    clock.now += breaker.reset_timeout
+    assert breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now += breaker.reset_timeout - 1
+    assert not breaker.allow()
+
+
+def test_open_circuit_fails_fast_without_calling_the_host():
+    with mock.patch.object(
+        http_utils.requests, "request", side_effect=requests.ConnectionError
+    ) as call:
+        for _ in range(3):
+            with pytest.raises(requests.ConnectionError):
+                http_utils.get(URL)
+        with pytest.raises(CircuitOpenError):
+            http_utils.get(URL)
+        assert call.call_count == 3
+
+    # Other hosts are unaffected
+    with mock.patch.object(http_utils.requests, "request", return_value=ok()):
+        assert http_utils.get("https://other.example/").status_code == 200
+
+
+def test_server_errors_are_retried_with_backoff(no_sleep):
+    with mock.patch.object(
+        http_utils.requests, "request", side_effect=[ok(503), ok(502), ok()]
+    ) as call:
+        response = http_utils.get(URL, retries=3, backoff=0.5)
+
+    assert response.status_code == 200
+    assert call.call_count == 3
+    assert [delay for (delay,), _ in no_sleep.call_args_list] == [0.5, 1.0]
+
+
+def test_client_errors_are_not_retried(no_sleep):
+    with mock.patch.object(
+        http_utils.requests, "request", return_value=ok(404)
+    ) as call:
+        assert http_utils.get(URL, retries=3).status_code == 404
+    assert call.call_count == 1
+    assert http_utils.breaker_for("api.example.com").failures == 0
+
+
+def test_retry_budget_limits_retries_across_requests(no_sleep):
+    http_utils.configure({"failure_threshold": 100, "retry_ratio": 0, "retry_burst": 2})
+    with mock.patch.object(
+        http_utils.requests, "request", return_value=ok(503)
+    ) as call:
+        for _ in range(3):
+            assert http_utils.get(URL, retries=5).status_code == 503
+
+    # Two retries in all, then every request gets a single attempt
+    assert call.call_count == 5
+
+
+def test_retry_budget_refills_with_requests():
+    budget = RetryBudget(ratio=0.5, burst=1)
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
+
+
+def test_deadline_caps_timeouts():
+    assert http_utils.request_timeout((10, 30)) == (10, 30)
+    with http_utils.deadline(5):
+        connect, read = http_utils.request_timeout((10, 30))
+        assert 4 < connect <= 5 and 4 < read <= 5
+        assert http_utils.request_timeout(2) == 2
+        # Nested deadlines only shorten the outer one
+        with http_utils.deadline(60):
+            assert http_utils.remaining() <= 5
+        with http_utils.deadline(1):
+            assert http_utils.request_timeout(None) <= 1
+    assert http_utils.remaining() is None
+
+
+def test_expired_deadline_stops_requests_and_retries(no_sleep):
+    with mock.patch.object(
+        http_utils.requests, "request", return_value=ok(503)
+    ) as call:
+        with http_utils.deadline(0.05):
+            # Too little time left to back off and retry
+            assert http_utils.get(URL, retries=3, backoff=1).status_code == 503
+        with http_utils.deadline(0):
+            with pytest.raises(DeadlineExceeded):
+                http_utils.get(URL)
+    assert call.call_count == 1
+    assert call.call_args.kwargs["timeout"] <= 0.05
+
+
+def test_guarded_counts_network_errors_only():
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            with http_utils.guarded("serpapi.com"):
+                raise ValueError("bad JSON")
+    assert http_utils.breaker_for("serpapi.com").state == CircuitBreaker.CLOSED
+
+    for _ in range(3):
+        with pytest.raises(requests.Timeout):
+            with http_utils.guarded("serpapi.com"):
+                raise requests.Timeout
+    with pytest.raises(CircuitOpenError):
+        with http_utils.guarded("serpapi.com"):
+            pass
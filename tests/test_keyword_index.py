@@ -0,0 +1,66 @@
+import random
+
+from market_feed.benchmarks.corpora import VOCABULARY, synthetic_articles
+from market_feed.utils.keyword_index import KeywordIndex, PhraseMatcher, token_phrases
+from market_feed.utils.relevance_analyzer import analyze_articles
+
+
+def make_tokens(count, seed=0):
+    rng = random.Random(seed)
+    tokens = [
+        {
+            "name": "Liquid staked Ether 2.0",
+            "symbol": "stETH",
+            "mandatory_phrases": ["lido", "staked eth"],
+            "additional_phrases": ["defi", "p2p.org", "lido.fi"],
+        },
+        {
+            "name": "Wrapped liquid staked Ether 2.0",
+            "symbol": "wstETH",
+            "mandatory_phrases": ["lido", "eth", "eth"],
+            "additional_phrases": ["staking"],
+        },
+    ]
+    for index in range(count):
+        tokens.append(
+            {
+                "name": f"Token {index}",
+                "symbol": f"TK{index}",
+                "mandatory_phrases": [" ".join(rng.sample(VOCABULARY, 2))],
+                "additional_phrases": rng.sample(VOCABULARY, 3),
+            }
+        )
+    return tokens
+
+
+def test_phrase_counts_match_str_count():
+    phrases = ["aa", "a", "aba", "ab", "b", "bab", "abab", ""]
+    matcher = PhraseMatcher(phrases)
+    rng = random.Random(3)
+    for _ in range(200):
+        text = "".join(rng.choices("ab ", k=rng.randint(0, 40)))
+        counts = matcher.count(text)
+        for index, phrase in enumerate(phrases):
+            assert counts.get(index, 0) == text.count(phrase), (text, phrase)
+
+
+def test_scores_match_per_token_analysis():
+    tokens = make_tokens(50)
+    index = KeywordIndex(tokens)
+    articles = synthetic_articles(100, seed=5)
+    articles[0]["full_content"] = "Lido DAO staked ETH on lido.fi " * 3
+
+    for token in tokens:
+        keywords, additional_phrases = token_phrases(token)
+        for article in articles:
+            [expected] = analyze_articles([dict(article)], keywords, additional_phrases)
+            assert index.score(article, token) == expected["relevance"]
+
+
+def test_index_covers_only_current_phrases():
+    tokens = make_tokens(0)
+    index = KeywordIndex(tokens)
+    assert index.covers(tokens[0])
+    edited = dict(tokens[0], additional_phrases=["restaking"])
+    assert not index.covers(edited)
+    assert not index.covers({"name": "Other", "symbol": "OTH"})
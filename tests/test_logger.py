@@ -0,0 +1,76 @@
+import io
+import json
+import logging
+from contextlib import redirect_stdout
+
+import pytest
+
+from market_feed.utils import metrics
+from market_feed.utils.logger import (
+    SAMPLED,
+    SamplingFilter,
+    configure_logging,
+    get_logger,
+)
+
+
+def make_record(message, token="", sampled=True):
+    record = logging.LogRecord(
+        "market_feed", logging.INFO, __file__, 1, message, ("x",), None
+    )
+    record.token = token
+    if sampled:
+        record.sample = True
+    return record
+
+
+def test_limits_each_token_and_reports_suppressed():
+    now = [0.0]
+    sampler = SamplingFilter(burst=3, interval=60, clock=lambda: now[0])
+
+    kept = [sampler.filter(make_record("New article: %s", "steth")) for _ in range(10)]
+    assert kept.count(True) == 3
+    # Other tokens and unmarked records are not affected
+    assert sampler.filter(make_record("New article: %s", "ldo"))
+    assert sampler.filter(make_record("New article: %s", "steth", sampled=False))
+
+    now[0] = 61.0
+    record = make_record("New article: %s", "steth")
+    assert sampler.filter(record)
+    assert record.suppressed == 7
+
+
+@pytest.fixture
+def root_logger():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield root
+    root.handlers, root.level = handlers, level
+
+
+def test_queued_json_lines_carry_token(root_logger):
+    output = io.StringIO()
+    with redirect_stdout(output):
+        listener = configure_logging(
+            {
+                "logging": {
+                    "format": "json",
+                    "queue": True,
+                    "sampling": {"enabled": True, "burst": 2},
+                }
+            }
+        )
+    logger = get_logger()
+    with metrics.token_context("stETH"):
+        for number in range(5):
+            logger.info("New article %d", number, extra=SAMPLED)
+        logger.debug("Not logged at INFO: %s", object())
+    logger.warning("Done")
+    listener.stop()
+
+    entries = [json.loads(line) for line in output.getvalue().splitlines()]
+    messages = [entry["message"] for entry in entries]
+    assert messages == ["New article 0", "New article 1", "Done"]
+    assert entries[0]["token"] == "stETH"
+    assert entries[0]["level"] == "INFO"
+    assert "token" not in entries[2]
@@ -0,0 +1,81 @@
+from unittest import mock
+from urllib.request import urlopen
+
+import pytest
+
+from market_feed.utils import metrics
+
+
+@pytest.fixture
+def enabled():
+    metrics.reset()
+    metrics.enable()
+    yield
+    metrics.disable()
+    metrics.reset()
+
+
+@metrics.instrument("parse")
+def parse(count):
+    if count < 0:
+        raise ValueError("negative")
+    return [{"title": str(number)} for number in range(count)]
+
+
+def test_instrument_counts_calls_and_articles(enabled):
+    with metrics.token_context("ldo"):
+        parse(3)
+        parse(2)
+    parse(1)
+
+    summary = metrics.summarize()["parse"]
+    assert summary["stage_seconds_count"] == 3
+    assert summary["stage_articles_total"] == 6
+    assert summary["stage_seconds_sum"] >= 0
+    assert (
+        metrics._values[("stage_seconds_count", (("stage", "parse"), ("token", "ldo")))]
+        == 2
+    )
+
+
+def test_instrument_counts_errors_and_reraises(enabled):
+    with pytest.raises(ValueError):
+        parse(-1)
+    summary = metrics.summarize()["parse"]
+    assert summary["stage_errors_total"] == 1
+    assert "stage_seconds_count" not in summary
+
+
+def test_disabled_metrics_record_nothing():
+    metrics.reset()
+    with mock.patch.object(metrics.time, "perf_counter") as clock:
+        assert len(parse(2)) == 2
+        metrics.inc("serpapi_requests")
+        metrics.observe("parse", 1.0)
+    clock.assert_not_called()
+    assert metrics.summarize() == {}
+
+
+def test_prometheus_text_output(enabled):
+    with metrics.token_context("ldo"):
+        metrics.inc("cache_hits", 4, cache="relevance")
+        metrics.observe("score", 0.5, articles=10)
+    metrics.inc("serpapi_requests")
+
+    server = metrics.start_metrics_server(port=0)
+    try:
+        with urlopen(f"http://127.0.0.1:{server.server_port}/metrics") as response:
+            text = response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert text == metrics.render_prometheus()
+    lines = text.splitlines()
+    assert "# TYPE market_feed_cache_hits_total counter" in lines
+    assert 'market_feed_cache_hits_total{cache="relevance",token="ldo"} 4' in lines
+    assert "# TYPE market_feed_stage_seconds summary" in lines
+    assert 'market_feed_stage_seconds_sum{stage="score",token="ldo"} 0.5' in lines
+    assert 'market_feed_stage_seconds_count{stage="score",token="ldo"} 1' in lines
+    # Counters recorded outside a token have no token label
+    assert "market_feed_serpapi_requests_total{} 1" in lines
@@ -0,0 +1,140 @@
+import random
+from unittest import mock
+
+import pytest
+
+from market_feed import feeds
+from market_feed.utils.json_utils import load_from_json
+from market_feed.utils.near_duplicates import (
+    SignatureIndex,
+    SignatureStore,
+    collapse_near_duplicates,
+    simhash,
+)
+
+STORY = (
+    "Lido DAO approves staking router upgrade",
+    "Lido DAO members voted to approve the staking router upgrade, which opens "
+    "the protocol to new node operator modules and changes how stETH rewards "
+    "are distributed across Ethereum validators.",
+)
+
+
+def make_article(source, link, title, snippet, timestamp):
+    return {
+        "title": title,
+        "link": link,
+        "snippet": snippet,
+        "source": source,
+        "timestamp": timestamp,
+        "utc_time": "",
+        "tag": "independent-news",
+    }
+
+
+@pytest.fixture
+def signature_file(tmp_path):
+    return str(tmp_path / "steth_signatures.json")
+
+
+def test_index_find_matches_brute_force():
+    rng = random.Random(1)
+    index = SignatureIndex(max_distance=5)
+    signatures = [rng.getrandbits(64) for _ in range(500)]
+    for signature in signatures:
+        index.add(signature)
+
+    for _ in range(200):
+        query = rng.choice(signatures)
+        for bit in rng.sample(range(64), rng.randint(0, 8)):
+            query ^= 1 << bit
+        expected = [
+            position
+            for position, signature in enumerate(signatures)
+            if (signature ^ query).bit_count() <= 5
+        ]
+        position = index.find(query)
+        if expected:
+            assert position in expected
+        else:
+            assert position is None
+
+
+def test_syndicated_copies_become_aliases_of_earliest(signature_file):
+    title, snippet = STORY
+    articles = [
+        make_article("Decrypt", "https://decrypt.co/1", title, snippet, 200),
+        make_article(
+            "CoinDesk", "https://coindesk.com/1", f"{title} - CoinDesk", snippet, 100
+        ),
+        make_article(
+            "Cointelegraph",
+            "https://cointelegraph.com/1",
+            title,
+            snippet.replace("stETH ", ""),
+            300,
+        ),
+        make_article(
+            "The Block",
+            "https://theblock.co/2",
+            "Curve pool sees record volume after depeg scare",
+            "Traders moved liquidity into the Curve stETH pool as the price briefly "
+            "slipped below one ether on centralized exchanges.",
+            150,
+        ),
+        make_article("Blog", "https://example.com/short", "Short", "Too short", 50),
+    ]
+
+    collapsed = collapse_near_duplicates(articles, SignatureStore(signature_file))
+
+    assert len(collapsed) == 3
+    canonical = next(a for a in collapsed if a["source"] == "CoinDesk")
+    assert [alias["link"] for alias in canonical["aliases"]] == [
+        "https://decrypt.co/1",
+        "https://cointelegraph.com/1",
+    ]
+
+    # Collapsing again, with a variant refetched, adds nothing new
+    refetched = make_article("Decrypt", "https://decrypt.co/1", title, snippet, 200)
+    again = collapse_near_duplicates(
+        collapsed + [refetched], SignatureStore(signature_file)
+    )
+    assert len(again) == 3
+    assert len(canonical["aliases"]) == 2
+
+
+def test_signatures_are_persisted(signature_file):
+    title, snippet = STORY
+    article = make_article("Decrypt", "https://decrypt.co/1", title, snippet, 1)
+    store = SignatureStore(signature_file)
+    signature = store.signature(article)
+    assert signature == simhash(f"{title}\n{snippet}")
+    store.save([article])
+
+    reloaded = SignatureStore(signature_file)
+    assert len(reloaded.signatures) == 1
+    assert reloaded.signature(article) == signature
+
+
+def test_canonical_copy_is_the_earliest_relevant_one(tmp_path):
+    title, snippet = STORY
+    # The earliest copy scores below the threshold; RSS relevance is preset
+    irrelevant = make_article("Blog", "https://blog.example/1", title, snippet, 100)
+    irrelevant["relevance"] = 0.0
+    relevant = make_article("Decrypt", "https://decrypt.co/1", title, snippet, 200)
+    relevant["relevance"] = 10.0
+    config = {
+        "output_dir": str(tmp_path),
+        "default_relevance_threshold": 5.0,
+        "near_duplicates": {"enabled": True},
+    }
+    token = {"name": "Lido DAO", "symbol": "LDO", "mandatory_phrases": ["lido"]}
+
+    with mock.patch.object(
+        feeds, "fetch_token_news", return_value=[]
+    ), mock.patch.object(feeds, "fetch_token_rss", return_value=[irrelevant, relevant]):
+        assert feeds.get_content(token, config) == 1
+
+    stored = load_from_json(str(tmp_path / "ldo_news.json"))
+    assert [article["link"] for article in stored] == [relevant["link"]]
+    assert "aliases" not in stored[0]
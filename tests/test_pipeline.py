@@ -0,0 +1,213 @@
+import json
+import os
+from datetime import datetime, timezone
+from unittest import mock
+
+import pytest
+
+from market_feed.feeds import pipeline
+from market_feed.feeds.pipeline import (
+    ArticleStream,
+    Journal,
+    get_journal_file,
+    stream_content,
+)
+from market_feed.utils import article_index
+from market_feed.utils.article_index import ArticleIndex, ArticleQuery
+from market_feed.utils.json_utils import load_from_json, save_to_json
+from market_feed.utils.near_duplicates import SignatureStore
+
+TOKEN = {"name": "Lido DAO", "symbol": "LDO", "mandatory_phrases": ["lido"]}
+STORY = (
+    "Lido DAO approves staking router upgrade",
+    "Lido DAO members voted to approve the staking router upgrade, which opens "
+    "the protocol to new node operator modules and changes how stETH rewards "
+    "are distributed across Ethereum validators.",
+)
+
+
+def make_article(source, link, title, snippet, timestamp, relevance=None):
+    article = {
+        "title": title,
+        "link": link,
+        "snippet": snippet,
+        "source": source,
+        "timestamp": timestamp,
+        "utc_time": "",
+        "tag": "independent-news",
+    }
+    # Preset relevance is kept as is, as for token RSS feeds
+    if relevance is not None:
+        article["relevance"] = relevance
+    return article
+
+
+def stored_story():
+    return make_article("CoinDesk", "https://coindesk.com/1", *STORY, 100)
+
+
+def other_story(link, timestamp, relevance):
+    # Too short to sign, so distinct stories never collapse into each other
+    return make_article(
+        "The Block",
+        link,
+        f"Curve update {timestamp}",
+        "Record volume",
+        timestamp,
+        relevance,
+    )
+
+
+@pytest.fixture
+def stored():
+    return stored_story()
+
+
+@pytest.fixture
+def stream(tmp_path, stored):
+    signatures = SignatureStore(str(tmp_path / "ldo_signatures.json"))
+    return ArticleStream(TOKEN, [stored], 5.0, signatures)
+
+
+def test_page_is_deduplicated_collapsed_and_filtered(stream, stored):
+    title, snippet = STORY
+    page = [
+        make_article("CoinDesk", "https://coindesk.com/1", title, snippet, 100),
+        make_article("Decrypt", "https://decrypt.co/1", title, snippet, 200),
+        other_story("https://theblock.co/1", 300, 10.0),
+        other_story("https://theblock.co/2", 400, 0.0),
+    ]
+
+    accepted, updated = stream.accept(page)
+
+    assert [a["link"] for a in accepted] == ["https://theblock.co/1"]
+    assert "relevance" not in accepted[0]
+    assert updated == [stored]
+    assert [alias["link"] for alias in stored["aliases"]] == ["https://decrypt.co/1"]
+
+    # The same page again adds nothing
+    assert stream.accept(page) == ([], [])
+
+
+def test_irrelevant_copy_does_not_become_canonical(stream):
+    title = "Curve DAO votes to extend crvUSD gauge incentives"
+    snippet = (
+        "Curve DAO members voted to extend crvUSD gauge incentives for another "
+        "quarter, keeping emissions to the largest stablecoin pools unchanged."
+    )
+    irrelevant = make_article("Blog", "https://blog.example/1", title, snippet, 200)
+    irrelevant["relevance"] = 0.0
+    relevant = make_article("Decrypt", "https://decrypt.co/2", title, snippet, 300)
+    relevant["relevance"] = 10.0
+
+    accepted, updated = stream.accept([irrelevant, relevant])
+
+    assert accepted == [relevant]
+    assert updated == []
+    assert "aliases" not in relevant
+
+
+@pytest.fixture
+def config(tmp_path):
+    return {
+        "output_dir": str(tmp_path),
+        "default_relevance_threshold": 5.0,
+        "near_duplicates": {"enabled": True},
+        "pipeline": {"streaming": True},
+    }
+
+
+@pytest.fixture
+def news_file(tmp_path):
+    news_file = str(tmp_path / "ldo_news.json")
+    save_to_json([stored_story()], news_file)
+    return news_file
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = ArticleIndex(str(tmp_path / "articles.db"))
+    article_index.set_article_index(index)
+    yield index
+    article_index.set_article_index(None)
+    index.close()
+
+
+def indexed_links(index):
+    page = index.query(ArticleQuery(tokens=("ldo",)))
+    return {json.loads(article)["link"] for article in page.articles}
+
+
+def test_articles_are_visible_as_pages_arrive(tmp_path, config, news_file, index):
+    seen_between_pages = []
+
+    def pages(token, config, start_date, end_date, high_water=None, progress=None):
+        yield None, None, [other_story("https://theblock.co/1", 300, 10.0)]
+        seen_between_pages.append(indexed_links(index))
+        yield None, None, [
+            other_story("https://theblock.co/2", 400, 10.0),
+            other_story("https://theblock.co/3", 500, 0.0),
+        ]
+
+    with mock.patch.object(pipeline, "iter_token_pages", pages):
+        assert stream_content(TOKEN, config) == 2
+
+    assert seen_between_pages == [{"https://theblock.co/1"}]
+    timestamps = [article["timestamp"] for article in load_from_json(news_file)]
+    assert timestamps == [400, 300, 100]
+    assert not os.path.exists(get_journal_file(TOKEN, str(tmp_path)))
+
+
+def test_interrupted_cycle_is_replayed(tmp_path, config, news_file, index):
+    windows = []
+
+    def pages(token, config, start_date, end_date, high_water=None, progress=None):
+        windows.append((start_date, end_date))
+        yield None, None, [other_story("https://theblock.co/1", 300, 10.0)]
+        raise RuntimeError("connection reset")
+
+    with mock.patch.object(pipeline, "iter_token_pages", pages):
+        with pytest.raises(RuntimeError):
+            stream_content(TOKEN, config)
+    assert len(load_from_json(news_file)) == 1
+    journal = Journal(get_journal_file(TOKEN, str(tmp_path)))
+    assert journal.resume()
+    assert len(journal.articles) == 1
+
+    def resumed_pages(
+        token, config, start_date, end_date, high_water=None, progress=None
+    ):
+        windows.append((start_date, end_date))
+        return iter(())
+
+    with mock.patch.object(pipeline, "iter_token_pages", resumed_pages):
+        assert stream_content(TOKEN, config) == 1
+    # Resumed over the interrupted cycle's window, not from the journaled article
+    assert windows[1] == windows[0]
+    assert len(load_from_json(news_file)) == 2
+    assert not os.path.exists(journal.path)
+
+
+def test_truncated_last_entry_is_cut_before_appending(tmp_path):
+    journal = Journal(str(tmp_path / "ldo_news.journal"))
+    start, end = datetime(2024, 1, 1, tzinfo=timezone.utc), datetime(
+        2024, 1, 2, tzinfo=timezone.utc
+    )
+    journal.begin(start, end)
+    journal.append([other_story("https://theblock.co/1", 300, None)], ("lido", 1, 100))
+    with open(journal.path, "a") as f:
+        f.write('{"title": "Curve upd')
+
+    resumed = Journal(journal.path)
+    assert resumed.resume()
+    assert (resumed.start_date, resumed.end_date) == (start, end)
+    assert len(resumed.articles) == 1
+    assert resumed.pages == {"lido": (1, 100)}
+    resumed.append([other_story("https://theblock.co/2", 400, None)])
+
+    reloaded = Journal(journal.path)
+    assert reloaded.resume()
+    assert [article["link"] for article in reloaded.articles] == [
+        "https://theblock.co/1",
+        "https://theblock.co/2",
+    ]
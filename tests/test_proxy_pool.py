@@ -0,0 +1,214 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import pytest
+import requests
+
+from market_feed.utils import date_utils, http_utils
+from market_feed.utils.proxy_pool import ProxyPool
+
+PAGE = (
+    '<html><head><meta property="article:published_time" '
+    'content="2024-03-01T12:00:00Z"></head><body></body></html>'
+)
+URL = "http://news.example/story"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class StandInProxy(BaseHTTPRequestHandler):
+    """Forward-proxy stand-in that answers every absolute-URI GET itself."""
+
+    status = 200
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        body = PAGE.encode() if self.status == 200 else b""
+        self.send_response(self.status)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_proxy(status=200):
+    handler = type("Handler", (StandInProxy,), {"status": status})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def url_of(server):
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def dead_proxy_url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+@pytest.fixture
+def proxies():
+    servers = []
+
+    def start(status=200):
+        server = start_proxy(status)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def fetch():
+    http_utils.configure({})
+
+    def fetch(pool, url=URL):
+        with mock.patch.object(date_utils, "proxy_pool", pool), mock.patch.object(
+            date_utils, "can_fetch", return_value=True
+        ):
+            return date_utils.fetch_publication_date(url, delay=0)
+
+    return fetch
+
+
+def test_failing_proxies_are_evicted_and_reprobed():
+    clock = FakeClock()
+    pool = ProxyPool(
+        ["http://a", "http://b"], min_samples=3, eviction_time=60, clock=clock
+    )
+    bad, good = pool.proxies
+    for _ in range(3):
+        proxy = pool.acquire("news.example", exclude=[good])
+        pool.release(proxy, ok=False, latency=0.1)
+    assert bad.evicted_until == clock.now + 60
+    assert [pool.acquire(f"host{n}", timeout=0) for n in range(3)] == [good] * 3
+
+    clock.now += 60
+    # One probe goes to the evicted proxy; nobody else gets it meanwhile
+    assert pool.acquire("other.example", exclude=[good]) is bad
+    assert pool.acquire("third.example", exclude=[good], timeout=0) is None
+    pool.release(bad, ok=True, latency=0.1)
+    assert bad.evicted_until is None
+    assert pool.acquire("third.example", exclude=[good], timeout=0) is bad
+
+
+def test_release_without_outcome_records_nothing():
+    clock = FakeClock()
+    pool = ProxyPool(["http://a"], min_samples=1, eviction_time=60, clock=clock)
+    proxy = pool.acquire("news.example")
+    pool.release(proxy, ok=None, latency=10.0)
+    assert (proxy.samples, proxy.latency, proxy.active) == (0, 0.0, 0)
+
+    pool.release(pool.acquire("news.example"), ok=False, latency=0.1)
+    clock.now += 60
+    # A probe that proved nothing leaves the proxy evicted, up for another probe
+    assert pool.acquire("news.example") is proxy
+    pool.release(proxy, ok=None, latency=10.0)
+    assert proxy.evicted_until is not None
+    assert pool.acquire("news.example", timeout=0) is proxy
+
+
+def test_proxies_take_limited_concurrent_requests():
+    pool = ProxyPool(["http://a", "http://b"], max_concurrent=2)
+    taken = [pool.acquire(f"host{n}", timeout=0) for n in range(5)]
+    assert taken[4] is None
+    assert (
+        sorted(proxy.url for proxy in taken[:4]) == ["http://a"] * 2 + ["http://b"] * 2
+    )
+
+    threading.Timer(0.1, pool.release, (taken[0], True, 0.1)).start()
+    assert pool.acquire("host5", timeout=5) is taken[0]
+
+
+def test_hosts_stick_to_their_proxy():
+    pool = ProxyPool(["http://a", "http://b"], max_concurrent=1)
+    first = pool.acquire("news.example")
+    pool.release(first, ok=True, latency=5.0)
+    other = pool.acquire("other.example")
+    assert other is not first
+    pool.release(other, ok=True, latency=0.1)
+
+    # Still the slower proxy, so the site keeps seeing the same session
+    assert pool.acquire("news.example") is first
+    # While it is busy, the host waits for it rather than switching
+    assert pool.acquire("news.example", timeout=0.05) is None
+
+
+def test_fetch_moves_past_dead_and_throttled_proxies(proxies, fetch):
+    throttled, healthy = proxies(429), proxies()
+    pool = ProxyPool(
+        [dead_proxy_url(), url_of(throttled), url_of(healthy)], min_samples=1
+    )
+
+    assert fetch(pool) == 1709294400
+    assert throttled.requests == [URL] and healthy.requests == [URL]
+    assert [proxy.evicted_until is not None for proxy in pool.proxies] == [
+        True,
+        True,
+        False,
+    ]
+    # The next page goes straight to the healthy proxy
+    assert fetch(pool, URL + "2") == 1709294400
+    assert throttled.requests == [URL]
+    # Proxy failures do not count against the site's circuit breaker
+    assert http_utils.breaker_for("news.example").failures == 0
+
+
+def test_fetch_gives_up_when_every_proxy_fails(proxies, fetch):
+    pool = ProxyPool([url_of(proxies(403)), dead_proxy_url()])
+    assert fetch(pool) is None
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        http_utils.CircuitOpenError("Circuit for news.example is open"),
+        http_utils.DeadlineExceeded("Job deadline exceeded"),
+        requests.ReadTimeout("read timed out"),
+        requests.ConnectTimeout("connect timed out"),
+    ],
+)
+def test_site_and_deadline_errors_do_not_count_against_the_proxy(error):
+    pool = ProxyPool(["http://a", "http://b"], min_samples=1)
+    with mock.patch.object(date_utils, "proxy_pool", pool), mock.patch.object(
+        date_utils.http_utils, "get", side_effect=error
+    ):
+        for _ in range(6):
+            with pytest.raises(type(error)):
+                date_utils.fetch_page(URL, {})
+    for proxy in pool.proxies:
+        assert (proxy.samples, proxy.active, proxy.evicted_until) == (0, 0, None)
+
+
+def test_proxy_refusals_do_not_trip_the_site_breaker(proxies):
+    # Six refusals, more than the breaker's threshold of consecutive failures
+    http_utils.configure({})
+    pool = ProxyPool(
+        [url_of(proxies(403)), url_of(proxies(407)), url_of(proxies(429))],
+        min_samples=100,
+    )
+    with mock.patch.object(date_utils, "proxy_pool", pool):
+        for _ in range(2):
+            with pytest.raises(requests.ConnectionError):
+                date_utils.fetch_page(URL, {})
+    breaker = http_utils.breaker_for("news.example")
+    assert (breaker.state, breaker.failures) == (breaker.CLOSED, 0)
+    assert [proxy.samples for proxy in pool.proxies] == [2, 2, 2]
+    assert all(proxy.success_rate == 0.0 for proxy in pool.proxies)
@@ -0,0 +1,50 @@
+import pytest
+
+from market_feed.benchmarks.corpora import synthetic_articles
+from market_feed.utils.relevance_analyzer import (
+    ScoringPool,
+    analyze_articles,
+    score_articles,
+    set_scoring_pool,
+)
+
+KEYWORDS = ["Liquid staked Ether 2.0", "stETH", "lido", "staked eth"]
+ADDITIONAL_PHRASES = ["defi", "p2p.org", "lido.fi"]
+
+
+@pytest.fixture
+def articles():
+    return synthetic_articles(200, seed=7)
+
+
+@pytest.fixture
+def expected(articles):
+    return [
+        analyze_articles([dict(article)], KEYWORDS, ADDITIONAL_PHRASES)[0]["relevance"]
+        for article in articles
+    ]
+
+
+def test_serial_matches_per_article_analysis(articles, expected):
+    scored = score_articles(
+        [dict(article) for article in articles], KEYWORDS, ADDITIONAL_PHRASES
+    )
+    assert [article["relevance"] for article in scored] == expected
+
+
+def test_pool_matches_serial(articles, expected):
+    pool = ScoringPool(2, chunk_size=16)
+    set_scoring_pool(pool)
+    try:
+        scored = score_articles(
+            [dict(article) for article in articles], KEYWORDS, ADDITIONAL_PHRASES
+        )
+    finally:
+        set_scoring_pool(None)
+        pool.close()
+    assert [article["relevance"] for article in scored] == expected
+
+
+def test_from_config_disabled_by_default():
+    assert ScoringPool.from_config({}) is None
+    assert ScoringPool.from_config({"scoring": {"processes": 0}}) is None
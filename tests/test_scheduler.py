@@ -0,0 +1,89 @@
+import pytest
+
+from market_feed.utils.request_budget import RequestBudget
+from market_feed.utils.scheduler import Scheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_jobs_run_in_due_order(clock):
+    scheduler = Scheduler(clock=clock)
+    runs = []
+    scheduler.add("a", lambda: runs.append("a"), interval=10, delay=5)
+    scheduler.add("b", lambda: runs.append("b"), interval=10, delay=1)
+
+    scheduler.run_pending()
+    assert runs == []
+    assert scheduler._next_delay() == 1
+
+    clock.now = 5
+    scheduler.run_pending()
+    assert runs == ["b", "a"]
+
+    # Next runs are counted from completion
+    clock.now = 14
+    scheduler.run_pending()
+    assert runs == ["b", "a"]
+
+    clock.now = 15
+    scheduler.run_pending()
+    assert runs == ["b", "a", "b", "a"]
+
+
+def test_removed_and_replaced_jobs(clock):
+    scheduler = Scheduler(clock=clock)
+    runs = []
+    scheduler.add("a", lambda: runs.append("old"), interval=10)
+    scheduler.add("a", lambda: runs.append("new"), interval=10)
+    scheduler.add("b", lambda: runs.append("b"), interval=10)
+    scheduler.remove("b")
+
+    scheduler.run_pending()
+    assert runs == ["new"]
+    assert len(scheduler) == 1
+    assert "b" not in scheduler
+
+
+def test_failing_job_backs_off_without_blocking_others(clock):
+    scheduler = Scheduler(base_backoff=2, clock=clock)
+    runs = []
+
+    def failing():
+        runs.append("fail")
+        raise RuntimeError("boom")
+
+    scheduler.add("fail", failing, interval=100)
+    scheduler.add("ok", lambda: runs.append("ok"), interval=100)
+
+    scheduler.run_pending()
+    assert runs == ["fail", "ok"]
+    for expected_delay in (2, 4, 8):
+        assert scheduler._next_delay() == expected_delay
+        clock.now += expected_delay
+        scheduler.run_pending()
+    assert runs.count("fail") == 4
+    assert runs.count("ok") == 1
+
+
+def test_request_budget(clock):
+    budget = RequestBudget(3600, burst=2, clock=clock, sleep=clock.sleep)
+    assert budget.try_acquire() == 0
+    assert budget.try_acquire() == 0
+    assert budget.try_acquire() == pytest.approx(1)
+
+    budget.acquire()
+    assert clock.now == pytest.approx(1)
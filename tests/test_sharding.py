@@ -0,0 +1,264 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+
+from market_feed.utils import sharding
+from market_feed.utils.article_index import ArticleIndex, ArticleQuery
+from market_feed.utils.json_utils import load_from_json, save_to_json
+from market_feed.utils.sharding import HashRing, LeaseLost, ShardCoordinator
+
+KEYS = [f"ethereum:0x{number:04x}" for number in range(60)]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def store(tmp_path):
+    return str(tmp_path / "leases.db")
+
+
+def make_worker(store, worker_id, clock):
+    return ShardCoordinator(store, worker_id, lease_ttl=30, clock=clock)
+
+
+def test_ring_moves_only_the_new_workers_keys():
+    keys = [f"token-{number}" for number in range(2000)]
+    before = HashRing(["a", "b", "c"])
+    after = HashRing(["a", "b", "c", "d"])
+    moved = [key for key in keys if before.owner(key) != after.owner(key)]
+
+    assert all(after.owner(key) == "d" for key in moved)
+    assert 300 < len(moved) < 700
+
+
+def test_leases_are_handed_over_when_a_worker_joins(store):
+    clock = FakeClock()
+    first, second = make_worker(store, "a", clock), make_worker(store, "b", clock)
+
+    assert set(first.heartbeat(KEYS)) == set(KEYS)
+    # The keys that now hash to b stay with a until a hands them over
+    assert second.heartbeat(KEYS) == {}
+    clock.now += 1
+    kept = first.heartbeat(KEYS)
+    taken = second.heartbeat(KEYS)
+
+    assert taken and kept
+    assert not set(kept) & set(taken)
+    assert set(kept) | set(taken) == set(KEYS)
+    # Each change of owner bumps the fencing token
+    assert set(taken.values()) == {2}
+    assert set(kept.values()) == {1}
+
+
+def test_expired_worker_is_fenced_out(store):
+    clock = FakeClock()
+    stale, other = make_worker(store, "a", clock), make_worker(store, "b", clock)
+    stale.heartbeat(KEYS)
+    key = KEYS[0]
+    with stale.fence(key) as fence:
+        assert fence == 1
+
+    # a stops heartbeating, so b takes every token over once a's leases expire
+    clock.now += 31
+    assert set(other.heartbeat(KEYS)) == set(KEYS)
+    with pytest.raises(LeaseLost):
+        with stale.fence(key):
+            pass
+    assert not stale.owns(key)
+    with other.fence(key) as fence:
+        assert fence == 2
+
+
+def test_leaving_worker_releases_its_tokens(store):
+    clock = FakeClock()
+    first, second = make_worker(store, "a", clock), make_worker(store, "b", clock)
+    for _ in range(2):
+        first.heartbeat(KEYS)
+        second.heartbeat(KEYS)
+
+    first.close()
+    assert set(second.heartbeat(KEYS)) == set(KEYS)
+
+
+def test_fenced_writes_do_not_hold_the_store_lock(store):
+    clock = FakeClock()
+    first, second = make_worker(store, "a", clock), make_worker(store, "b", clock)
+    first.heartbeat(KEYS)
+    with first.fence(KEYS[0]):
+        started = time.monotonic()
+        second.heartbeat(KEYS)
+        assert time.monotonic() - started < 1
+
+
+def test_key_is_not_handed_over_during_a_write(store):
+    clock = FakeClock()
+    first, second = make_worker(store, "a", clock), make_worker(store, "b", clock)
+    first.heartbeat(KEYS)
+    second.heartbeat(KEYS)
+    key = next(key for key in KEYS if HashRing(["a", "b"]).owner(key) == "b")
+
+    with first.fence(key):
+        clock.now += 20
+        assert key not in first.heartbeat(KEYS)
+        # Renewed rather than released, so b waits even past the old expiry
+        clock.now += 20
+        assert key not in second.heartbeat(KEYS)
+
+    first.heartbeat(KEYS)
+    assert key in second.heartbeat(KEYS)
+
+
+def test_write_after_the_lease_expired_mid_write_is_refused(store, tmp_path):
+    clock = FakeClock()
+    stale, other = make_worker(store, "a", clock), make_worker(store, "b", clock)
+    stale.heartbeat(KEYS)
+    token = {"symbol": "LDO", "address": {"ethereum": "0x0000"}}
+    news_file = str(tmp_path / "ldo_news.json")
+    index = ArticleIndex(str(tmp_path / "articles.db"))
+
+    def take_over():
+        other.heartbeat(KEYS)
+        with other.fence(KEYS[0]):
+            save_to_json([{"title": "New owner"}], news_file)
+            index.replace_token("ldo", [{"title": "New owner", "link": "b"}])
+
+    sharding.set_coordinator(stale)
+    try:
+        with sharding.fenced(token):
+            # a stalls mid-write, past its lease, and b takes the token over
+            clock.now += 31
+            new_owner = threading.Thread(target=take_over)
+            new_owner.start()
+            new_owner.join()
+
+            with pytest.raises(LeaseLost):
+                save_to_json([{"title": "Stale"}], news_file)
+            with pytest.raises(LeaseLost):
+                index.replace_token("ldo", [{"title": "Stale", "link": "a"}])
+    finally:
+        sharding.set_coordinator(None)
+        index.close()
+
+    assert load_from_json(news_file) == [{"title": "New owner"}]
+    assert index_titles(str(tmp_path / "articles.db")) == ["New owner"]
+    assert not stale.owns(KEYS[0])
+
+
+def index_titles(path):
+    index = ArticleIndex(path)
+    try:
+        page = index.query(ArticleQuery(tokens=("ldo",)))
+        return [json.loads(article)["title"] for article in page.articles]
+    finally:
+        index.close()
+
+
+def test_check_renews_the_lease_for_the_rest_of_the_write(store):
+    clock = FakeClock()
+    first, second = make_worker(store, "a", clock), make_worker(store, "b", clock)
+    first.heartbeat(KEYS)
+    with first.fence(KEYS[0]) as fence:
+        clock.now += 25
+        first.check(KEYS[0], fence)
+        # Past the lease taken at the last heartbeat, but within the renewal
+        clock.now += 25
+        second.heartbeat(KEYS)
+        assert KEYS[0] not in second.leases
+        first.check(KEYS[0], fence)
+
+
+def test_heartbeat_thread_keeps_renewing(store):
+    renewed = threading.Semaphore(0)
+    calls = []
+
+    def tokens():
+        calls.append(len(calls))
+        renewed.release()
+        if len(calls) == 1:
+            raise RuntimeError("registry unavailable")
+        return []
+
+    coordinator = ShardCoordinator(store, "a", lease_ttl=30)
+    sharding.set_coordinator(coordinator)
+    try:
+        stopped = sharding.start_heartbeat(tokens, 0.01)
+        # A failed heartbeat is logged and the next one still runs
+        assert renewed.acquire(timeout=5) and renewed.acquire(timeout=5)
+        stopped.set()
+    finally:
+        sharding.set_coordinator(None)
+        coordinator.close()
+
+
+def run_worker(store, directory, worker_id, leave_after, barrier, results):
+    coordinator = ShardCoordinator(store, worker_id, lease_ttl=2.0)
+    started = time.monotonic()
+    while time.monotonic() - started < leave_after:
+        for key in coordinator.heartbeat(KEYS):
+            try:
+                with coordinator.fence(key) as fence:
+                    with open(os.path.join(directory, key), "a") as f:
+                        f.write(f"{worker_id} {fence}\n")
+            except LeaseLost:
+                pass
+        time.sleep(0.05)
+    if barrier is not None:
+        # Everyone still running reports before anyone leaves
+        results.put((worker_id, sorted(coordinator.heartbeat(KEYS))))
+        barrier.wait()
+    coordinator.close()
+
+
+def test_workers_in_separate_processes_split_and_rebalance(store, tmp_path):
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(2)
+    results = context.Queue()
+    workers = [
+        context.Process(
+            target=run_worker,
+            args=(
+                store,
+                str(tmp_path),
+                worker_id,
+                leave_after,
+                worker_barrier,
+                results,
+            ),
+        )
+        for worker_id, leave_after, worker_barrier in (
+            ("w0", 1.5, None),
+            ("w1", 4.0, barrier),
+            ("w2", 4.0, barrier),
+        )
+    ]
+    for worker in workers:
+        worker.start()
+    owned = dict(results.get(timeout=60) for _ in range(2))
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    # w0 left, and its tokens were taken over by the workers that stayed
+    assert not set(owned["w1"]) & set(owned["w2"])
+    assert set(owned["w1"]) | set(owned["w2"]) == set(KEYS)
+
+    writers = set()
+    for key in KEYS:
+        with open(tmp_path / key) as f:
+            writes = [line.split() for line in f]
+        writers.update(worker_id for worker_id, _ in writes)
+        # Fenced writes never go back to an older lease
+        fences = [int(fence) for _, fence in writes]
+        assert fences == sorted(fences)
+        assert writes[-1][0] in ("w1", "w2")
+    assert "w0" in writers
@@ -0,0 +1,40 @@
+import pytest
+
+from market_feed.utils.token_registry import TokenRegistry, token_key
+
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = TokenRegistry(str(tmp_path / "tokens.db"))
+    yield registry
+    registry.close()
+
+
+def make_token(symbol, address, **extra):
+    return {"name": symbol, "symbol": symbol, "address": {"ethereum": address}, **extra}
+
+
+def test_token_key():
+    assert token_key(make_token("stETH", "0xAE7a")) == "ethereum:0xae7a"
+    assert token_key({"symbol": "BTC"}) == "btc"
+
+
+def test_upsert_and_find(registry):
+    registry.upsert(make_token("AAA", "0xAA"))
+    assert registry.find("ethereum", "0xaa")["symbol"] == "AAA"
+    assert registry.find("ethereum", "0xbb") is None
+    assert registry.find("arbitrum", "0xaa") is None
+
+
+def test_changes_since(registry):
+    version = registry.import_tokens(
+        [make_token("AAA", "0xAA"), make_token("BBB", "0xBB")]
+    )
+    assert registry.changes_since(version) == (version, [])
+
+    new_version = registry.upsert(make_token("BBB", "0xBB", active=False))
+    current, changed = registry.changes_since(version)
+    assert current == new_version
+    assert [token["symbol"] for token in changed] == ["BBB"]
+    assert [token["symbol"] for token in registry.tokens()] == ["AAA"]
+    assert registry.count(active_only=False) == 2
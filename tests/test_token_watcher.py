@@ -0,0 +1,92 @@
+import os
+from unittest import mock
+
+import pytest
+import yaml
+
+from market_feed.utils import token_watcher
+from market_feed.utils.schedule_utils import apply_token_changes
+from market_feed.utils.scheduler import Scheduler
+from market_feed.utils.token_registry import TokenRegistry, token_key
+from market_feed.utils.token_watcher import TokenChanges, TokenWatcher
+
+LDO = {"name": "Lido DAO", "symbol": "LDO"}
+STETH = {"name": "Liquid staked Ether 2.0", "symbol": "stETH"}
+CRV = {"name": "Curve DAO", "symbol": "CRV"}
+
+
+def write_config(path, tokens, mtime_ns):
+    path.write_text(yaml.safe_dump({"tokens": tokens}))
+    # Set explicitly, as two writes in a row can share an mtime
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "config.yaml"
+    write_config(path, [LDO, STETH], 1_000_000_000)
+    return path
+
+
+def test_config_is_reread_only_when_its_mtime_changes(config_file):
+    watcher = TokenWatcher(str(config_file), {}, [LDO, STETH])
+    with mock.patch.object(
+        token_watcher, "load_config", wraps=token_watcher.load_config
+    ) as load:
+        assert not watcher.poll()
+        assert load.call_count == 0
+
+        edited = {**STETH, "fetch_interval": 600}
+        write_config(config_file, [edited, CRV], 2_000_000_000)
+        changes = watcher.poll()
+        assert load.call_count == 1
+        assert not watcher.poll()
+
+    assert changes == TokenChanges([CRV], [LDO], [edited])
+    assert set(watcher.tokens) == {token_key(edited), token_key(CRV)}
+
+
+def test_unreadable_config_keeps_the_current_tokens(config_file):
+    watcher = TokenWatcher(str(config_file), {}, [LDO, STETH])
+    config_file.write_text("tokens: [unclosed")
+    os.utime(config_file, ns=(2_000_000_000, 2_000_000_000))
+    assert not watcher.poll()
+    assert len(watcher.tokens) == 2
+
+
+def test_registry_changes_are_read_by_version(tmp_path):
+    path = str(tmp_path / "tokens.db")
+    registry = TokenRegistry(path)
+    registry.import_tokens([LDO, STETH])
+    watcher = TokenWatcher("unused.yaml", {"token_registry": path}, [LDO, STETH])
+    assert not watcher.poll()
+
+    registry.upsert(CRV)
+    registry.upsert({**LDO, "active": False})
+    changes = watcher.poll()
+    assert changes.added == [CRV]
+    assert [token["symbol"] for token in changes.removed] == ["LDO"]
+    assert not watcher.poll()
+    registry.close()
+
+
+def test_new_tokens_get_jittered_first_runs():
+    now = [0.0]
+    scheduler = Scheduler(clock=lambda: now[0])
+    runs = []
+    changes = TokenChanges([LDO, STETH, CRV], [], [])
+    with mock.patch("random.uniform", side_effect=[10.0, 250.0, 90.0]) as uniform:
+        apply_token_changes(
+            scheduler,
+            changes,
+            "token_news",
+            3600,
+            lambda token, config: lambda: runs.append(token["symbol"]),
+            {},
+            max_jitter=300,
+        )
+    assert all(call.args == (0, 300) for call in uniform.call_args_list)
+
+    for now[0] in (10, 90, 250):
+        scheduler.run_pending()
+    assert runs == ["LDO", "CRV", "stETH"]
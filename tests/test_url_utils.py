@@ -0,0 +1,94 @@
+from market_feed.feeds import remove_duplicates
+from market_feed.utils.content_utils import clean_article
+from market_feed.utils.url_utils import canonicalize_url
+
+
+def test_variants_share_a_canonical_form():
+    variants = [
+        "https://cointelegraph.com/news/lido-dao-vote",
+        "http://cointelegraph.com/news/lido-dao-vote",
+        "https://www.cointelegraph.com/news/lido-dao-vote/",
+        "https://cointelegraph.com/news/lido-dao-vote?utm_source=rss&utm_medium=rss",
+        "https://cointelegraph.com/news/lido-dao-vote/amp",
+        "https://cointelegraph.com/news/lido-dao-vote?ref=cryptopanic#comments",
+        "https://cointelegraph-com.cdn.ampproject.org/c/s/cointelegraph.com/news/lido-dao-vote/amp",
+    ]
+    assert {canonicalize_url(url) for url in variants} == {
+        "https://cointelegraph.com/news/lido-dao-vote"
+    }
+
+
+def test_content_query_parameters_are_kept_and_sorted():
+    tracked = "https://example.com/article?id=7&page=2&fbclid=abc"
+    untracked = "https://example.com/article?page=2&id=7"
+    assert canonicalize_url(tracked) == canonicalize_url(untracked)
+    assert (
+        canonicalize_url("https://example.com/article?page=2&id=7")
+        == "https://example.com/article?id=7&page=2"
+    )
+
+
+def test_domain_rules():
+    assert (
+        canonicalize_url(
+            "https://medium.com/@lidofinance/lido-v2-launch-b1a2c3?source=rss-abc----2"
+        )
+        == "https://medium.com/@lidofinance/lido-v2-launch-b1a2c3"
+    )
+    for url in [
+        "https://research.lido.fi/t/lip-22-steth-on-l2/6855",
+        "https://research.lido.fi/t/lip-22-steth-on-l2/6855/12",
+        "https://research.lido.fi/t/6855",
+    ]:
+        assert canonicalize_url(url) == "https://research.lido.fi/t/6855"
+
+
+def test_only_canonical_links_are_passed_through():
+    for url in [
+        "https://cointelegraph.com/news/lido-dao-vote",
+        "https://example.com/",
+        "https://example.com/article?id=7&page=2",
+    ]:
+        assert canonicalize_url(url) == url
+    # Links that look canonical still go through the rules they fall under
+    for url in [
+        "https://example.com",
+        "https://Example.com/article",
+        "https://example.com/article/amp",
+        "https://example.com:443/article",
+        "https://research.lido.fi/t/lip-22-steth-on-l2/6855",
+        "https://example.com/article ",
+    ]:
+        assert canonicalize_url(url) != url
+
+
+def test_non_http_strings_are_returned_unchanged():
+    assert canonicalize_url("") == ""
+    assert canonicalize_url("mailto:press@lido.fi") == "mailto:press@lido.fi"
+
+
+def test_tracking_variants_are_duplicates():
+    articles = [
+        clean_article(
+            {
+                "title": "Lido DAO vote",
+                "link": link,
+                "snippet": "",
+                "source": "Cointelegraph",
+                "timestamp": timestamp,
+            }
+        )
+        for timestamp, link in enumerate(
+            [
+                "https://cointelegraph.com/news/lido-dao-vote",
+                "https://cointelegraph.com/news/lido-dao-vote/?utm_source=rss",
+            ]
+        )
+    ]
+    unique = remove_duplicates(articles)
+    assert len(unique) == 1
+    assert (
+        unique[0]["link"]
+        == "https://cointelegraph.com/news/lido-dao-vote/?utm_source=rss"
+    )
+    assert unique[0]["canonical_link"] == "https://cointelegraph.com/news/lido-dao-vote"